@@ -0,0 +1,199 @@
+"""Versioned schema migrations and the declared index catalog.
+
+Boot used to re-run every `IF NOT EXISTS` DDL statement on each start. Now
+`run_migrations` reads the applied steps from SchemaMigrations in one round trip
+and only executes steps that are new (or, for the index catalog, changed).
+
+- Migration: ordered, append-only steps. Never edit an applied step; add a new one.
+  A changed checksum for an applied step is only logged.
+- INDEX_CATALOG: every index the repositories/agent queries rely on, with the
+  query pattern it serves. Editing the catalog changes its checksum, so the next
+  boot creates the missing indexes (existing ones are left alone).
+  Tables this app does not own (FallEvents, ExperimentReagentUsage, MSDS_Table)
+  are skipped when the table or a column is missing.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+INDEX_CATALOG_VERSION = "index_catalog"
+
+SCHEMA_MIGRATIONS_SQL = """
+SET NOCOUNT ON;
+IF OBJECT_ID(N'SchemaMigrations', N'U') IS NULL
+CREATE TABLE SchemaMigrations (
+    version NVARCHAR(100) PRIMARY KEY,
+    checksum NVARCHAR(64) NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT GETUTCDATE()
+);
+SELECT version, checksum FROM SchemaMigrations;
+"""
+
+MIGRATION_LOCK_SQL = (
+    "EXEC sp_getapplock @Resource = N'SchemaMigrations', @LockMode = N'Exclusive', "
+    "@LockOwner = N'Transaction', @LockTimeout = 120000;"
+)
+
+APPLIED_CHECKSUM_SQL = "SELECT checksum FROM SchemaMigrations WHERE version = :version;"
+
+RECORD_MIGRATION_SQL = """
+MERGE SchemaMigrations AS target
+USING (SELECT :version AS version, :checksum AS checksum) AS source
+ON target.version = source.version
+WHEN MATCHED THEN UPDATE SET checksum = source.checksum, applied_at = GETUTCDATE()
+WHEN NOT MATCHED THEN INSERT (version, checksum) VALUES (source.version, source.checksum);
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    statements: Callable[[], List[str]]
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+    include: Tuple[str, ...] = ()
+    serves: str = ""
+
+
+INDEX_CATALOG: Tuple[IndexSpec, ...] = (
+    # ── Chat ──────────────────────────────────────────
+    IndexSpec("IX_ChatMessages_Room_Message", "ChatMessages", ("room_id", "message_id"),
+              serves="chat_rooms_repo.list_messages / list_messages_after / delete_messages_by_room"),
+    IndexSpec("IX_ChatRooms_Type_Room", "ChatRooms", ("room_type", "room_id"),
+              serves="chat_rooms_repo.list_rooms(room_type=...) ORDER BY room_id DESC"),
+    IndexSpec("IX_ChatLogs_Timestamp", "ChatLogs", ("timestamp",),
+              serves="chat_logs_repo / export_repo ORDER BY timestamp DESC"),
+    # ── Auth ──────────────────────────────────────────
+    IndexSpec("idx_refresh_tokens_user_id", "RefreshTokens", ("user_id",),
+              serves="refresh_tokens_repo.revoke_user_tokens"),
+    IndexSpec("IX_RefreshTokens_ExpiresAt", "RefreshTokens", ("expires_at",), include=("revoked_at",),
+              serves="refresh_tokens_repo.cleanup_refresh_tokens"),
+    IndexSpec("idx_auth_logs_user_id", "AuthLogs", ("user_id", "logged_at"),
+              serves="auth_logs_repo.list_auth_logs_by_user / delete_auth_logs_by_user"),
+    IndexSpec("idx_auth_logs_email", "AuthLogs", ("email", "logged_at"),
+              serves="auth_logs_repo.count_recent_failed_logins(email)"),
+    IndexSpec("idx_auth_logs_ip", "AuthLogs", ("ip_address", "logged_at"),
+              serves="auth_logs_repo.count_recent_failed_logins(ip)"),
+    IndexSpec("IX_AuthLogs_LoggedAt", "AuthLogs", ("logged_at", "log_id"),
+              serves="export_repo auth logs ORDER BY logged_at DESC, log_id DESC"),
+    IndexSpec("idx_user_consents_user_id", "UserConsents", ("user_id",),
+              serves="UserConsents FK / per-user lookups"),
+    # ── Lab data ──────────────────────────────────────
+    IndexSpec("IX_Experiments_Status_ExpId", "Experiments", ("status", "exp_id"),
+              serves="experiments_repo.list_experiments(status=...) ORDER BY exp_id DESC"),
+    IndexSpec("IX_Experiments_CreatedAt", "Experiments", ("created_at",),
+              serves="export_repo experiments TOP (n) ORDER BY created_at DESC"),
+    IndexSpec("IX_ExperimentData_ExpId", "ExperimentData", ("exp_id",),
+              serves="Experiments JOIN ExperimentData (agent queries)"),
+    IndexSpec("IX_ExperimentReagents_ExpId", "ExperimentReagents", ("exp_id", "exp_reagent_id"),
+              serves="export_repo Experiments LEFT JOIN ExperimentReagents"),
+    IndexSpec("IX_ExperimentReagentUsage_Exp_Reagent", "ExperimentReagentUsage", ("exp_id", "reagent_id"),
+              serves="experiments_repo usage by exp_id / (exp_id, reagent_id)"),
+    IndexSpec("IX_ExperimentReagentUsage_Reagent", "ExperimentReagentUsage", ("reagent_id",),
+              serves="experiments_repo usage COUNT by reagent_id"),
+    IndexSpec("IX_ExperimentReagentUsage_RecordedAt", "ExperimentReagentUsage", ("recorded_at",),
+              include=("reagent_name", "used_volume"),
+              serves="sql_agent aggregate_lab_data reagent_usage_* WHERE recorded_at >= :since"),
+    IndexSpec("IX_Reagents_Status", "Reagents", ("status",),
+              serves="reagents_repo delete/purge WHERE status = :status"),
+    IndexSpec("IX_Reagents_RowVersion", "Reagents", ("row_version",),
+              serves="data_versions_repo Reagents probe MAX(row_version)"),
+    IndexSpec("IX_ReagentDisposals_ReagentId", "ReagentDisposals", ("reagent_id",),
+              serves="reagents_repo disposals JOIN / DELETE WHERE reagent_id"),
+    IndexSpec("IX_StorageEnvironment_RecordedAt", "StorageEnvironment", ("recorded_at",),
+              serves="reagents_repo / safety_repo latest environment ORDER BY recorded_at DESC"),
+    IndexSpec("IX_TranslationCache_Lookup", "TranslationCache",
+              ("source_hash", "source_lang", "target_lang", "provider"),
+              serves="translation_cache_repo lookup / touch / upsert"),
+    # ── Sensors / safety ──────────────────────────────
+    IndexSpec("IX_FallEvents_Status_Timestamp", "FallEvents", ("VerificationStatus", "Timestamp"),
+              serves="accidents_repo.list_accidents(status) / pending verification ORDER BY Timestamp DESC"),
+    IndexSpec("IX_FallEvents_Timestamp", "FallEvents", ("Timestamp",), include=("CameraID",),
+              serves="accidents/safety/export ORDER BY Timestamp DESC, recent cameras window"),
+    IndexSpec("IX_FallEvents_ExperimentID", "FallEvents", ("ExperimentID",),
+              serves="sql_agent get_experiment_summary WHERE ExperimentID"),
+    IndexSpec("IX_FallEvents_VerifiedAt", "FallEvents", ("VerifiedAt",),
+              serves="data_versions_repo FallEvents probe MAX(VerifiedAt)"),
+    IndexSpec("IX_WeightLog_Storage_RecordedAt", "WeightLog", ("StorageID", "RecordedAt"),
+              serves="sql_agent get_storage_status TOP 1 WHERE StorageID ORDER BY RecordedAt DESC"),
+    IndexSpec("IX_WeightLog_RecordedAt", "WeightLog", ("RecordedAt",), include=("StorageID",),
+              serves="safety_repo scales window / export / storage_weight_daily WHERE RecordedAt >= ..."),
+    IndexSpec("IX_MSDS_Table_chem_name_ko", "MSDS_Table", ("chem_name_ko",),
+              serves="hazard_repo lookup WHERE chem_name_ko = :name"),
+)
+
+
+def checksum(statements: Sequence[str]) -> str:
+    return hashlib.sha256("\n".join(statements).encode("utf-8")).hexdigest()[:16]
+
+
+def index_ddl(spec: IndexSpec) -> str:
+    """CREATE INDEX guarded by table/column existence and by the index name."""
+    table = spec.table.replace("'", "''")
+    columns = [*spec.columns, *spec.include]
+    conditions = [
+        f"OBJECT_ID(N'{table}', N'U') IS NOT NULL",
+        *(f"COL_LENGTH(N'{table}', N'{column}') IS NOT NULL" for column in columns),
+        f"NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{spec.name}' AND object_id = OBJECT_ID(N'{table}'))",
+    ]
+    ddl = f"CREATE INDEX [{spec.name}] ON [{spec.table}] ({', '.join(f'[{c}]' for c in spec.columns)})"
+    if spec.include:
+        ddl += f" INCLUDE ({', '.join(f'[{c}]' for c in spec.include)})"
+    # dynamic SQL so a missing column on a table we do not own skips instead of failing the batch
+    return "IF " + "\n   AND ".join(conditions) + f"\n    EXEC(N'{ddl}');"
+
+
+def _apply(engine, version: str, statements: List[str], digest: str) -> bool:
+    """Run one step under the migration lock. Returns False if another worker already applied it."""
+    with engine.begin() as conn:
+        # serialize workers booting at the same time (released at commit)
+        conn.execute(text(MIGRATION_LOCK_SQL))
+        # `applied` was read before the lock; a worker that held it may have just recorded this step
+        recorded = conn.execute(text(APPLIED_CHECKSUM_SQL), {"version": version}).scalar()
+        if recorded == digest:
+            return False
+        for statement in statements:
+            conn.execute(text(statement))
+        conn.execute(text(RECORD_MIGRATION_SQL), {"version": version, "checksum": digest})
+    return True
+
+
+def run_migrations(
+    engine,
+    migrations: Sequence[Migration],
+    indexes: Sequence[IndexSpec] = INDEX_CATALOG,
+) -> List[str]:
+    """Apply pending migrations and the index catalog if it changed. Returns the versions applied."""
+    with engine.begin() as conn:
+        applied: Dict[str, str] = {row[0]: row[1] for row in conn.execute(text(SCHEMA_MIGRATIONS_SQL))}
+
+    done: List[str] = []
+    for migration in migrations:
+        statements = migration.statements()
+        digest = checksum(statements)
+        if migration.version in applied:
+            if applied[migration.version] != digest:
+                logger.warning("Applied migration %s changed since it ran; add a new migration instead.", migration.version)
+            continue
+        logger.info("Applying schema migration %s (%d statements)", migration.version, len(statements))
+        if _apply(engine, migration.version, statements, digest):
+            done.append(migration.version)
+
+    index_statements = [index_ddl(spec) for spec in indexes]
+    digest = checksum(index_statements)
+    if applied.get(INDEX_CATALOG_VERSION) != digest:
+        logger.info("Reconciling index catalog (%d indexes)", len(index_statements))
+        if _apply(engine, INDEX_CATALOG_VERSION, index_statements, digest):
+            done.append(INDEX_CATALOG_VERSION)
+    return done
@@ -0,0 +1,483 @@
+"""Environment, connection string and schema bootstrap for the lab database.
+
+Kept free of LangChain/OpenAI imports so the API can start serving non-chat
+routes before the agent (sql_agent.py) is imported and built.
+"""
+
+import os
+import urllib.parse
+import logging
+from typing import List
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+try:
+    from .db_migrations import INDEX_CATALOG, Migration, run_migrations
+except ImportError:
+    from db_migrations import INDEX_CATALOG, Migration, run_migrations
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+# Suppress noisy Azure Monitor logs
+logging.getLogger("azure.core.pipeline.policies.http_logging_policy").setLevel(logging.WARNING)
+logging.getLogger("azure.monitor.opentelemetry.exporter").setLevel(logging.WARNING)
+
+logger = logging.getLogger(__name__)
+
+def load_environment() -> None:
+    """Load and validate environment variables."""
+    # Calculate the path relative to this script file
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    env_path = os.path.join(script_dir, "azure_and_sql.env")
+    load_dotenv(dotenv_path=env_path)
+    
+    required_vars = [
+        "AZURE_OPENAI_ENDPOINT",
+        "AZURE_OPENAI_API_KEY",
+        "OPENAI_API_VERSION",
+        "AZURE_DEPLOYMENT_NAME",
+        "SQL_SERVER",
+        "SQL_DATABASE",
+        "SQL_USERNAME",
+        "SQL_PASSWORD",
+        "JWT_SECRET_KEY",
+    ]
+    
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    if missing_vars:
+        raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
+    logger.info("Environment variables loaded successfully.")
+
+def get_connection_string() -> str:
+    """Constructs the connection string."""
+    server = os.getenv("SQL_SERVER")
+    database = os.getenv("SQL_DATABASE")
+    username = os.getenv("SQL_USERNAME")
+    password = os.getenv("SQL_PASSWORD")
+    encoded_password = urllib.parse.quote_plus(password)
+    driver = os.getenv("SQL_DRIVER", "ODBC Driver 18 for SQL Server")
+    encoded_driver = urllib.parse.quote_plus(driver)
+    
+    return (
+        f"mssql+pyodbc://{username}:{encoded_password}@{server}/{database}"
+        f"?driver={encoded_driver}"
+    )
+
+# ExperimentData (Child). User requested schema change: weight -> volume.
+# Avoid destructive drop in production; allow only via explicit env flag (see init_db_schema).
+EXPERIMENT_DATA_DROP = "DROP TABLE IF EXISTS ExperimentData;"
+EXPERIMENT_DATA_CREATE = """
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ExperimentData' AND xtype='U')
+CREATE TABLE ExperimentData (
+    data_id INT IDENTITY(1,1) PRIMARY KEY,
+    exp_id INT,
+    material NVARCHAR(100),
+    volume FLOAT,    -- Changed from weight to volume
+    density FLOAT,
+    mass FLOAT,
+    recorded_at DATETIME DEFAULT GETUTCDATE(),
+    FOREIGN KEY (exp_id) REFERENCES Experiments(exp_id)
+);
+"""
+
+
+def baseline_schema_statements() -> List[str]:
+    """
+    Table/column DDL of migration 0001_baseline, in execution order.
+    Every statement is guarded (IF NOT EXISTS / COL_LENGTH), so it is safe on databases
+    created before SchemaMigrations existed. Indexes live in db_migrations.INDEX_CATALOG.
+    """
+    # 1. Experiments (Parent)
+    table_exp = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Experiments' AND xtype='U')
+    CREATE TABLE Experiments (
+        exp_id INT IDENTITY(1,1) PRIMARY KEY,
+        exp_name NVARCHAR(100) UNIQUE NOT NULL,
+        researcher NVARCHAR(50),
+        status NVARCHAR(20),
+        exp_date DATE,
+        memo NVARCHAR(MAX),
+        created_at DATETIME DEFAULT GETUTCDATE()
+    );
+    """
+
+    table_exp_add_status = """
+    IF COL_LENGTH('Experiments', 'status') IS NULL
+        ALTER TABLE Experiments ADD status NVARCHAR(20);
+    """
+    table_exp_add_exp_date = """
+    IF COL_LENGTH('Experiments', 'exp_date') IS NULL
+        ALTER TABLE Experiments ADD exp_date DATE;
+    """
+    table_exp_add_memo = """
+    IF COL_LENGTH('Experiments', 'memo') IS NULL
+        ALTER TABLE Experiments ADD memo NVARCHAR(MAX);
+    """
+    
+    # 2. ExperimentData (Child): EXPERIMENT_DATA_CREATE (module level, reused by RESET_EXPERIMENTDATA)
+
+    # 3. ChatLogs (Conversation log table)
+    table_chat_logs = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ChatLogs' AND xtype='U')
+    CREATE TABLE ChatLogs (
+        log_id INT IDENTITY(1,1) PRIMARY KEY,
+        timestamp DATETIME DEFAULT GETUTCDATE(),
+        user_name NVARCHAR(100) NOT NULL,
+        command NVARCHAR(500) NOT NULL,
+        status NVARCHAR(20) NOT NULL
+    );
+    """
+    # Per-run agent details (tool timings, cache hits) as JSON
+    table_chat_logs_add_details = """
+    IF COL_LENGTH('ChatLogs', 'details') IS NULL
+        ALTER TABLE ChatLogs ADD details NVARCHAR(MAX) NULL;
+    """
+
+    # 3.1 ChatRooms (Multi-room chat metadata)
+    table_chat_rooms = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ChatRooms' AND xtype='U')
+    CREATE TABLE ChatRooms (
+        room_id INT IDENTITY(1,1) PRIMARY KEY,
+        title NVARCHAR(200) NOT NULL,
+        room_type NVARCHAR(20) NOT NULL DEFAULT 'public',
+        created_by_user_id NVARCHAR(100) NULL,
+        created_at DATETIME DEFAULT GETUTCDATE(),
+        last_message_at DATETIME NULL,
+        last_message_preview NVARCHAR(200) NULL
+    );
+    """
+
+    # 3.1.1 ChatRooms rolling summary (summary covers messages up to summary_message_id)
+    table_chat_rooms_add_summary = """
+    IF COL_LENGTH('ChatRooms', 'summary') IS NULL
+        ALTER TABLE ChatRooms ADD summary NVARCHAR(MAX) NULL;
+    """
+    table_chat_rooms_add_summary_message_id = """
+    IF COL_LENGTH('ChatRooms', 'summary_message_id') IS NULL
+        ALTER TABLE ChatRooms ADD summary_message_id INT NULL;
+    """
+
+    # 3.2 ChatMessages (Multi-room chat history)
+    table_chat_messages = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ChatMessages' AND xtype='U')
+    CREATE TABLE ChatMessages (
+        message_id INT IDENTITY(1,1) PRIMARY KEY,
+        room_id INT NOT NULL,
+        role NVARCHAR(20) NOT NULL,
+        content NVARCHAR(MAX) NOT NULL,
+        sender_type NVARCHAR(20) NOT NULL,
+        sender_id NVARCHAR(100) NULL,
+        sender_name NVARCHAR(100) NULL,
+        created_at DATETIME DEFAULT GETUTCDATE(),
+        FOREIGN KEY (room_id) REFERENCES ChatRooms(room_id)
+    );
+    """
+
+    # 3.3 Users (Auth)
+    table_users = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Users' AND xtype='U')
+    CREATE TABLE Users (
+        user_id INT IDENTITY(1,1) PRIMARY KEY,
+        email NVARCHAR(100) UNIQUE NOT NULL,
+        name NVARCHAR(100) NULL,
+        affiliation NVARCHAR(100) NULL,
+        department NVARCHAR(100) NULL,
+        position NVARCHAR(50) NULL,
+        phone NVARCHAR(30) NULL,
+        contact_email NVARCHAR(100) NULL,
+        profile_image_url NVARCHAR(500) NULL,
+        password_hash NVARCHAR(255) NOT NULL,
+        role NVARCHAR(20) NOT NULL DEFAULT 'user',
+        is_active BIT DEFAULT 1,
+        created_at DATETIME DEFAULT GETUTCDATE(),
+        updated_at DATETIME DEFAULT GETUTCDATE(),
+        last_login_at DATETIME NULL
+    );
+    """
+    table_refresh_tokens = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='RefreshTokens' AND xtype='U')
+    CREATE TABLE RefreshTokens (
+        token_id INT IDENTITY(1,1) PRIMARY KEY,
+        user_id INT NOT NULL,
+        token_hash NVARCHAR(64) NOT NULL UNIQUE,
+        expires_at DATETIME NOT NULL,
+        created_at DATETIME DEFAULT GETUTCDATE(),
+        revoked_at DATETIME NULL,
+        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+    );
+    """
+    table_auth_logs = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='AuthLogs' AND xtype='U')
+    CREATE TABLE AuthLogs (
+        log_id INT IDENTITY(1,1) PRIMARY KEY,
+        user_id INT NULL,
+        email NVARCHAR(100) NULL,
+        event_type NVARCHAR(20) NOT NULL,
+        success BIT NOT NULL,
+        ip_address NVARCHAR(45) NULL,
+        user_agent NVARCHAR(255) NULL,
+        logged_at DATETIME DEFAULT GETUTCDATE(),
+        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE SET NULL
+    );
+    """
+    table_auth_logs_add_ip = """
+    IF COL_LENGTH('AuthLogs', 'ip_address') IS NULL
+        ALTER TABLE AuthLogs ADD ip_address NVARCHAR(45) NULL;
+    """
+    table_users_add_affiliation = """
+    IF COL_LENGTH('Users', 'affiliation') IS NULL
+        ALTER TABLE Users ADD affiliation NVARCHAR(100) NULL;
+    """
+    table_users_add_department = """
+    IF COL_LENGTH('Users', 'department') IS NULL
+        ALTER TABLE Users ADD department NVARCHAR(100) NULL;
+    """
+    table_users_add_position = """
+    IF COL_LENGTH('Users', 'position') IS NULL
+        ALTER TABLE Users ADD position NVARCHAR(50) NULL;
+    """
+    table_users_add_phone = """
+    IF COL_LENGTH('Users', 'phone') IS NULL
+        ALTER TABLE Users ADD phone NVARCHAR(30) NULL;
+    """
+    table_users_add_contact_email = """
+    IF COL_LENGTH('Users', 'contact_email') IS NULL
+        ALTER TABLE Users ADD contact_email NVARCHAR(100) NULL;
+    """
+    table_users_add_profile_image_url = """
+    IF COL_LENGTH('Users', 'profile_image_url') IS NULL
+        ALTER TABLE Users ADD profile_image_url NVARCHAR(500) NULL;
+    """
+    table_user_consents = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='UserConsents' AND xtype='U')
+    CREATE TABLE UserConsents (
+        consent_id INT IDENTITY(1,1) PRIMARY KEY,
+        user_id INT NOT NULL,
+        consent_version NVARCHAR(50) NOT NULL,
+        consent_payload NVARCHAR(MAX) NOT NULL,
+        consent_source NVARCHAR(50) NULL,
+        ip_address NVARCHAR(45) NULL,
+        user_agent NVARCHAR(255) NULL,
+        created_at DATETIME DEFAULT GETUTCDATE(),
+        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+    );
+    """
+
+    # 4. Reagents (Inventory)
+    table_reagents = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Reagents' AND xtype='U')
+    CREATE TABLE Reagents (
+        reagent_id NVARCHAR(50) PRIMARY KEY,
+        name NVARCHAR(100) NOT NULL,
+        formula NVARCHAR(50),
+        purchase_date DATE,
+        open_date DATE NULL,
+        current_volume_value FLOAT NULL,
+        current_volume_unit NVARCHAR(10) NULL,
+        original_volume_value FLOAT NULL,
+        original_volume_unit NVARCHAR(10) NULL,
+        density FLOAT NULL,
+        mass FLOAT NULL,
+        purity FLOAT NULL,
+        location NVARCHAR(50) NULL,
+        status NVARCHAR(20) NULL,
+        created_at DATETIME DEFAULT GETUTCDATE()
+    );
+    """
+
+    # 5. ExperimentReagents (Usage)
+    table_experiment_reagents = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ExperimentReagents' AND xtype='U')
+    BEGIN
+        DECLARE @reagent_id_type NVARCHAR(100);
+        SELECT @reagent_id_type =
+            CASE
+                WHEN t.name IN ('varchar','nvarchar','char','nchar') THEN
+                    t.name + '(' + CASE
+                        WHEN c.max_length = -1 THEN 'MAX'
+                        ELSE CAST(CASE WHEN t.name IN ('nvarchar','nchar') THEN c.max_length / 2 ELSE c.max_length END AS NVARCHAR(10))
+                    END + ')'
+                WHEN t.name IN ('decimal','numeric') THEN
+                    t.name + '(' + CAST(c.precision AS NVARCHAR(10)) + ',' + CAST(c.scale AS NVARCHAR(10)) + ')'
+                ELSE t.name
+            END
+        FROM sys.columns c
+        JOIN sys.types t ON c.user_type_id = t.user_type_id
+        WHERE c.object_id = OBJECT_ID('Reagents') AND c.name = 'reagent_id';
+
+        IF @reagent_id_type IS NULL
+            SET @reagent_id_type = 'NVARCHAR(50)';
+
+        DECLARE @sql NVARCHAR(MAX) = N'
+        CREATE TABLE ExperimentReagents (
+            exp_reagent_id INT IDENTITY(1,1) PRIMARY KEY,
+            exp_id INT NOT NULL,
+            reagent_id ' + @reagent_id_type + ' NOT NULL,
+            dosage_value FLOAT NULL,
+            dosage_unit NVARCHAR(10) NULL,
+            created_at DATETIME DEFAULT GETUTCDATE(),
+            FOREIGN KEY (exp_id) REFERENCES Experiments(exp_id),
+            FOREIGN KEY (reagent_id) REFERENCES Reagents(reagent_id)
+        );';
+
+        EXEC sp_executesql @sql;
+    END;
+    """
+
+    # 6. ReagentDisposals
+    table_reagent_disposals = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ReagentDisposals' AND xtype='U')
+    BEGIN
+        DECLARE @reagent_id_type NVARCHAR(100);
+        SELECT @reagent_id_type =
+            CASE
+                WHEN t.name IN ('varchar','nvarchar','char','nchar') THEN
+                    t.name + '(' + CASE
+                        WHEN c.max_length = -1 THEN 'MAX'
+                        ELSE CAST(CASE WHEN t.name IN ('nvarchar','nchar') THEN c.max_length / 2 ELSE c.max_length END AS NVARCHAR(10))
+                    END + ')'
+                WHEN t.name IN ('decimal','numeric') THEN
+                    t.name + '(' + CAST(c.precision AS NVARCHAR(10)) + ',' + CAST(c.scale AS NVARCHAR(10)) + ')'
+                ELSE t.name
+            END
+        FROM sys.columns c
+        JOIN sys.types t ON c.user_type_id = t.user_type_id
+        WHERE c.object_id = OBJECT_ID('Reagents') AND c.name = 'reagent_id';
+
+        IF @reagent_id_type IS NULL
+            SET @reagent_id_type = 'NVARCHAR(50)';
+
+        DECLARE @sql NVARCHAR(MAX) = N'
+        CREATE TABLE ReagentDisposals (
+            disposal_id INT IDENTITY(1,1) PRIMARY KEY,
+            reagent_id ' + @reagent_id_type + ' NOT NULL,
+            disposal_date DATE NOT NULL,
+            reason NVARCHAR(100) NOT NULL,
+            disposed_by NVARCHAR(50) NOT NULL,
+            created_at DATETIME DEFAULT GETUTCDATE(),
+            FOREIGN KEY (reagent_id) REFERENCES Reagents(reagent_id)
+        );';
+
+        EXEC sp_executesql @sql;
+    END;
+    """
+
+    # 7. StorageEnvironment (Environment Sensors)
+    table_storage_environment = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='StorageEnvironment' AND xtype='U')
+    CREATE TABLE StorageEnvironment (
+        env_id INT IDENTITY(1,1) PRIMARY KEY,
+        location NVARCHAR(50) NOT NULL,
+        temp FLOAT NULL,
+        humidity FLOAT NULL,
+        status NVARCHAR(20) NULL,
+        recorded_at DATETIME DEFAULT GETUTCDATE()
+    );
+    """
+
+    # 8. WeightLog (Arduino Scale Data)
+    # Stores real-time weight measurements and occupancy status.
+    table_weight_log = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='WeightLog' AND xtype='U')
+    CREATE TABLE WeightLog (
+        LogID INT IDENTITY(1,1) PRIMARY KEY,
+        StorageID NVARCHAR(50) NOT NULL, -- e.g., 'Alpha'
+        WeightValue FLOAT NOT NULL,      -- in grams
+        Status NVARCHAR(20) NOT NULL,    -- 'Empty' or 'Occupied'
+        EmptyTime INT DEFAULT 0,         -- Duration in seconds
+        RecordedAt DATETIME DEFAULT GETUTCDATE()
+    );
+    """
+
+    # 9. TranslationCache (i18n cache)
+    table_translation_cache = """
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='TranslationCache' AND xtype='U')
+    CREATE TABLE TranslationCache (
+        cache_id INT IDENTITY(1,1) PRIMARY KEY,
+        source_hash NVARCHAR(64) NOT NULL,
+        source_lang NVARCHAR(10) NULL,
+        target_lang NVARCHAR(10) NOT NULL,
+        provider NVARCHAR(50) NOT NULL,
+        translated_text NVARCHAR(MAX) NOT NULL,
+        created_at DATETIME DEFAULT GETUTCDATE(),
+        last_accessed_at DATETIME NULL,
+        hit_count INT DEFAULT 0,
+        expires_at DATETIME NULL
+    );
+    """
+
+
+    return [
+        table_exp,
+        table_exp_add_status,
+        table_exp_add_exp_date,
+        table_exp_add_memo,
+        EXPERIMENT_DATA_CREATE,
+        table_chat_logs,
+        table_chat_logs_add_details,
+        table_chat_rooms,
+        table_chat_rooms_add_summary,
+        table_chat_rooms_add_summary_message_id,
+        table_chat_messages,
+        table_users,
+        table_refresh_tokens,
+        table_auth_logs,
+        table_auth_logs_add_ip,
+        table_users_add_affiliation,
+        table_users_add_department,
+        table_users_add_position,
+        table_users_add_phone,
+        table_users_add_contact_email,
+        table_users_add_profile_image_url,
+        table_user_consents,
+        # Reagents and related tables
+        table_reagents,
+        table_experiment_reagents,
+        table_reagent_disposals,
+        table_storage_environment,
+        table_weight_log,
+        table_translation_cache,
+    ]
+
+
+def reagents_row_version_statements() -> List[str]:
+    """ROWVERSION on Reagents so the answer cache can detect updates with an index seek (MAX(row_version))."""
+    return [
+        """
+        IF OBJECT_ID(N'Reagents', N'U') IS NOT NULL AND COL_LENGTH(N'Reagents', N'row_version') IS NULL
+            ALTER TABLE Reagents ADD row_version ROWVERSION;
+        """
+    ]
+
+
+# Append-only: never edit an applied migration, add a new version instead.
+MIGRATIONS = [
+    Migration("0001_baseline", baseline_schema_statements),
+    Migration("0002_reagents_row_version", reagents_row_version_statements),
+]
+
+
+def init_db_schema(engine):
+    """
+    Applies pending schema migrations and the index catalog.
+    When everything is already applied this is a single round trip (SchemaMigrations read).
+    """
+    logger.info("Checking and initializing database schema...")
+    try:
+        # If RESET_EXPERIMENTDATA=1, drop and recreate ExperimentData on every start.
+        if os.getenv("RESET_EXPERIMENTDATA", "0") == "1":
+            logger.warning("RESET_EXPERIMENTDATA=1 set. Dropping and recreating ExperimentData.")
+            with engine.begin() as conn:
+                conn.execute(text(EXPERIMENT_DATA_DROP))
+                conn.execute(text(EXPERIMENT_DATA_CREATE))
+
+        applied = run_migrations(engine, MIGRATIONS, INDEX_CATALOG)
+        if applied:
+            logger.info("Schema migrations applied: %s", ", ".join(applied))
+        logger.info("Schema initialization complete.")
+    except Exception as e:
+        logger.error(f"Schema initialization failed: {e}")
@@ -9,7 +9,9 @@ from fastapi.middleware.cors import CORSMiddleware
 load_dotenv("backend/azure_and_sql.env")
 
 from .routers import health, accidents, logs, chat, safety, experiments, reagents, monitoring, chat_rooms, speech, export, auth, users, consents
-from .services.agent_service import init_app_state
+from .services.agent_service import init_app_state, shutdown_agent, start_agent_warmup
+from .services.log_writer import stop_log_writers
+from .services.room_events import room_events
 from .utils.dependencies import csrf_protect, get_current_user
 from .utils.redis_client import init_redis
 
@@ -63,7 +65,18 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     def on_startup() -> None:
         init_redis()
+        # 채팅방 이벤트의 워커 간 전달 (Redis pub/sub 구독)
+        room_events.start()
         init_app_state(app)
+        # 에이전트(LangChain import, 스키마 조회, LLM 구성)는 백그라운드에서 생성
+        start_agent_warmup(app)
+
+    @app.on_event("shutdown")
+    async def on_shutdown() -> None:
+        await shutdown_agent(app)
+        # 버퍼에 남은 ChatLogs/AuthLogs 저장
+        stop_log_writers()
+        room_events.stop()
 
     protected = [Depends(get_current_user), Depends(csrf_protect)]
 
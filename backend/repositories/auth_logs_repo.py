@@ -1,7 +1,10 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from sqlalchemy import text
 
+# SQL Server 파라미터 2100개 제한 안에서 한 INSERT에 넣을 행 수 (행당 7개)
+INSERT_CHUNK_ROWS = 250
+
 
 def create_auth_log(
     engine,
@@ -46,6 +49,40 @@ def create_auth_log(
         )
 
 
+def create_auth_logs(engine, rows: Sequence[Dict[str, Any]]) -> None:
+    """
+    여러 행을 multi-row INSERT로 저장 (write-behind 버퍼용).
+    rows: create_auth_log 인자 + "logged_at"(UTC, 없으면 DB 시각)
+    """
+    if not rows:
+        return
+    with engine.begin() as conn:
+        for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+            chunk = rows[start:start + INSERT_CHUNK_ROWS]
+            values = []
+            params: Dict[str, Any] = {}
+            for index, row in enumerate(chunk):
+                values.append(
+                    f"(:user_id_{index}, :email_{index}, :event_type_{index}, :success_{index}, "
+                    f":ip_address_{index}, :user_agent_{index}, COALESCE(:logged_at_{index}, GETUTCDATE()))"
+                )
+                params.update({
+                    f"user_id_{index}": row.get("user_id"),
+                    f"email_{index}": row.get("email"),
+                    f"event_type_{index}": row["event_type"],
+                    f"success_{index}": 1 if row["success"] else 0,
+                    f"ip_address_{index}": row.get("ip_address"),
+                    f"user_agent_{index}": row.get("user_agent"),
+                    f"logged_at_{index}": row.get("logged_at"),
+                })
+            sql = (
+                "INSERT INTO AuthLogs (user_id, email, event_type, success, ip_address, user_agent, logged_at) VALUES "
+                + ", ".join(values)
+                + ";"
+            )
+            conn.execute(text(sql), params)
+
+
 def list_auth_logs_by_user(
     engine, user_id: int, limit: int
 ) -> List[Dict[str, Any]]:
@@ -1,17 +1,64 @@
 """Repository for ChatLogs data access."""
 
-from typing import Any, Dict, List
+import json
+from typing import Any, Dict, List, Optional, Sequence
 
 from sqlalchemy import text
 
+# SQL Server 파라미터 2100개 제한 안에서 한 INSERT에 넣을 행 수 (행당 5개)
+INSERT_CHUNK_ROWS = 400
 
-def insert_chat_log(engine, user_name: str, command: str, status: str) -> None:
+
+def insert_chat_log(
+    engine,
+    user_name: str,
+    command: str,
+    status: str,
+    details: Optional[Dict[str, Any]] = None,
+) -> None:
     sql = """
-    INSERT INTO ChatLogs (user_name, command, status)
-    VALUES (:user_name, :command, :status);
+    INSERT INTO ChatLogs (user_name, command, status, details)
+    VALUES (:user_name, :command, :status, :details);
+    """
+    payload = json.dumps(details, ensure_ascii=False) if details else None
+    with engine.begin() as conn:
+        conn.execute(
+            text(sql),
+            {"user_name": user_name, "command": command, "status": status, "details": payload},
+        )
+
+
+def insert_chat_logs(engine, rows: Sequence[Dict[str, Any]]) -> None:
+    """
+    여러 행을 multi-row INSERT로 저장 (write-behind 버퍼용).
+    rows: {"user_name", "command", "status", "details"(dict|None), "timestamp"(UTC, 없으면 DB 시각)}
     """
+    if not rows:
+        return
     with engine.begin() as conn:
-        conn.execute(text(sql), {"user_name": user_name, "command": command, "status": status})
+        for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+            chunk = rows[start:start + INSERT_CHUNK_ROWS]
+            values = []
+            params: Dict[str, Any] = {}
+            for index, row in enumerate(chunk):
+                values.append(
+                    f"(COALESCE(:timestamp_{index}, GETUTCDATE()), :user_name_{index}, "
+                    f":command_{index}, :status_{index}, :details_{index})"
+                )
+                details = row.get("details")
+                params.update({
+                    f"timestamp_{index}": row.get("timestamp"),
+                    f"user_name_{index}": row["user_name"],
+                    f"command_{index}": row["command"],
+                    f"status_{index}": row["status"],
+                    f"details_{index}": json.dumps(details, ensure_ascii=False) if details else None,
+                })
+            sql = (
+                "INSERT INTO ChatLogs (timestamp, user_name, command, status, details) VALUES "
+                + ", ".join(values)
+                + ";"
+            )
+            conn.execute(text(sql), params)
 
 
 def list_chat_logs(engine, limit: int) -> List[Dict[str, Any]]:
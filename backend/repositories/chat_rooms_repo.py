@@ -1,3 +1,4 @@
+import json
 from typing import Optional, List, Dict, Any
 
 from sqlalchemy import text
@@ -119,6 +120,84 @@ def create_message(
         ).mappings().first()
 
 
+def save_messages_batch(
+    engine,
+    room_id: int,
+    messages: List[Dict[str, Any]],
+    preview: str,
+    chat_log: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    메시지 저장 + 방 last_message_* 갱신 + ChatLogs 기록을 한 배치(한 트랜잭션, 1회 왕복)로 실행합니다.
+
+    messages: [{"role", "content", "sender_type", "sender_id", "sender_name", "created_at"(없으면 DB 시각)}]
+    chat_log: {"user_name", "command", "status", "details"(dict)} 또는 None
+    저장된 메시지 행을 입력 순서(message_id 오름차순)로 반환합니다.
+    """
+    # 메시지마다 INSERT 1문장 → message_id가 입력 순서대로 증가
+    statements = [
+        """
+    SET NOCOUNT ON;
+    DECLARE @inserted TABLE (
+        message_id INT, room_id INT, role NVARCHAR(20), content NVARCHAR(MAX),
+        sender_type NVARCHAR(20), sender_id NVARCHAR(100), sender_name NVARCHAR(100), created_at DATETIME
+    );
+    """
+    ]
+    params: Dict[str, Any] = {"room_id": room_id, "preview": preview}
+    for index, message in enumerate(messages):
+        statements.append(
+            f"""
+    INSERT INTO ChatMessages (room_id, role, content, sender_type, sender_id, sender_name, created_at)
+    OUTPUT
+        INSERTED.message_id, INSERTED.room_id, INSERTED.role, INSERTED.content,
+        INSERTED.sender_type, INSERTED.sender_id, INSERTED.sender_name, INSERTED.created_at
+    INTO @inserted
+    VALUES (
+        :room_id, :role_{index}, :content_{index}, :sender_type_{index}, :sender_id_{index},
+        :sender_name_{index}, COALESCE(:created_at_{index}, GETUTCDATE())
+    );
+    """
+        )
+        for key in ("role", "content", "sender_type", "sender_id", "sender_name", "created_at"):
+            params[f"{key}_{index}"] = message.get(key)
+
+    statements.append(
+        """
+    UPDATE ChatRooms
+    SET last_message_at = GETUTCDATE(),
+        last_message_preview = :preview
+    WHERE room_id = :room_id;
+    """
+    )
+    if chat_log is not None:
+        statements.append(
+            """
+    INSERT INTO ChatLogs (user_name, command, status, details)
+    VALUES (:log_user_name, :log_command, :log_status, :log_details);
+    """
+        )
+        details = chat_log.get("details")
+        params.update({
+            "log_user_name": chat_log["user_name"],
+            "log_command": chat_log["command"],
+            "log_status": chat_log["status"],
+            "log_details": json.dumps(details, ensure_ascii=False) if details else None,
+        })
+
+    statements.append(
+        """
+    SELECT
+        message_id, room_id, role, content,
+        sender_type, sender_id, sender_name, created_at
+    FROM @inserted
+    ORDER BY message_id;
+    """
+    )
+    with engine.begin() as conn:
+        return conn.execute(text("".join(statements)), params).mappings().all()
+
+
 def list_messages(
     engine,
     room_id: int,
@@ -144,6 +223,66 @@ def list_messages(
         return conn.execute(text(sql), params).mappings().all()
 
 
+def list_messages_after(
+    engine,
+    room_id: int,
+    after_message_id: Optional[int],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """after_message_id 이후 메시지를 오래된 순으로 반환 (롤링 요약 갱신용)."""
+    sql = """
+    SELECT TOP (:limit)
+        message_id, room_id, role, content,
+        sender_type, sender_id, sender_name, created_at
+    FROM ChatMessages
+    WHERE room_id = :room_id AND message_id > :after_message_id
+    ORDER BY message_id ASC
+    """
+    params = {"limit": limit, "room_id": room_id, "after_message_id": after_message_id or 0}
+    with engine.connect() as conn:
+        return conn.execute(text(sql), params).mappings().all()
+
+
+def get_room_summary(engine, room_id: int) -> Optional[Dict[str, Any]]:
+    sql = """
+    SELECT room_id, summary, summary_message_id
+    FROM ChatRooms
+    WHERE room_id = :room_id;
+    """
+    with engine.connect() as conn:
+        return conn.execute(text(sql), {"room_id": room_id}).mappings().first()
+
+
+def update_room_summary(
+    engine,
+    room_id: int,
+    summary: str,
+    summary_message_id: int,
+    expected_message_id: Optional[int],
+) -> bool:
+    """
+    요약을 갱신합니다. 다른 워커가 먼저 갱신했으면(summary_message_id 불일치) False.
+    """
+    sql = """
+    UPDATE ChatRooms
+    SET summary = :summary,
+        summary_message_id = :summary_message_id
+    WHERE room_id = :room_id
+      AND ISNULL(summary_message_id, 0) = :expected_message_id;
+    """
+    with engine.begin() as conn:
+        result = conn.execute(
+            text(sql),
+            {
+                "room_id": room_id,
+                "summary": summary,
+                "summary_message_id": summary_message_id,
+                "expected_message_id": expected_message_id or 0,
+            },
+        )
+        return result.rowcount > 0
+
+
 def update_room_last_message(engine, room_id: int, preview: str) -> None:
     sql = """
     UPDATE ChatRooms
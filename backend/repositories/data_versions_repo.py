@@ -0,0 +1,53 @@
+"""Repository for cheap per-table data-version stamps (answer cache invalidation)."""
+
+from typing import Dict, Iterable
+
+from sqlalchemy import text
+
+# 테이블 내용이 바뀌면 값이 바뀌는 스칼라 프로브 (2초마다 호출되므로 전체 스캔 없이 인덱스 seek/메타데이터만 사용).
+# - 행 수: sys.partitions 메타데이터 (삭제 감지)
+# - FallEvents/WeightLog: 센서가 append 하므로 최대 ID(PK), 검증 상태 변경은 MAX(VerifiedAt) (IX_FallEvents_VerifiedAt)
+# - Reagents: 앱에서 UPDATE 되므로 row_version(ROWVERSION, IX_Reagents_RowVersion) 최대값
+# MAX는 각각 별도 서브쿼리로 두어야 인덱스 끝 1행 seek로 처리됨
+
+
+def _row_count(table: str) -> str:
+    return (
+        f"(SELECT SUM(rows) FROM sys.partitions "
+        f"WHERE object_id = OBJECT_ID(N'{table}') AND index_id IN (0, 1))"
+    )
+
+
+TABLE_VERSION_PROBES: Dict[str, str] = {
+    "Reagents": f"""
+        SELECT CONCAT(
+            {_row_count("Reagents")}, ':',
+            CONVERT(VARCHAR(20), CAST((SELECT MAX(row_version) FROM Reagents) AS BIGINT))
+        )
+    """,
+    "FallEvents": f"""
+        SELECT CONCAT(
+            {_row_count("FallEvents")}, ':',
+            (SELECT MAX(EventID) FROM FallEvents), ':',
+            CONVERT(VARCHAR(30), (SELECT MAX(VerifiedAt) FROM FallEvents), 126)
+        )
+    """,
+    "WeightLog": f"""
+        SELECT CONCAT({_row_count("WeightLog")}, ':', (SELECT MAX(LogID) FROM WeightLog))
+    """,
+}
+
+
+def get_table_versions(engine, tables: Iterable[str]) -> Dict[str, str]:
+    """Return {table: version stamp} for the tracked tables in one round trip."""
+    names = sorted({name for name in tables if name in TABLE_VERSION_PROBES})
+    if not names:
+        return {}
+
+    columns = ",\n".join(f"({TABLE_VERSION_PROBES[name].strip()}) AS [{name}]" for name in names)
+    sql = f"SELECT\n{columns};"
+    with engine.connect() as conn:
+        row = conn.execute(text(sql)).mappings().first()
+    if not row:
+        return {}
+    return {name: str(row.get(name)) for name in names}
@@ -0,0 +1,58 @@
+"""Repository for catalog metadata used to build the agent's schema context."""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+
+
+def list_table_columns(engine, tables: Iterable[str]) -> List[Dict[str, Any]]:
+    """Columns (with PK flag) of the given tables in ordinal order, in one catalog query."""
+    names = sorted(set(tables))
+    if not names:
+        return []
+
+    sql = text(
+        """
+        SELECT
+            c.TABLE_NAME AS table_name,
+            c.COLUMN_NAME AS column_name,
+            c.DATA_TYPE AS data_type,
+            c.IS_NULLABLE AS is_nullable,
+            CASE WHEN pk.COLUMN_NAME IS NULL THEN 0 ELSE 1 END AS is_pk
+        FROM INFORMATION_SCHEMA.COLUMNS c
+        LEFT JOIN (
+            SELECT ku.TABLE_NAME, ku.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+            JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE ku
+              ON tc.CONSTRAINT_NAME = ku.CONSTRAINT_NAME
+             AND tc.TABLE_NAME = ku.TABLE_NAME
+            WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+        ) pk
+          ON pk.TABLE_NAME = c.TABLE_NAME
+         AND pk.COLUMN_NAME = c.COLUMN_NAME
+        WHERE c.TABLE_NAME IN :tables
+        ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+        """
+    ).bindparams(bindparam("tables", expanding=True))
+    with engine.connect() as conn:
+        rows = conn.execute(sql, {"tables": names}).mappings().all()
+    return [dict(row) for row in rows]
+
+
+_SUBTREE_COST_RE = re.compile(r'StatementSubTreeCost="([0-9.Ee+-]+)"')
+
+
+def estimate_query_cost(engine, sql: str) -> Optional[float]:
+    """Optimizer's estimated subtree cost (SHOWPLAN_XML, query not executed). None if unavailable."""
+    if engine.dialect.name != "mssql":
+        return None
+    with engine.connect() as conn:
+        # SHOWPLAN 설정은 단독 배치여야 하며, 켜져 있는 동안 쿼리는 실행되지 않고 계획만 반환됨
+        conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+        try:
+            plan = conn.exec_driver_sql(sql).scalar()
+        finally:
+            conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+    costs = [float(value) for value in _SUBTREE_COST_RE.findall(str(plan or ""))]
+    return max(costs) if costs else None
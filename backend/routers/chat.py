@@ -3,19 +3,26 @@ from fastapi import APIRouter, HTTPException, Request
 
 from ..schemas import ChatRequest, ChatResponse
 from ..services import chat_service
+from ..services.agent_runner import AgentBusyError
+from ..services.run_control import AgentCancelledError, RunControl, cancelled_status_code
+from ..utils.dependencies import get_agent
 
 router = APIRouter()
 
 
 @router.post("/api/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest, request: Request) -> ChatResponse:
-    agent = getattr(request.app.state, "agent_executor", None)
-    if agent is None:
-        raise HTTPException(status_code=500, detail="Agent not initialized")
+    agent = get_agent(request)
 
     engine = request.app.state.db_engine
     try:
-        output, _status = await chat_service.invoke_agent(engine, agent, req.message, req.user)
+        output, _status = await chat_service.invoke_agent(
+            engine, agent, req.message, req.user, RunControl.from_request(request)
+        )
+    except AgentBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except AgentCancelledError as exc:
+        raise HTTPException(status_code=cancelled_status_code(exc), detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -1,6 +1,7 @@
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from ..schemas import (
     ChatRoomCreateRequest,
@@ -12,8 +13,13 @@ from ..schemas import (
     ChatMessageListResponse,
 )
 from ..services import chat_rooms_service, i18n_service
+from ..services import room_events as room_events_service
+from ..services.agent_runner import AgentBusyError
+from ..services.run_control import AgentCancelledError, RunControl, cancelled_status_code
+from ..utils.dependencies import get_agent
 from ..utils.i18n_handler import apply_i18n, apply_i18n_to_items
 from ..utils.exceptions import ensure_found, ensure_valid
+from ..utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE
 
 router = APIRouter()
 
@@ -41,6 +47,23 @@ def list_rooms(
     return response
 
 
+# /api/chat/rooms/{room_id}보다 먼저 등록해야 "events"가 room_id로 해석되지 않음
+@router.get("/api/chat/rooms/events")
+async def stream_room_list_events(request: Request) -> StreamingResponse:
+    """방 목록 변경(새 방, 제목 변경, 삭제, 마지막 메시지 미리보기) 구독 (SSE)."""
+    events = room_events_service.stream_channel(request, room_events_service.ROOMS_CHANNEL)
+    return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@router.get("/api/chat/rooms/{room_id}/events")
+async def stream_room_events(request: Request, room_id: int) -> StreamingResponse:
+    """방 새 메시지 구독 (SSE). 다른 탭/사용자가 보낸 메시지도 저장 즉시 전달."""
+    engine = request.app.state.db_engine
+    ensure_found(chat_rooms_service.get_room(engine, room_id), "Room")
+    events = room_events_service.stream_channel(request, room_events_service.room_channel(room_id))
+    return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
 @router.get("/api/chat/rooms/{room_id}", response_model=ChatRoomResponse)
 def get_room(
     request: Request,
@@ -106,8 +129,7 @@ async def create_message(
     engine = request.app.state.db_engine
     ensure_found(chat_rooms_service.get_room(engine, room_id), "Room")
 
-    agent = getattr(request.app.state, "agent_executor", None)
-    ensure_valid(agent is not None, "Agent not initialized", 500)
+    agent = get_agent(request)
 
     sender_type = payload.sender_type
     if sender_type not in ("guest", "user"):
@@ -126,8 +148,42 @@ async def create_message(
             sender_type=sender_type,
             sender_id=payload.sender_id,
             user_timezone=user_timezone,
+            control=RunControl.from_request(request),
         )
         apply_i18n(response, request, i18n_service.attach_chat_message_pair, lang, includeI18n)
         return response
+    except AgentBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except AgentCancelledError as exc:
+        raise HTTPException(status_code=cancelled_status_code(exc), detail=str(exc))
     except RuntimeError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.post("/api/chat/rooms/{room_id}/messages/stream")
+async def stream_message(
+    request: Request,
+    room_id: int,
+    payload: ChatMessageCreateRequest,
+) -> StreamingResponse:
+    engine = request.app.state.db_engine
+    ensure_found(chat_rooms_service.get_room(engine, room_id), "Room")
+
+    agent = get_agent(request)
+
+    sender_type = payload.sender_type
+    if sender_type not in ("guest", "user"):
+        sender_type = "guest"
+
+    events = chat_rooms_service.stream_message_pair(
+        engine=engine,
+        agent=agent,
+        room_id=room_id,
+        message=payload.message,
+        user_name=payload.user,
+        sender_type=sender_type,
+        sender_id=payload.sender_id,
+        user_timezone=request.headers.get("x-timezone"),
+        control=RunControl.from_request(request, watch_disconnect=False),
+    )
+    return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
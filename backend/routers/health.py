@@ -1,8 +1,16 @@
-﻿from fastapi import APIRouter
+﻿from fastapi import APIRouter, Request
+
+from ..utils.constants import AGENT_STATUS_WARMING
+from ..utils.metrics import metrics
 
 router = APIRouter()
 
 
 @router.get("/api/health")
-def health() -> dict:
-    return {"status": "ok"}
+def health(request: Request) -> dict:
+    return {"status": "ok", "agent": getattr(request.app.state, "agent_status", AGENT_STATUS_WARMING)}
+
+
+@router.get("/api/health/metrics")
+def health_metrics() -> dict:
+    return metrics.snapshot()
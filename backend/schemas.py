@@ -35,7 +35,7 @@ class ConversationLogResponse(BaseModel):
     user: str
     command: str
     commandI18n: Optional[str] = None
-    status: Literal["completed", "pending", "failed"]
+    status: Literal["completed", "pending", "failed", "cancelled"]
 
 class SafetyEnvironmentItem(BaseModel):
     key: str
@@ -0,0 +1,134 @@
+"""Per-worker pool of pre-built agent executors.
+
+워커 프로세스마다 에이전트 실행기를 AGENT_POOL_SIZE개 미리 만들어 두고, 실행 1회마다 하나를 빌려 씁니다.
+- 실행기마다 LLM 전용 httpx 클라이언트(동기/비동기)를 두어 keep-alive 연결을 실행 간에 재사용하고,
+  다른 실행기의 느린 스트림/끊긴 연결에 영향을 받지 않음
+- 대여는 FIFO, 실행이 끝나거나 취소되면 반드시 반납 (슬롯 제한은 agent_limiter가 먼저 적용)
+- 사용률/대기 수/대기 시간은 metrics `agent.pool`(gauge), `agent.pool.wait_ms`로 노출
+DB 연결은 실행기별로 고정하지 않고 실행 단위로 sql_agent.agent_run_context가 엔진 풀에서 1개를 빌립니다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", os.getenv("AGENT_MAX_CONCURRENCY", "8")))
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "4"))
+LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "120"))
+
+
+def create_http_clients() -> Dict[str, Any]:
+    """실행기 1개가 쓸 LLM HTTP 클라이언트 (AzureChatOpenAI의 http_client / http_async_client 인자)."""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_HTTP_KEEPALIVE_SECONDS,
+    )
+    return {
+        "http_client": httpx.Client(limits=limits),
+        "http_async_client": httpx.AsyncClient(limits=limits),
+    }
+
+
+class AgentExecutorPool:
+    """미리 만든 실행기 목록과 대여 통계."""
+
+    def __init__(self, executors: List[Any], clients: Optional[List[Dict[str, Any]]] = None) -> None:
+        if not executors:
+            raise ValueError("AgentExecutorPool needs at least one executor")
+        self.executors = executors
+        self.clients = clients or []
+        self._idle: Optional[asyncio.Queue] = None
+        self.created_at = monotonic()
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.busy_seconds = 0.0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    @classmethod
+    def build(cls, factory: Callable[[Dict[str, Any]], Any], size: int = AGENT_POOL_SIZE) -> "AgentExecutorPool":
+        """factory(http 클라이언트 kwargs)로 실행기를 size개 생성."""
+        clients = [create_http_clients() for _ in range(max(size, 1))]
+        executors = [factory(client_kwargs) for client_kwargs in clients]
+        logger.info("Agent executor pool ready (%d executors)", len(executors))
+        return cls(executors, clients)
+
+    @property
+    def size(self) -> int:
+        return len(self.executors)
+
+    def _get_idle(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for executor in self.executors:
+                self._idle.put_nowait(executor)
+        return self._idle
+
+    @asynccontextmanager
+    async def checkout(self) -> AsyncIterator[Any]:
+        idle = self._get_idle()
+        started = monotonic()
+        self.waiting += 1
+        try:
+            executor = await idle.get()
+        finally:
+            self.waiting -= 1
+
+        waited_ms = (monotonic() - started) * 1000
+        self.in_use += 1
+        self.checkouts += 1
+        self.wait_ms_total += waited_ms
+        self.wait_ms_max = max(self.wait_ms_max, waited_ms)
+        metrics.observe("agent.pool.wait_ms", waited_ms)
+        metrics.observe("agent.pool.in_use", self.in_use)
+
+        held = monotonic()
+        try:
+            yield executor
+        finally:
+            self.in_use -= 1
+            self.busy_seconds += monotonic() - held
+            idle.put_nowait(executor)
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = max(monotonic() - self.created_at, 1e-9)
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "idle": self.size - self.in_use,
+            "waiting": self.waiting,
+            "utilization": round(self.in_use / self.size, 3),
+            # 생성 이후 실행기들이 사용 중이었던 시간 비율 (워커 수/풀 크기 산정용)
+            "busy_ratio": round(self.busy_seconds / (uptime * self.size), 4),
+            "checkouts": self.checkouts,
+            "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 1) if self.checkouts else 0.0,
+            "wait_ms_max": round(self.wait_ms_max, 1),
+        }
+
+    async def aclose(self) -> None:
+        for client_kwargs in self.clients:
+            client_kwargs["http_client"].close()
+            await client_kwargs["http_async_client"].aclose()
+
+
+@asynccontextmanager
+async def checkout_executor(agent) -> AsyncIterator[Any]:
+    """AgentExecutorPool이면 실행기 1개를 빌리고, 단일 실행기(벤치마크 등)면 그대로 사용."""
+    if isinstance(agent, AgentExecutorPool):
+        async with agent.checkout() as executor:
+            yield executor
+    else:
+        yield agent
@@ -0,0 +1,252 @@
+"""Async agent execution with a dedicated concurrency limiter.
+
+에이전트 호출을 Starlette 기본 threadpool(run_in_threadpool) 대신 `ainvoke`로 실행합니다.
+LLM 대기는 이벤트 루프에서 처리되고, 동기 도구는 LangChain이 asyncio 기본 executor에서
+실행하므로 sync `def` 엔드포인트(시약/사용자/내보내기)의 worker thread를 점유하지 않습니다.
+동시 실행 수는 AGENT_MAX_CONCURRENCY로, 대기열 길이는 AGENT_MAX_QUEUE로 제한합니다.
+RunControl을 넘기면 마감 시각/클라이언트 연결 종료 시 에이전트 단계 사이에서 실행을 중단합니다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..utils.metrics import metrics
+from ..utils.question import is_context_dependent, question_hash
+from ..utils.single_flight import SingleFlight
+from .agent_pool import checkout_executor
+from .answer_cache import answer_cache, tracked_tables_in_sql
+from .few_shot_service import dynamic_few_shot
+from .llm_usage import TokenUsageCallback
+from .plan_cache import plan_cache, run_plan
+from .run_control import RunControl
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_DISCOVERY_TOOLS = {"sql_db_list_tables", "sql_db_schema"}
+
+
+class AgentBusyError(RuntimeError):
+    """Raised when the agent queue is full or the wait for a slot timed out."""
+
+
+class AgentConcurrencyLimiter:
+    """Bounded in-flight agent runs with a capped wait queue."""
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float) -> None:
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max(max_queue, 0)
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        semaphore = self._get_semaphore()
+        if self.in_flight + self.waiting >= self.max_concurrency + self.max_queue:
+            metrics.incr("agent.limiter.rejected")
+            raise AgentBusyError("Agent queue is full")
+
+        self.waiting += 1
+        started = monotonic()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.incr("agent.limiter.timeout")
+            raise AgentBusyError("Timed out waiting for an agent slot")
+        finally:
+            self.waiting -= 1
+
+        metrics.observe("agent.limiter.wait_ms", (monotonic() - started) * 1000)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+        }
+
+
+agent_limiter = AgentConcurrencyLimiter(
+    max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("AGENT_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("AGENT_QUEUE_TIMEOUT_SECONDS", "30")),
+)
+metrics.register_gauge("agent.limiter", agent_limiter.stats)
+
+
+async def ainvoke_agent(agent, agent_input: str, control: Optional[RunControl] = None) -> Dict[str, Any]:
+    """Run the agent natively async under the concurrency limiter (borrowing an executor from the pool)."""
+    from .. import sql_agent as agent_module
+
+    if control is None:
+        control = RunControl()
+    usage = TokenUsageCallback()
+    async with agent_limiter.slot(), checkout_executor(agent) as executor:
+        started = monotonic()
+        try:
+            # 실행 단위로 DB 연결 1개 공유 + 읽기 도구 결과 재사용 + 도구별 소요 시간 기록
+            with agent_module.agent_run_context() as run:
+                result = await control.run(
+                    executor.ainvoke({"input": agent_input}, config={"callbacks": control.callbacks() + [usage]})
+                )
+            result["tool_stats"] = run.summary()
+            result["token_usage"] = usage.summary()
+            return result
+        finally:
+            metrics.observe("agent.run_ms", (monotonic() - started) * 1000)
+
+
+def run_details(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """ChatLogs.details에 남길 실행 정보 (캐시 적중 종류, 병합 여부, 도구별 호출/소요 시간, 토큰 사용량)."""
+    if not result:
+        return None
+    details: Dict[str, Any] = {}
+    for key in ("cache", "shared"):
+        if result.get(key):
+            details[key] = result[key]
+    tools = (result.get("tool_stats") or {}).get("tools")
+    if tools:
+        details["tools"] = tools
+    if result.get("token_usage"):
+        details["tokens"] = result["token_usage"]
+    return details or None
+
+
+agent_flights = SingleFlight(
+    "agent_flight",
+    lock_ttl_seconds=int(os.getenv("SINGLE_FLIGHT_LOCK_TTL_SECONDS", "120")),
+    enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "1") == "1",
+)
+metrics.register_gauge("agent_flight", agent_flights.stats)
+
+
+def coalescing_key(question: str, agent_input: str) -> str:
+    """
+    동시 실행 병합 키. 질문만으로 답이 정해지면 정규화된 질문,
+    이전 대화를 가리키는 질문이면 대화 컨텍스트(agent_input)까지 포함합니다.
+    """
+    if is_context_dependent(question):
+        return question_hash(f"{question}\n{agent_input}")
+    return question_hash(question)
+
+
+async def answer_from_caches(engine, question: str) -> Optional[Dict[str, Any]]:
+    """
+    에이전트 실행 없이 답할 수 있으면 결과를 반환합니다.
+
+    1. 답변 캐시: 참조 테이블 버전이 같으면 저장된 답변 그대로
+    2. 플랜 캐시: 저장된 SQL을 재실행하고 결과만 템플릿/LLM 1회로 문장화
+    """
+    cached = await asyncio.to_thread(answer_cache.lookup, engine, question)
+    if cached is not None:
+        return {"output": cached, "cache": "answer"}
+
+    sql = plan_cache.get(question)
+    if sql is None:
+        return None
+
+    versions = await asyncio.to_thread(answer_cache.snapshot, engine) if answer_cache.eligible(question) else None
+    started = monotonic()
+    try:
+        columns, rows = await asyncio.to_thread(run_plan, engine, sql)
+    except Exception as exc:
+        # 스키마 변경 등으로 실패한 플랜은 폐기하고 에이전트로 위임
+        logger.warning("Plan replay failed, dropping plan: %s", exc)
+        plan_cache.forget(question)
+        metrics.incr("plan_cache.replay_failed")
+        return None
+    metrics.observe("plan_cache.replay_ms", (monotonic() - started) * 1000)
+
+    try:
+        async with agent_limiter.slot():
+            output = await plan_cache.word_answer(question, columns, rows)
+    except AgentBusyError:
+        raise
+    except Exception as exc:
+        logger.warning("Plan answer wording failed: %s", exc)
+        return None
+    if output is None:
+        return None
+
+    metrics.incr("plan_cache.hit")
+    answer_cache.store_tables(question, output, tracked_tables_in_sql(sql), versions)
+    return {"output": output, "cache": "plan"}
+
+
+def observe_agent_steps(intermediate_steps: Optional[List[Any]]) -> None:
+    """질문당 에이전트 단계 수와 스키마 탐색 도구 호출 수 (snapshot의 avg로 추이 확인)."""
+    steps = intermediate_steps or []
+    discovery = sum(
+        1 for step in steps
+        if isinstance(step, (list, tuple)) and getattr(step[0], "tool", None) in SCHEMA_DISCOVERY_TOOLS
+    )
+    metrics.observe("agent.steps", len(steps))
+    metrics.observe("agent.schema_discovery_calls", discovery)
+
+
+def remember_answer(
+    question: str,
+    output: str,
+    intermediate_steps: Optional[List[Any]],
+    versions: Optional[Dict[str, str]],
+) -> None:
+    """에이전트 실행 결과를 기록합니다 (단계 수 지표, 답변 캐시, 플랜 캐시)."""
+    observe_agent_steps(intermediate_steps)
+    answer_cache.store(question, output, intermediate_steps, versions)
+    plan_cache.record(question, intermediate_steps)
+
+
+async def answer_question(
+    engine,
+    agent,
+    question: str,
+    agent_input: str,
+    control: Optional[RunControl] = None,
+) -> Dict[str, Any]:
+    """
+    캐시(답변 → 플랜) → 에이전트 순으로 질문에 답합니다.
+
+    캐시 키는 사용자 질문(question)이며, 히스토리/시간 정보가 붙은 agent_input은
+    에이전트 실행에만 사용합니다. 캐시로 답한 경우 결과에 "cache"("answer"|"plan")가 포함됩니다.
+    """
+    if control is None:
+        control = RunControl()
+    cached = await answer_from_caches(engine, question)
+    if cached is not None:
+        return cached
+
+    # 같은 질문이 이미 실행 중이면(다른 방/워커 포함) 그 결과를 공유
+    flight = await control.run(agent_flights.acquire(coalescing_key(question, agent_input)))
+    if not flight.leader:
+        return {"output": flight.result, "shared": True}
+
+    try:
+        # 실행 중 데이터가 바뀌어도 stale 답변이 최신 버전으로 저장되지 않도록 실행 전 버전을 사용
+        versions = await asyncio.to_thread(answer_cache.snapshot, engine) if answer_cache.eligible(question) else None
+        result = await ainvoke_agent(agent, dynamic_few_shot.augment(question, agent_input), control)
+    except BaseException:
+        flight.fail()
+        raise
+    output = result.get("output", "")
+    flight.complete(output)
+    remember_answer(question, output, result.get("intermediate_steps"), versions)
+    return result
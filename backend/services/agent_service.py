@@ -1,12 +1,24 @@
+import logging
 import os
+import threading
+from time import monotonic
+
 from sqlalchemy import create_engine
-from langchain_community.utilities import SQLDatabase
 
-from .. import sql_agent as agent_module
+from .. import db_setup
 from ..repositories import users_repo, refresh_tokens_repo
+from ..utils.constants import AGENT_STATUS_FAILED, AGENT_STATUS_READY, AGENT_STATUS_WARMING
+from ..utils.metrics import metrics
 from ..utils.security import hash_password, validate_password_policy
+from .few_shot_service import dynamic_few_shot
+from .log_writer import start_log_writers
+from .plan_cache import plan_cache
+from .room_summary import estimate_tokens, room_summarizer
+from .schema_context import build_schema_context
 from .translation_service import TranslationService
 
+logger = logging.getLogger(__name__)
+
 
 def seed_test_users(engine) -> None:
     if os.getenv("SEED_TEST_USERS") != "1":
@@ -52,22 +64,109 @@ def seed_test_users(engine) -> None:
 
 
 def init_app_state(app) -> None:
-    agent_module.load_environment()
+    """
+    API가 바로 응답할 수 있는 것(엔진, 스키마, 번역 서비스)만 startup에서 준비합니다.
+    LangChain/OpenAI import와 에이전트 생성은 start_agent_warmup이 백그라운드에서 처리합니다.
+    """
+    db_setup.load_environment()
 
     engine = create_engine(
-        agent_module.get_connection_string(),
+        db_setup.get_connection_string(),
         pool_pre_ping=True,  # 쿼리 전 연결 유효성 검사
         pool_recycle=1800,   # 30분마다 연결 재생성 (Azure SQL 타임아웃 대응)
     )
-    agent_module.init_db_schema(engine)
-    agent_module.db_engine = engine
+    db_setup.init_db_schema(engine)
     refresh_tokens_repo.cleanup_refresh_tokens(engine)
     seed_test_users(engine)
 
-    db = SQLDatabase(engine)
-    llm = agent_module.get_azure_openai_llm()
-    agent_executor = agent_module.create_conversational_agent(llm, db)
-
     app.state.db_engine = engine
-    app.state.agent_executor = agent_executor
+    # ChatLogs/AuthLogs는 백그라운드 스레드에서 묶어서 저장 (종료 시 stop_log_writers로 drain)
+    start_log_writers(engine)
+    app.state.agent_pool = None
+    app.state.agent_status = AGENT_STATUS_WARMING
     app.state.translation_service = TranslationService(engine)
+
+
+def build_agent(app) -> None:
+    """에이전트 실행기 풀 생성 (sql_agent import, 스키마 조회, LLM/실행기 구성). 끝나면 agent_status=ready."""
+    from .. import sql_agent as agent_module
+    from .agent_pool import AgentExecutorPool
+    from .llm_cache import create_llm_cache
+    from .llm_pool import build_routed_llm, create_deployment_pool
+    from .sql_guard import GuardedSQLDatabase, parse_table_columns
+
+    engine = app.state.db_engine
+    agent_module.db_engine = engine
+
+    # 에이전트 대상 테이블만, 행 샘플링/전체 반사 없이 구성 (스키마는 prefix에 미리 주입)
+    # sql_db_query는 GuardedSQLDatabase를 거쳐 행 상한/SELECT * 제한/결과 요약이 적용됨
+    schema_document, table_info = build_schema_context(engine)
+    db = GuardedSQLDatabase(
+        engine,
+        include_tables=sorted(table_info),
+        sample_rows_in_table_info=0,
+        custom_table_info=table_info,
+        lazy_table_reflection=True,
+        table_columns=parse_table_columns(table_info),
+    )
+
+    # AZURE_OPENAI_DEPLOYMENTS에 배포가 여러 개면 지연시간/429 기반 라우팅 모델 사용 (상태는 실행기 간 공유)
+    deployment_pool = create_deployment_pool()
+
+    def make_llm(**kwargs):
+        if deployment_pool is not None:
+            return build_routed_llm(deployment_pool, **kwargs)
+        return agent_module.get_azure_openai_llm(**kwargs)
+
+    # 실행기마다 전용 HTTP 클라이언트를 가진 LLM으로 구성 (LLM 응답 캐시는 실행기 간 공유)
+    llm_cache = create_llm_cache()
+    agent_pool = AgentExecutorPool.build(
+        lambda client_kwargs: agent_module.create_conversational_agent(
+            make_llm(cache=llm_cache, **client_kwargs),
+            db,
+            schema_context=schema_document,
+            embed_examples=not dynamic_few_shot.enabled,
+        )
+    )
+    metrics.register_gauge("agent.pool", agent_pool.stats)
+    # 정적 prefix가 워커/배포 간에 같은지(프롬프트 캐시 적용 가능 여부) 해시로 확인
+    system_prompt = agent_module.build_system_prompt(schema_document, not dynamic_few_shot.enabled)
+    prompt_info = {
+        "prefix_sha": agent_module.prompt_fingerprint(system_prompt),
+        "prefix_tokens": estimate_tokens(system_prompt),
+    }
+    metrics.register_gauge("agent.prompt", lambda: prompt_info)
+    logger.info("Agent static prefix %(prefix_sha)s (~%(prefix_tokens)d tokens)", prompt_info)
+    dynamic_few_shot.configure(agent_module.FEW_SHOT_EXAMPLES, agent_module.EXAMPLE_TEMPLATE)
+    llm = make_llm()
+    plan_cache.llm = llm
+    room_summarizer.llm = llm
+
+    app.state.agent_pool = agent_pool
+    app.state.agent_status = AGENT_STATUS_READY
+
+
+def _warm_up(app) -> None:
+    started = monotonic()
+    try:
+        build_agent(app)
+    except Exception:
+        logger.exception("Agent warm-up failed")
+        app.state.agent_status = AGENT_STATUS_FAILED
+        return
+    metrics.observe("agent.warmup_ms", (monotonic() - started) * 1000)
+    logger.info("Agent ready (warm-up %.1fs)", monotonic() - started)
+
+
+def start_agent_warmup(app) -> threading.Thread:
+    """startup 직후 호출. 에이전트는 데몬 스레드에서 생성되고, 그동안 채팅은 warming 상태를 반환합니다."""
+    thread = threading.Thread(target=_warm_up, args=(app,), name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+async def shutdown_agent(app) -> None:
+    """실행기별 HTTP 클라이언트 정리."""
+    agent_pool = getattr(app.state, "agent_pool", None)
+    if agent_pool is not None:
+        await agent_pool.aclose()
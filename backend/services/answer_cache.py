@@ -0,0 +1,211 @@
+"""Data-versioned answer cache for repeated agent questions.
+
+키: 정규화된 질문 텍스트. 값: 답변 + 답변이 참조한 테이블 + 당시 테이블 버전.
+조회 시 참조 테이블의 현재 버전이 저장 당시와 같을 때만 캐시 답변을 사용합니다.
+추적 대상(Reagents/FallEvents/WeightLog) 밖의 테이블을 읽었거나 쓰기 도구를 호출한
+실행은 캐시하지 않습니다. "오늘/최근" 같은 상대 기간 질문이나 GETDATE/DATEADD를 쓴 SQL도
+시간이 지나면 답이 바뀌므로 캐시하지 않습니다.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from ..repositories import data_versions_repo
+from ..utils.metrics import metrics
+from ..utils.question import is_context_dependent, is_time_relative, question_hash
+from ..utils.tiered_cache import LRUTTLCache, TieredCache
+
+logger = logging.getLogger(__name__)
+
+TRACKED_TABLES = frozenset(data_versions_repo.TABLE_VERSION_PROBES)
+
+# 커스텀 도구가 읽는 테이블
+# (aggregate_lab_data는 집계 기간이 오늘 기준이라 데이터가 그대로여도 답이 바뀌므로 캐시 대상에서 제외)
+READ_TOOL_TABLES: Dict[str, Set[str]] = {
+    "get_storage_status": {"WeightLog"},
+    "fetch_pending_verification": {"FallEvents"},
+    "get_experiment_summary": {"FallEvents"},
+    "get_reagent_stock": {"Reagents"},
+}
+# 데이터를 읽지 않는 SQLDatabaseToolkit 도구
+METADATA_TOOLS = {"sql_db_list_tables", "sql_db_schema", "sql_db_query_checker"}
+SQL_QUERY_TOOL = "sql_db_query"
+
+_TABLE_REF_RE = re.compile(
+    r"\b(?:FROM|JOIN)\s+(?:\[?\w+\]?\.)?\[?(\w+)\]?",
+    re.IGNORECASE,
+)
+
+
+# 현재 시각 기준으로 기간을 계산하는 SQL (데이터가 그대로여도 결과가 바뀜)
+_TIME_RELATIVE_SQL_RE = re.compile(
+    r"\b(?:GETDATE|GETUTCDATE|SYSDATETIME|SYSUTCDATETIME|SYSDATETIMEOFFSET|CURRENT_TIMESTAMP|DATEADD|DATEDIFF)\b",
+    re.IGNORECASE,
+)
+
+
+def is_time_relative_sql(sql: str) -> bool:
+    return bool(_TIME_RELATIVE_SQL_RE.search(sql or ""))
+
+
+def tables_in_sql(sql: str) -> Set[str]:
+    return {match.group(1) for match in _TABLE_REF_RE.finditer(sql or "")}
+
+
+def tracked_tables_in_sql(sql: str) -> Optional[Set[str]]:
+    """SQL이 읽는 추적 테이블 집합. 추적 외 테이블을 참조하거나 현재 시각 기준 SQL이면 None."""
+    if is_time_relative_sql(sql):
+        return None
+    # 대소문자 무시 비교를 위해 추적 테이블명으로 정규화
+    canonical = {name.lower(): name for name in TRACKED_TABLES}
+    touched: Set[str] = set()
+    for table in tables_in_sql(sql):
+        name = canonical.get(table.lower())
+        if name is None:
+            return None
+        touched.add(name)
+    return touched
+
+
+def _tool_query(tool_input: Any) -> str:
+    if isinstance(tool_input, dict):
+        return str(tool_input.get("query") or "")
+    return str(tool_input or "")
+
+
+def tables_touched(intermediate_steps: Optional[List[Any]]) -> Optional[Set[str]]:
+    """
+    에이전트 실행이 읽은 추적 테이블 집합을 반환합니다.
+    캐시하면 안 되는 실행(쓰기 도구, 추적 외 테이블, 알 수 없는 도구)은 None.
+    """
+    touched: Set[str] = set()
+    for step in intermediate_steps or []:
+        action = step[0] if isinstance(step, (list, tuple)) else step
+        tool = getattr(action, "tool", None)
+        if tool in METADATA_TOOLS:
+            continue
+        if tool in READ_TOOL_TABLES:
+            touched |= READ_TOOL_TABLES[tool]
+            continue
+        if tool == SQL_QUERY_TOOL:
+            tables = tracked_tables_in_sql(_tool_query(getattr(action, "tool_input", None)))
+            if tables is None:
+                return None
+            touched |= tables
+            continue
+        return None
+    return touched or None
+
+
+class AnswerCache:
+    def __init__(self, cache: TieredCache, version_ttl_seconds: float, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._cache = cache
+        # 테이블 버전 프로브 결과를 짧게 메모이즈 (동시 요청이 매번 DB를 치지 않도록)
+        self._versions = LRUTTLCache(len(TRACKED_TABLES), version_ttl_seconds)
+
+    def eligible(self, question: str) -> bool:
+        return (
+            self.enabled
+            and bool(question and question.strip())
+            and not is_context_dependent(question)
+            and not is_time_relative(question)
+        )
+
+    def current_versions(self, engine, tables: Iterable[str]) -> Dict[str, str]:
+        versions: Dict[str, str] = {}
+        missing = []
+        for table in tables:
+            value = self._versions.get(table)
+            if value is None:
+                missing.append(table)
+            else:
+                versions[table] = value
+        if missing:
+            fetched = data_versions_repo.get_table_versions(engine, missing)
+            for table, value in fetched.items():
+                self._versions.set(table, value)
+            versions.update(fetched)
+        return versions
+
+    def snapshot(self, engine) -> Optional[Dict[str, str]]:
+        """에이전트 실행 전 추적 테이블 버전 (저장 시 이 버전으로 기록)."""
+        try:
+            return self.current_versions(engine, TRACKED_TABLES)
+        except Exception as exc:
+            logger.warning("Answer cache version probe failed: %s", exc)
+            return None
+
+    def lookup(self, engine, question: str) -> Optional[str]:
+        if not self.eligible(question):
+            return None
+        entry = self._cache.get(question_hash(question))
+        if not entry:
+            metrics.incr("answer_cache.miss")
+            return None
+
+        try:
+            current = self.current_versions(engine, entry.get("tables") or [])
+        except Exception as exc:
+            logger.warning("Answer cache version probe failed: %s", exc)
+            metrics.incr("answer_cache.miss")
+            return None
+
+        if current != entry.get("versions"):
+            metrics.incr("answer_cache.stale")
+            return None
+
+        metrics.incr("answer_cache.hit")
+        return entry.get("answer")
+
+    def store(
+        self,
+        question: str,
+        answer: str,
+        intermediate_steps: Optional[List[Any]],
+        versions: Optional[Dict[str, str]],
+    ) -> bool:
+        return self.store_tables(question, answer, tables_touched(intermediate_steps), versions)
+
+    def store_tables(
+        self,
+        question: str,
+        answer: str,
+        tables: Optional[Set[str]],
+        versions: Optional[Dict[str, str]],
+    ) -> bool:
+        if not self.eligible(question) or not answer or versions is None:
+            return False
+        if not tables:
+            metrics.incr("answer_cache.uncacheable")
+            return False
+
+        self._cache.set(
+            question_hash(question),
+            {
+                "answer": answer,
+                "tables": sorted(tables),
+                "versions": {table: versions.get(table) for table in sorted(tables)},
+            },
+        )
+        metrics.incr("answer_cache.store")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self._cache.stats()}
+
+
+answer_cache = AnswerCache(
+    TieredCache(
+        "answer_cache",
+        max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512")),
+        ttl_seconds=int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "600")),
+    ),
+    version_ttl_seconds=float(os.getenv("ANSWER_CACHE_VERSION_TTL_SECONDS", "2")),
+    enabled=os.getenv("ANSWER_CACHE_ENABLED", "1") == "1",
+)
+metrics.register_gauge("answer_cache", answer_cache.stats)
@@ -1,6 +1,7 @@
 from typing import Any, Dict, List, Optional
 
 from ..repositories import auth_logs_repo
+from . import log_writer
 
 
 _ALLOWED_EVENT_TYPES = {"login", "logout"}
@@ -17,8 +18,9 @@ def record_auth_event(
 ) -> None:
     if event_type not in _ALLOWED_EVENT_TYPES:
         return
-    auth_logs_repo.create_auth_log(
-        engine=engine,
+    # 로그인 응답을 기다리게 하지 않도록 write-behind 버퍼로 저장
+    log_writer.record_auth_log(
+        engine,
         user_id=user_id,
         email=email,
         event_type=event_type,
@@ -43,9 +45,10 @@ def count_recent_failed_logins(
     email: Optional[str],
     window_seconds: int,
 ) -> int:
+    # 아직 버퍼에 남아 있는 실패 기록도 합산해야 제한이 늦게 걸리지 않음
     return auth_logs_repo.count_recent_failed_logins(
         engine, ip_address, email, window_seconds
-    )
+    ) + log_writer.pending_failed_logins(ip_address, email, window_seconds)
 
 
 def delete_all_auth_logs(engine) -> int:
@@ -1,10 +1,11 @@
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, AsyncIterator
+import asyncio
+from contextlib import aclosing
 from datetime import datetime, timezone as tz
 from zoneinfo import ZoneInfo
+import logging
 
-from starlette.concurrency import run_in_threadpool
-
-from ..repositories import chat_rooms_repo, chat_logs_repo, accidents_repo
+from ..repositories import chat_rooms_repo
 from ..schemas import (
     ChatRoomResponse,
     ChatRoomListResponse,
@@ -13,10 +14,12 @@ from ..schemas import (
     ChatMessageCreateResponse,
 )
 from ..utils.constants import (
+    CURRENT_TURN_HEADER,
     MAX_HISTORY_MESSAGES,
     MAX_PREVIEW_LENGTH,
     DEFAULT_ROOM_TITLE,
     DEFAULT_ROOM_TYPE,
+    CHAT_STATUS_CANCELLED,
     CHAT_STATUS_COMPLETED,
     CHAT_STATUS_FAILED,
     ROLE_USER,
@@ -25,14 +28,32 @@ from ..utils.constants import (
     DEFAULT_SENDER_NAME,
     ASSISTANT_SENDER_NAME,
     SYSTEM_USER_NAME,
-    VERIFICATION_CONFIRMED,
-    VERIFICATION_FALSE_ALARM,
-    DEFAULT_VERIFY_SUBJECT,
-    RECENT_KEYWORDS,
-    ACCIDENT_KEYWORDS,
-    VERIFY_KEYWORDS,
-    REJECT_KEYWORDS,
+    SUMMARY_BATCH_MESSAGES,
+)
+from ..utils.metrics import metrics
+from ..utils.sse import format_sse
+from .agent_runner import (
+    AgentBusyError,
+    agent_flights,
+    agent_limiter,
+    answer_from_caches,
+    answer_question,
+    coalescing_key,
+    remember_answer,
+    run_details,
 )
+from .agent_pool import checkout_executor
+from .answer_cache import answer_cache
+from .few_shot_service import dynamic_few_shot
+from .llm_usage import TokenUsageCallback
+from .log_writer import record_chat_log
+from .intent_router import intent_router
+from .room_events import EVENT_ROOM_DELETED, ROOMS_CHANNEL, room_channel, room_events
+from .room_history import room_history
+from .room_summary import fallback_summary, fit_history_to_budget, room_summarizer
+from .run_control import CANCEL_REASON_DISCONNECTED, AgentCancelledError, RunControl
+
+logger = logging.getLogger(__name__)
 
 
 def get_user_local_time(user_timezone: Optional[str]) -> str:
@@ -49,18 +70,48 @@ def get_user_local_time(user_timezone: Optional[str]) -> str:
 
 
 def get_conversation_history(engine, room_id: int, limit: int = MAX_HISTORY_MESSAGES) -> List[Dict[str, Any]]:
-    """채팅방의 최근 대화 히스토리를 가져옵니다."""
-    rows = chat_rooms_repo.list_messages(engine, room_id, limit, cursor=None)
-    # list_messages는 DESC로 가져오므로 reverse하여 시간순 정렬
-    return list(reversed(rows))
+    """채팅방의 최근 대화 히스토리를 시간순으로 가져옵니다 (방별 최근 메시지 캐시 → 없으면 DB)."""
+    return room_history.history(engine, room_id, limit)
 
 
-def format_conversation_history(history: List[Dict[str, Any]]) -> str:
-    """대화 히스토리를 프롬프트 형식으로 변환합니다."""
-    if not history:
+def get_conversation_context(
+    engine,
+    room_id: int,
+    limit: int = MAX_HISTORY_MESSAGES,
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    롤링 요약 + 요약에 아직 반영되지 않은 최근 메시지를 토큰 예산 안으로 반환합니다.
+    방이 길어져도 프롬프트의 히스토리 부분 크기는 HISTORY_TOKEN_BUDGET 이하로 유지됩니다.
+    요약이 히스토리 창보다 뒤처져 빠지는 메시지가 있으면 간이 요약(fallback_summary)으로 덧붙입니다.
+    """
+    state = room_history.summary_state(engine, room_id)
+    summary = state.get("summary")
+    covered_id = state.get("summary_message_id") or 0
+    recent = get_conversation_history(engine, room_id, limit)
+    history = [row for row in recent if (row.get("message_id") or 0) > covered_id]
+    if history and len(history) == len(recent) == limit:
+        # 요약이 히스토리 창보다 뒤처짐(요약 실패/진행 중): 창 이전의 미요약 메시지를 LLM 없이 요약에 덧붙임
+        oldest_id = history[0].get("message_id") or 0
+        missed = [
+            row for row in chat_rooms_repo.list_messages_after(engine, room_id, covered_id, SUMMARY_BATCH_MESSAGES)
+            if (row.get("message_id") or 0) < oldest_id
+        ]
+        if missed:
+            metrics.incr("chat.summary.lag_fallback")
+            summary = fallback_summary(summary, missed)
+    return fit_history_to_budget(summary, history)
+
+
+def format_conversation_history(history: List[Dict[str, Any]], summary: Optional[str] = None) -> str:
+    """대화 요약/히스토리를 프롬프트 형식으로 변환합니다."""
+    if not history and not summary:
         return ""
 
-    lines = ["[이전 대화 기록]"]
+    lines = []
+    if summary:
+        lines.extend(["[이전 대화 요약]", summary, ""])
+    if history:
+        lines.append("[이전 대화 기록]")
     for msg in history:
         role = msg.get("role", "")
         content = msg.get("content", "")
@@ -111,41 +162,33 @@ def build_preview(content: str, max_len: int = MAX_PREVIEW_LENGTH) -> str:
     return cleaned[: max_len - 3].rstrip() + "..."
 
 
-def is_recent_accident_query(message: str) -> bool:
-    if not message:
-        return False
-    lower = message.lower()
-    has_recent = any(k in message for k in RECENT_KEYWORDS)
-    has_accident = any(k in message for k in ACCIDENT_KEYWORDS) or any(
-        k in lower for k in ACCIDENT_KEYWORDS
-    )
-    return has_recent and has_accident
-
-
-def wants_verify(message: str) -> bool:
-    if not message:
-        return False
-    lower = message.lower()
-    return any(k in message for k in VERIFY_KEYWORDS) or any(k in lower for k in VERIFY_KEYWORDS)
+def run_fast_path(engine, message: str, user_name: Optional[str]) -> Optional[str]:
+    """LLM을 거치지 않고 처리 가능한 질문이면 응답을 반환합니다. 아니면 None."""
+    return intent_router.route(engine, message, user_name)
 
 
-def wants_reject(message: str) -> bool:
-    if not message:
-        return False
-    lower = message.lower()
-    return any(k in message for k in REJECT_KEYWORDS) or any(k in lower for k in REJECT_KEYWORDS)
-
-
-def format_recent_accident(row: dict) -> str:
-    return (
-        "가장 최근의 미확인 사고는 다음과 같습니다:\n"
-        f"- 이벤트 ID: {row.get('EventID')}\n"
-        f"- 발생 시간: {row.get('Timestamp')}\n"
-        f"- 카메라: {row.get('CameraID')}\n"
-        f"- 위험 각도: {row.get('RiskAngle')}\n"
-        f"- 상태: {row.get('Status')}\n"
-        f"- 연관 실험 ID: {row.get('ExperimentID')}"
-    )
+def build_agent_input(
+    message: str,
+    user_timezone: Optional[str] = None,
+    conversation_history: Optional[List[Dict[str, Any]]] = None,
+    conversation_summary: Optional[str] = None,
+) -> str:
+    """
+    대화 요약/히스토리 + 시간 컨텍스트 + 현재 메시지를 조합하여 에이전트 입력을 만듭니다.
+
+    프롬프트 캐시는 앞에서부터 일치하는 부분만 재사용하므로 변하지 않는 것부터 배치합니다:
+    요약/히스토리(같은 방이면 이전 턴과 앞부분이 같음) → CURRENT_TURN_HEADER →
+    (선택된 예시, dynamic_few_shot.augment가 삽입) → 사용자 시간(매 요청 변경) → 질문.
+    """
+    input_parts = []
+    if conversation_history or conversation_summary:
+        input_parts.append(format_conversation_history(conversation_history or [], conversation_summary))
+    input_parts.append(CURRENT_TURN_HEADER)
+    if user_timezone:
+        user_local_time = get_user_local_time(user_timezone)
+        input_parts.append(f"[시스템 정보: 현재 사용자 시간은 {user_local_time} ({user_timezone}) 입니다.]")
+    input_parts.append(f"현재 질문: {message}")
+    return "\n".join(input_parts)
 
 
 async def generate_output(
@@ -155,60 +198,31 @@ async def generate_output(
     user_name: Optional[str],
     user_timezone: Optional[str] = None,
     conversation_history: Optional[List[Dict[str, Any]]] = None,
-) -> Tuple[str, str]:
+    conversation_summary: Optional[str] = None,
+    control: Optional[RunControl] = None,
+) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    """(output, status, details) 반환. details는 ChatLogs에 남길 실행 정보."""
     status = CHAT_STATUS_COMPLETED
-    output = ""
-
-    # 사용자 시간 컨텍스트 추가
-    user_time_context = ""
-    if user_timezone:
-        user_local_time = get_user_local_time(user_timezone)
-        user_time_context = f"\n[시스템 정보: 현재 사용자 시간은 {user_local_time} ({user_timezone}) 입니다.]"
+    details = None
 
-    # 대화 히스토리 포맷팅
-    conversation_context = ""
-    if conversation_history:
-        conversation_context = format_conversation_history(conversation_history)
-
-    if is_recent_accident_query(message):
-        row = accidents_repo.get_latest_unverified(engine)
-        if not row:
-            output = "미확인 사고가 없습니다."
-        else:
-            verify_subject = user_name or DEFAULT_VERIFY_SUBJECT
-            event_id = row.get("EventID")
-            if wants_verify(message):
-                accidents_repo.update_verification(
-                    engine, event_id, VERIFICATION_CONFIRMED, verify_subject
-                )
-                output = f"가장 최근의 사고(EventID: {event_id})가 확인 처리되었습니다."
-            elif wants_reject(message):
-                accidents_repo.update_verification(
-                    engine, event_id, VERIFICATION_FALSE_ALARM, verify_subject
-                )
-                output = f"가장 최근의 사고(EventID: {event_id})를 오탐으로 처리했습니다."
-            else:
-                output = format_recent_accident(row)
-
-        return output, status
+    fast_output = run_fast_path(engine, message, user_name)
+    if fast_output is not None:
+        return fast_output, status, details
 
     try:
-        # 대화 히스토리 + 시간 컨텍스트 + 현재 메시지를 조합하여 LLM에 전달
-        input_parts = []
-        if conversation_context:
-            input_parts.append(conversation_context)
-        if user_time_context:
-            input_parts.append(user_time_context.strip())
-        input_parts.append(f"현재 질문: {message}")
-
-        input_with_context = "\n".join(input_parts)
-        result = await run_in_threadpool(agent.invoke, {"input": input_with_context})
+        input_with_context = build_agent_input(
+            message, user_timezone, conversation_history, conversation_summary
+        )
+        result = await answer_question(engine, agent, message, input_with_context, control)
         output = result.get("output", "")
+        details = run_details(result)
+    except (AgentBusyError, AgentCancelledError):
+        raise
     except Exception:
         status = CHAT_STATUS_FAILED
         output = "Agent error"
 
-    return output, status
+    return output, status, details
 
 
 def list_rooms(engine, limit: int, cursor: Optional[int]) -> ChatRoomListResponse:
@@ -236,7 +250,9 @@ def create_room(engine, title: Optional[str]) -> ChatRoomResponse:
         room_type=DEFAULT_ROOM_TYPE,
         created_by_user_id=None,
     )
-    return row_to_room(row)
+    room = row_to_room(row)
+    room_events.publish(ROOMS_CHANNEL, "room_created", room)
+    return room
 
 
 def update_room(engine, room_id: int, title: Optional[str]) -> Optional[ChatRoomResponse]:
@@ -245,7 +261,9 @@ def update_room(engine, room_id: int, title: Optional[str]) -> Optional[ChatRoom
     row = chat_rooms_repo.update_room_title(engine, room_id, normalize_title(title))
     if not row:
         return None
-    return row_to_room(row)
+    room = row_to_room(row)
+    room_events.publish(ROOMS_CHANNEL, "room_updated", room)
+    return room
 
 
 def delete_room(engine, room_id: int) -> bool:
@@ -253,7 +271,12 @@ def delete_room(engine, room_id: int) -> bool:
     if not room:
         return False
     chat_rooms_repo.delete_messages_by_room(engine, room_id)
-    return chat_rooms_repo.delete_room(engine, room_id)
+    deleted = chat_rooms_repo.delete_room(engine, room_id)
+    room_history.invalidate(room_id)
+    if deleted:
+        for channel in (ROOMS_CHANNEL, room_channel(room_id)):
+            room_events.publish(channel, EVENT_ROOM_DELETED, {"id": str(room_id)})
+    return deleted
 
 
 def list_messages(
@@ -273,6 +296,100 @@ def list_messages(
     return ChatMessageListResponse(items=items, nextCursor=next_cursor)
 
 
+def new_user_message(
+    message: str,
+    user_name: Optional[str],
+    sender_type: str,
+    sender_id: Optional[str],
+    created_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    return {
+        "role": ROLE_USER,
+        "content": message,
+        "sender_type": sender_type,
+        "sender_id": sender_id,
+        "sender_name": user_name or DEFAULT_SENDER_NAME,
+        "created_at": created_at,
+    }
+
+
+def new_assistant_message(output: str) -> Dict[str, Any]:
+    return {
+        "role": ROLE_ASSISTANT,
+        "content": output or "",
+        "sender_type": SENDER_TYPE_ASSISTANT,
+        "sender_id": None,
+        "sender_name": ASSISTANT_SENDER_NAME,
+        "created_at": None,
+    }
+
+
+def save_messages(
+    engine,
+    room_id: int,
+    messages: List[Dict[str, Any]],
+    log_user_name: Optional[str] = None,
+    command: Optional[str] = None,
+    status: Optional[str] = None,
+    details: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    메시지들 + 방 미리보기(마지막 메시지) + ChatLogs(status가 있으면)를 DB 왕복 1회로 저장합니다.
+    저장된 행을 messages 순서로 반환합니다.
+    """
+    chat_log = None
+    if status is not None:
+        chat_log = {
+            "user_name": log_user_name or SYSTEM_USER_NAME,
+            "command": command,
+            "status": status,
+            "details": details,
+        }
+    preview = build_preview(messages[-1]["content"])
+    rows = chat_rooms_repo.save_messages_batch(engine, room_id, messages, preview, chat_log)
+    room_history.append(room_id, rows)
+    publish_saved_messages(room_id, rows, preview)
+    return rows
+
+
+def publish_saved_messages(room_id: int, rows: List[Dict[str, Any]], preview: str) -> None:
+    """저장된 메시지를 방 구독자에게, 미리보기 갱신을 방 목록 구독자에게 보냅니다."""
+    if not rows:
+        return
+    for row in rows:
+        room_events.publish(room_channel(room_id), "message", row_to_message(row))
+    room_events.publish(
+        ROOMS_CHANNEL,
+        "room",
+        {"id": str(room_id), "lastMessageAt": rows[-1].get("created_at"), "lastMessagePreview": preview},
+    )
+
+
+def save_user_message(
+    engine,
+    room_id: int,
+    message: str,
+    user_name: Optional[str],
+    sender_type: str,
+    sender_id: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    rows = save_messages(engine, room_id, [new_user_message(message, user_name, sender_type, sender_id)])
+    return rows[0] if rows else None
+
+
+def save_assistant_message(
+    engine,
+    room_id: int,
+    output: str,
+    message: str,
+    user_name: Optional[str],
+    status: str,
+    details: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    rows = save_messages(engine, room_id, [new_assistant_message(output)], user_name, message, status, details)
+    return rows[0] if rows else None
+
+
 async def create_message_pair(
     engine,
     agent,
@@ -282,44 +399,36 @@ async def create_message_pair(
     sender_type: str,
     sender_id: Optional[str],
     user_timezone: Optional[str] = None,
+    control: Optional[RunControl] = None,
 ) -> ChatMessageCreateResponse:
-    # 먼저 대화 히스토리를 가져옴 (현재 메시지 저장 전)
-    conversation_history = get_conversation_history(engine, room_id)
-
-    # 사용자 메시지 저장
-    user_row = chat_rooms_repo.create_message(
-        engine,
-        room_id=room_id,
-        role=ROLE_USER,
-        content=message,
-        sender_type=sender_type,
-        sender_id=sender_id,
-        sender_name=user_name or DEFAULT_SENDER_NAME,
-    )
-    chat_rooms_repo.update_room_last_message(engine, room_id, build_preview(message))
+    # 대화 요약/히스토리 조회. 사용자 메시지는 응답과 함께 한 번에 저장 (시각은 요청 시점 기록)
+    conversation_summary, conversation_history = get_conversation_context(engine, room_id)
+    requested_at = datetime.now(tz.utc).replace(tzinfo=None)
+    pending_user = new_user_message(message, user_name, sender_type, sender_id, requested_at)
 
     # 히스토리와 함께 응답 생성
-    output, status = await generate_output(
-        engine, agent, message, user_name, user_timezone,
-        conversation_history=conversation_history
-    )
+    try:
+        output, status, details = await generate_output(
+            engine, agent, message, user_name, user_timezone,
+            conversation_history=conversation_history,
+            conversation_summary=conversation_summary,
+            control=control,
+        )
+    except AgentBusyError:
+        save_messages(engine, room_id, [pending_user], user_name, message, CHAT_STATUS_FAILED)
+        raise
+    except AgentCancelledError:
+        save_messages(engine, room_id, [pending_user], user_name, message, CHAT_STATUS_CANCELLED)
+        raise
     if status == CHAT_STATUS_FAILED:
-        chat_logs_repo.insert_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status)
+        save_messages(engine, room_id, [pending_user], user_name, message, status)
         raise RuntimeError("Agent error")
 
-    assistant_row = chat_rooms_repo.create_message(
-        engine,
-        room_id=room_id,
-        role=ROLE_ASSISTANT,
-        content=output or "",
-        sender_type=SENDER_TYPE_ASSISTANT,
-        sender_id=None,
-        sender_name=ASSISTANT_SENDER_NAME,
+    # 사용자/어시스턴트 메시지 + 방 미리보기 + ChatLogs를 DB 왕복 1회로 저장
+    user_row, assistant_row = save_messages(
+        engine, room_id, [pending_user, new_assistant_message(output)], user_name, message, status, details
     )
-
-    preview = build_preview(assistant_row.get("content") or "")
-    chat_rooms_repo.update_room_last_message(engine, room_id, preview)
-    chat_logs_repo.insert_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status)
+    room_summarizer.schedule(engine, room_id)
 
     user_message = row_to_message(user_row)
     assistant_message = row_to_message(assistant_row)
@@ -329,3 +438,169 @@ async def create_message_pair(
         userMessage=user_message,
         assistantMessage=assistant_message,
     )
+
+
+def _is_root_event(event: Dict[str, Any]) -> bool:
+    return not event.get("parent_ids")
+
+
+async def stream_agent_events(
+    agent,
+    agent_input: str,
+    control: Optional[RunControl] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    에이전트의 astream_events(v2)를 (event, data) 튜플로 변환합니다.
+
+    - ("tool_start", {"name", "input"}): 도구 호출 시작
+    - ("tool_end", {"name"}): 도구 호출 종료
+    - ("token", {"text"}): 최종 답변 토큰
+    - ("final", {"output", "intermediate_steps", "tool_stats", "token_usage"}): 에이전트 최종 출력 (마지막 1회)
+
+    control이 있으면 LLM/도구 호출 직전과 각 이벤트 사이에서 마감 시각을 확인합니다.
+    """
+    from .. import sql_agent as agent_module
+
+    if control is None:
+        control = RunControl()
+    tokens: List[str] = []
+    final_output: Optional[str] = None
+    intermediate_steps: List[Any] = []
+    usage = TokenUsageCallback()
+
+    async with agent_limiter.slot(), checkout_executor(agent) as executor:
+        # 중간에 빠져나가도(취소/마감) 에이전트 스트림이 즉시 닫히도록 aclosing 사용
+        events = executor.astream_events(
+            {"input": agent_input}, config={"callbacks": control.callbacks() + [usage]}, version="v2"
+        )
+        with agent_module.agent_run_context() as run:
+            async with aclosing(events):
+                async for event in events:
+                    await control.check()
+                    kind = event.get("event")
+                    data = event.get("data") or {}
+
+                    if kind == "on_chat_model_stream":
+                        chunk = data.get("chunk")
+                        content = getattr(chunk, "content", "")
+                        # 도구 호출 인자 스트리밍(tool_call_chunks)은 답변 토큰이 아니므로 제외
+                        if isinstance(content, str) and content and not getattr(chunk, "tool_call_chunks", None):
+                            tokens.append(content)
+                            yield "token", {"text": content}
+                    elif kind == "on_tool_start":
+                        yield "tool_start", {"name": event.get("name"), "input": data.get("input")}
+                    elif kind == "on_tool_end":
+                        yield "tool_end", {"name": event.get("name")}
+                    elif kind == "on_chain_end" and _is_root_event(event):
+                        output = data.get("output")
+                        if isinstance(output, dict):
+                            final_output = output.get("output")
+                            intermediate_steps = output.get("intermediate_steps") or []
+
+    if final_output is None:
+        final_output = "".join(tokens)
+    elif not tokens and final_output:
+        # 마지막 LLM 호출이 LLM 캐시에서 나오면 토큰 이벤트가 없으므로 한 번에 전송
+        yield "token", {"text": final_output}
+    yield "final", {
+        "output": final_output,
+        "intermediate_steps": intermediate_steps,
+        "tool_stats": run.summary(),
+        "token_usage": usage.summary(),
+    }
+
+
+async def stream_message_pair(
+    engine,
+    agent,
+    room_id: int,
+    message: str,
+    user_name: Optional[str],
+    sender_type: str,
+    sender_id: Optional[str],
+    user_timezone: Optional[str] = None,
+    control: Optional[RunControl] = None,
+) -> AsyncIterator[str]:
+    """
+    create_message_pair의 SSE 스트리밍 버전.
+
+    user_message → (tool_start | tool_end | token)* → done 순서로 이벤트를 전송하며,
+    스트림이 끝나면 최종 어시스턴트 메시지를 저장합니다. 실패 시 error 이벤트를 보냅니다.
+    클라이언트 연결이 끊기면 Starlette가 제너레이터를 취소하므로 cancelled 상태로 기록만 합니다.
+    """
+    if control is None:
+        control = RunControl()
+    conversation_summary, conversation_history = get_conversation_context(engine, room_id)
+    user_row = save_user_message(engine, room_id, message, user_name, sender_type, sender_id)
+    yield format_sse("user_message", row_to_message(user_row))
+
+    status = CHAT_STATUS_COMPLETED
+    error_detail = "Agent error"
+    details = None
+    try:
+        # 라우터/캐시 오류도 헤더 전송 후이므로 error 이벤트로 보내고 로그를 남김
+        output = run_fast_path(engine, message, user_name)
+        if output is None:
+            cached = await answer_from_caches(engine, message)
+            output = cached.get("output") if cached else None
+            details = run_details(cached)
+        if output is not None:
+            yield format_sse("token", {"text": output})
+        else:
+            agent_input = dynamic_few_shot.augment(
+                message,
+                build_agent_input(message, user_timezone, conversation_history, conversation_summary),
+            )
+            flight = await control.run(agent_flights.acquire(coalescing_key(message, agent_input)))
+            if not flight.leader:
+                output = flight.result
+                details = {"shared": True}
+                yield format_sse("token", {"text": output})
+            else:
+                try:
+                    versions = (
+                        await asyncio.to_thread(answer_cache.snapshot, engine)
+                        if answer_cache.eligible(message)
+                        else None
+                    )
+                    async for event, data in stream_agent_events(agent, agent_input, control):
+                        if event == "final":
+                            output = data.get("output") or ""
+                            details = run_details(data)
+                            flight.complete(output)
+                            remember_answer(message, output, data.get("intermediate_steps"), versions)
+                        else:
+                            yield format_sse(event, data)
+                finally:
+                    # final 전에 실패/연결 종료된 경우 대기자가 재시도하도록 해제 (complete 이후엔 무시됨)
+                    flight.fail()
+    except AgentBusyError as exc:
+        error_detail = str(exc)
+        status = CHAT_STATUS_FAILED
+    except AgentCancelledError as exc:
+        error_detail = str(exc)
+        status = CHAT_STATUS_CANCELLED
+    except (asyncio.CancelledError, GeneratorExit):
+        # 클라이언트 연결 종료: 보낼 곳이 없으므로 기록만 하고 취소를 전파
+        metrics.incr(f"agent.cancelled.{CANCEL_REASON_DISCONNECTED}")
+        record_chat_log(engine, user_name or SYSTEM_USER_NAME, message, CHAT_STATUS_CANCELLED)
+        raise
+    except Exception as exc:
+        logger.warning("Agent streaming failed: %s", exc)
+        status = CHAT_STATUS_FAILED
+
+    if status in (CHAT_STATUS_FAILED, CHAT_STATUS_CANCELLED):
+        record_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status)
+        yield format_sse("error", {"detail": error_detail})
+        return
+
+    assistant_row = save_assistant_message(engine, room_id, output, message, user_name, status, details)
+    room_summarizer.schedule(engine, room_id)
+    yield format_sse(
+        "done",
+        ChatMessageCreateResponse(
+            roomId=str(room_id),
+            userMessage=row_to_message(user_row),
+            assistantMessage=row_to_message(assistant_row),
+        ),
+    )
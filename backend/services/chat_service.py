@@ -2,25 +2,46 @@
 
 from typing import Optional
 
-from starlette.concurrency import run_in_threadpool
-
-from ..repositories import chat_logs_repo
-from ..utils.constants import CHAT_STATUS_COMPLETED, CHAT_STATUS_FAILED, SYSTEM_USER_NAME
+from ..utils.constants import (
+    CHAT_STATUS_CANCELLED,
+    CHAT_STATUS_COMPLETED,
+    CHAT_STATUS_FAILED,
+    SYSTEM_USER_NAME,
+)
 from ..utils.translation import resolve_target_lang, should_translate
-
-
-async def invoke_agent(engine, agent, message: str, user_name: Optional[str]) -> tuple:
+from .agent_runner import answer_question, run_details
+from .intent_router import intent_router
+from .log_writer import record_chat_log
+from .run_control import AgentCancelledError, RunControl
+
+
+async def invoke_agent(
+    engine,
+    agent,
+    message: str,
+    user_name: Optional[str],
+    control: Optional[RunControl] = None,
+) -> tuple:
     """Run the agent and log the result. Returns (output, status)."""
     status = CHAT_STATUS_COMPLETED
+    fast_output = intent_router.route(engine, message, user_name)
+    if fast_output is not None:
+        record_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status)
+        return fast_output, status
+
     try:
-        result = await run_in_threadpool(agent.invoke, {"input": message})
+        result = await answer_question(engine, agent, message, message, control)
         output = result.get("output", "")
+        details = run_details(result)
+    except AgentCancelledError:
+        record_chat_log(engine, user_name or SYSTEM_USER_NAME, message, CHAT_STATUS_CANCELLED)
+        raise
     except Exception as exc:
         status = CHAT_STATUS_FAILED
-        chat_logs_repo.insert_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status)
+        record_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status)
         raise exc
 
-    chat_logs_repo.insert_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status)
+    record_chat_log(engine, user_name or SYSTEM_USER_NAME, message, status, details)
     return output, status
 
 
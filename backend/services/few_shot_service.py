@@ -0,0 +1,69 @@
+"""Dynamic few-shot: append only the examples relevant to each question.
+
+FEW_SHOT_MODE=dynamic 이면 시스템 prefix에서 예제를 빼 정적으로 유지하고(프롬프트 캐시에 유리),
+질문마다 TF-IDF로 고른 상위 FEW_SHOT_TOP_K개 예제만 사용자 메시지에 붙입니다.
+대화 컨텍스트가 있으면 그 뒤, [현재 요청] 앞에 넣어 방 단위로 안정적인 앞부분을 유지합니다.
+FEW_SHOT_MODE=static 이면 기존처럼 모든 예제를 prefix에 포함합니다.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+from ..utils.constants import CURRENT_TURN_HEADER
+from ..utils.few_shot import TfidfExampleSelector, format_examples
+from ..utils.metrics import metrics
+
+FEW_SHOT_MODE_STATIC = "static"
+FEW_SHOT_MODE_DYNAMIC = "dynamic"
+
+
+class DynamicFewShot:
+    def __init__(self, mode: str, top_k: int, min_score: float) -> None:
+        self.mode = mode if mode in (FEW_SHOT_MODE_STATIC, FEW_SHOT_MODE_DYNAMIC) else FEW_SHOT_MODE_DYNAMIC
+        self.top_k = max(top_k, 1)
+        self.min_score = min_score
+        self.template = ""
+        self._selector: Optional[TfidfExampleSelector] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == FEW_SHOT_MODE_DYNAMIC
+
+    def configure(self, examples: Sequence[Mapping[str, str]], template: str) -> None:
+        """init_app_state에서 sql_agent의 예제/포맷으로 한 번 호출합니다."""
+        self.template = template
+        self._selector = TfidfExampleSelector(examples)
+
+    def augment(self, question: str, agent_input: str) -> str:
+        """
+        선택된 예제를 에이전트 입력에 붙입니다. static 모드거나 미설정이면 그대로 반환.
+        입력에 CURRENT_TURN_HEADER가 있으면 대화 컨텍스트 뒤(이번 턴 앞)에, 없으면 맨 앞에 넣습니다.
+        """
+        if not self.enabled or self._selector is None:
+            return agent_input
+        selected = self._selector.select(question, self.top_k, self.min_score)
+        metrics.observe("few_shot.selected", len(selected))
+        if not selected:
+            return agent_input
+        block = f"[참고 예시]\n{format_examples(selected, self.template)}\n\n"
+        context, header, turn = agent_input.rpartition(CURRENT_TURN_HEADER)
+        if not header:
+            return f"{block}{agent_input}"
+        return f"{context}{block}{header}{turn}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "top_k": self.top_k,
+            "examples": len(self._selector.examples) if self._selector else 0,
+        }
+
+
+dynamic_few_shot = DynamicFewShot(
+    mode=os.getenv("FEW_SHOT_MODE", FEW_SHOT_MODE_DYNAMIC).lower(),
+    top_k=int(os.getenv("FEW_SHOT_TOP_K", "4")),
+    min_score=float(os.getenv("FEW_SHOT_MIN_SCORE", "0.05")),
+)
+metrics.register_gauge("few_shot", dynamic_few_shot.stats)
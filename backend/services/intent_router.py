@@ -0,0 +1,308 @@
+"""Deterministic intent fast-path in front of the SQL agent.
+
+자주 들어오는 정형 질문("Alpha 비어있어?", "황산 얼마나 남았어?")은 규칙 테이블에서
+키워드/정규식으로 판별한 뒤 sql_agent의 도구를 직접 호출해 LLM 없이 응답합니다.
+규칙은 등록 순서대로 평가되며, 핸들러가 None을 반환하면 다음 단계(LLM 에이전트)로 넘어갑니다.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from ..repositories import accidents_repo
+from ..utils.constants import (
+    ACCIDENT_KEYWORDS,
+    ANALYTIC_KEYWORDS,
+    DEFAULT_VERIFY_SUBJECT,
+    GENERIC_REAGENT_WORDS,
+    KNOWN_STORAGE_IDS,
+    NON_STOCK_KEYWORDS,
+    PENDING_KEYWORDS,
+    RECENT_KEYWORDS,
+    REJECT_KEYWORDS,
+    STOCK_KEYWORDS,
+    STORAGE_KEYWORDS,
+    SUMMARY_KEYWORDS,
+    VERIFICATION_CONFIRMED,
+    VERIFICATION_FALSE_ALARM,
+    VERIFY_KEYWORDS,
+)
+from ..utils.metrics import metrics
+
+# handler(engine, message, args, user_name) -> 응답 문자열 또는 None(LLM으로 위임)
+IntentHandler = Callable[[Any, str, Dict[str, str], Optional[str]], Optional[str]]
+
+
+def compile_keywords(keywords: Sequence[str]) -> Pattern[str]:
+    """키워드 목록을 대소문자 무시 단일 정규식으로 컴파일합니다."""
+    return re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+
+
+@dataclass
+class IntentRule:
+    name: str
+    handler: IntentHandler
+    # 각 그룹에서 최소 하나의 키워드가 포함되어야 함 (그룹 간 AND, 그룹 내 OR)
+    keyword_groups: Tuple[Sequence[str], ...] = ()
+    # 명명 그룹(?P<name>...)이 핸들러 인자로 전달됨
+    pattern: Optional[Pattern[str]] = None
+    exclude: Sequence[str] = ()
+    _keyword_res: List[Pattern[str]] = field(init=False, repr=False)
+    _exclude_re: Optional[Pattern[str]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._keyword_res = [compile_keywords(group) for group in self.keyword_groups]
+        self._exclude_re = compile_keywords(self.exclude) if self.exclude else None
+
+    def match(self, message: str) -> Optional[Dict[str, str]]:
+        if self._exclude_re is not None and self._exclude_re.search(message):
+            return None
+        if not all(regex.search(message) for regex in self._keyword_res):
+            return None
+        if self.pattern is None:
+            return {}
+        found = self.pattern.search(message)
+        if not found:
+            return None
+        return {key: value for key, value in found.groupdict().items() if value}
+
+
+class IntentRouter:
+    """Ordered rule table with hit-rate counters."""
+
+    def __init__(self) -> None:
+        self._rules: List[IntentRule] = []
+        self._lock = Lock()
+        self._counts: Dict[str, int] = {"requests": 0, "hits": 0, "misses": 0, "fallthrough": 0}
+        self._by_intent: Dict[str, int] = {}
+
+    def register(self, rule: IntentRule) -> None:
+        self._rules.append(rule)
+
+    def route(self, engine, message: str, user_name: Optional[str] = None) -> Optional[str]:
+        self._count("requests")
+        if not message or not message.strip():
+            self._count("misses")
+            return None
+
+        for rule in self._rules:
+            args = rule.match(message)
+            if args is None:
+                continue
+            output = rule.handler(engine, message, args, user_name)
+            if output is None:
+                self._count("fallthrough")
+                metrics.incr(f"intent_router.fallthrough.{rule.name}")
+                continue
+            self._count("hits")
+            with self._lock:
+                self._by_intent[rule.name] = self._by_intent.get(rule.name, 0) + 1
+            metrics.incr(f"intent_router.hit.{rule.name}")
+            return output
+
+        self._count("misses")
+        return None
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._counts["requests"]
+            return {
+                **self._counts,
+                "hit_rate": round(self._counts["hits"] / requests, 4) if requests else 0.0,
+                "by_intent": dict(self._by_intent),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------------
+
+def wants_verify(message: str) -> bool:
+    if not message:
+        return False
+    lower = message.lower()
+    return any(k in message for k in VERIFY_KEYWORDS) or any(k in lower for k in VERIFY_KEYWORDS)
+
+
+def wants_reject(message: str) -> bool:
+    if not message:
+        return False
+    lower = message.lower()
+    return any(k in message for k in REJECT_KEYWORDS) or any(k in lower for k in REJECT_KEYWORDS)
+
+
+def format_recent_accident(row: dict) -> str:
+    return (
+        "가장 최근의 미확인 사고는 다음과 같습니다:\n"
+        f"- 이벤트 ID: {row.get('EventID')}\n"
+        f"- 발생 시간: {row.get('Timestamp')}\n"
+        f"- 카메라: {row.get('CameraID')}\n"
+        f"- 위험 각도: {row.get('RiskAngle')}\n"
+        f"- 상태: {row.get('Status')}\n"
+        f"- 연관 실험 ID: {row.get('ExperimentID')}"
+    )
+
+
+def _tool_failed(output: str) -> bool:
+    # "No data found for Storage/Experiment ..." → ID를 잘못 뽑았을 수 있으므로 LLM 에이전트로 위임
+    return (
+        output.startswith("Error")
+        or output.startswith("No data found")
+        or output == "Database engine not initialized."
+    )
+
+
+def handle_recent_accident(engine, message: str, args: Dict[str, str], user_name: Optional[str]) -> Optional[str]:
+    row = accidents_repo.get_latest_unverified(engine)
+    if not row:
+        return "미확인 사고가 없습니다."
+
+    verify_subject = user_name or DEFAULT_VERIFY_SUBJECT
+    event_id = row.get("EventID")
+    if wants_verify(message):
+        accidents_repo.update_verification(
+            engine, event_id, VERIFICATION_CONFIRMED, verify_subject
+        )
+        return f"가장 최근의 사고(EventID: {event_id})가 확인 처리되었습니다."
+    if wants_reject(message):
+        accidents_repo.update_verification(
+            engine, event_id, VERIFICATION_FALSE_ALARM, verify_subject
+        )
+        return f"가장 최근의 사고(EventID: {event_id})를 오탐으로 처리했습니다."
+    return format_recent_accident(row)
+
+
+def _agent_tools():
+    """도구가 정의된 sql_agent는 LangChain을 끌어오므로 처음 사용할 때 import (API 시작 지연 방지)."""
+    from .. import sql_agent
+
+    return sql_agent
+
+
+def handle_pending_verification(engine, message: str, args: Dict[str, str], user_name: Optional[str]) -> Optional[str]:
+    output = _agent_tools().fetch_pending_verification.invoke({})
+    if _tool_failed(output):
+        return None
+    if output.startswith("No pending"):
+        return "확인 대기 중인 사고가 없습니다."
+    return f"확인 대기 중인 사고 목록입니다:\n{output}"
+
+
+def handle_experiment_summary(engine, message: str, args: Dict[str, str], user_name: Optional[str]) -> Optional[str]:
+    experiment_id = args.get("experiment_id")
+    if not experiment_id:
+        return None
+    output = _agent_tools().get_experiment_summary.invoke({"experiment_id": experiment_id})
+    if _tool_failed(output):
+        return None
+    return output
+
+
+def handle_storage_status(engine, message: str, args: Dict[str, str], user_name: Optional[str]) -> Optional[str]:
+    storage_id = args.get("storage_id") or args.get("storage_ref")
+    if not storage_id:
+        return None
+    output = _agent_tools().get_storage_status.invoke({"storage_id": storage_id})
+    if _tool_failed(output):
+        return None
+    return f"'{storage_id}' 저울 상태입니다:\n{output}"
+
+
+_PARTICLE_SUFFIXES = ("이", "가", "은", "는", "의", "도", "을", "를")
+
+
+def _clean_reagent_name(raw: str) -> Optional[str]:
+    name = raw.strip()
+    if len(name) > 2 and name.endswith(_PARTICLE_SUFFIXES):
+        name = name[:-1]
+    if not name or name.lower() in GENERIC_REAGENT_WORDS:
+        return None
+    return name
+
+
+def handle_reagent_stock(engine, message: str, args: Dict[str, str], user_name: Optional[str]) -> Optional[str]:
+    name = _clean_reagent_name(args.get("reagent_name", ""))
+    if not name:
+        return None
+    output = _agent_tools().get_reagent_stock.invoke({"reagent_name": name})
+    # 한글/영문 표기 차이로 못 찾은 경우 LLM 에이전트가 동의어로 재검색하도록 위임
+    if _tool_failed(output) or output.startswith(_agent_tools().REAGENT_NOT_FOUND_PREFIX):
+        return None
+    return f"'{name}' 재고 조회 결과입니다:\n{output}"
+
+
+# ---------------------------------------------------------------------------
+# Default rule table
+# ---------------------------------------------------------------------------
+
+EXPERIMENT_ID_PATTERN = re.compile(
+    r"(?<![\w-])['\"‘’“”]?(?P<experiment_id>EXP[_-][A-Za-z0-9][\w-]*)['\"‘’“”]?",
+    re.IGNORECASE,
+)
+# 명시적인 저장소 ID만 인정: 알려진 ID(Alpha, Beta ...) 또는 "Storage-X"/"Scale X" 형태
+STORAGE_ID_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9_])(?:"
+    r"(?P<storage_id>" + "|".join(re.escape(sid) for sid in KNOWN_STORAGE_IDS) + r")"
+    r"|(?i:storage|scale)[-_ ]?(?P<storage_ref>[A-Z0-9][A-Za-z0-9_-]*)"
+    r")(?![A-Za-z0-9_])"
+)
+REAGENT_STOCK_PATTERN = re.compile(
+    r"(?<![가-힣A-Za-z0-9])(?P<reagent_name>[가-힣A-Za-z0-9()\-]{2,}?)(?:이|가|은|는|의|도)?\s*"
+    r"(?:재고|잔량|얼마나\s*남|몇\s*\S*\s*남|남았|남아)"
+    r"|how\s+much\s+(?P<reagent_name_en>[A-Za-z0-9()\- ]+?)\s+(?:is\s+|are\s+)?left",
+    re.IGNORECASE,
+)
+
+
+def _handle_reagent_stock_any(engine, message: str, args: Dict[str, str], user_name: Optional[str]) -> Optional[str]:
+    if "reagent_name_en" in args and "reagent_name" not in args:
+        args = {"reagent_name": args["reagent_name_en"]}
+    return handle_reagent_stock(engine, message, args, user_name)
+
+
+def build_default_router() -> IntentRouter:
+    router = IntentRouter()
+    router.register(IntentRule(
+        name="recent_accident",
+        handler=handle_recent_accident,
+        keyword_groups=(RECENT_KEYWORDS, ACCIDENT_KEYWORDS),
+        # "최근 7일간 사고 추이" 같은 집계 질문은 단건 조회가 아니므로 LLM으로 위임
+        exclude=ANALYTIC_KEYWORDS,
+    ))
+    router.register(IntentRule(
+        name="pending_verification",
+        handler=handle_pending_verification,
+        keyword_groups=(PENDING_KEYWORDS, ACCIDENT_KEYWORDS),
+    ))
+    router.register(IntentRule(
+        name="experiment_summary",
+        handler=handle_experiment_summary,
+        keyword_groups=(SUMMARY_KEYWORDS,),
+        pattern=EXPERIMENT_ID_PATTERN,
+    ))
+    router.register(IntentRule(
+        name="reagent_stock",
+        handler=_handle_reagent_stock_any,
+        keyword_groups=(STOCK_KEYWORDS,),
+        pattern=REAGENT_STOCK_PATTERN,
+        exclude=NON_STOCK_KEYWORDS,
+    ))
+    router.register(IntentRule(
+        name="storage_status",
+        handler=handle_storage_status,
+        keyword_groups=(STORAGE_KEYWORDS,),
+        pattern=STORAGE_ID_PATTERN,
+        exclude=("재고", "사고", "실험", "시약 목록"),
+    ))
+    return router
+
+
+intent_router = build_default_router()
+metrics.register_gauge("intent_router", intent_router.stats)
@@ -0,0 +1,294 @@
+"""LangChain LLM response cache for the agent's chat model (temperature 0 only).
+
+에이전트 실행마다 같은 하위 프롬프트(쿼리 체커, 같은 도구 결과에 대한 다음 단계 등)로
+동일한 LLM 호출이 반복됩니다. 메시지 목록 전체 + 모델 파라미터(배포, temperature, 바인딩된 도구)를
+키로 응답을 저장해 같은 호출은 API를 거치지 않고 돌려줍니다.
+
+- 저장소: Redis(REDIS_URL 설정 시, 워커 간 공유) → 미사용/장애 시 로컬 SQLite 파일
+- 만료: LLM_CACHE_TTL_SECONDS, 크기: LLM_CACHE_MAX_ENTRIES (초과분은 가장 오래 쓰이지 않은 항목부터 삭제)
+- temperature가 0이 아닌 호출은 조회/저장하지 않음
+- metrics: llm_cache.hit / llm_cache.miss / llm_cache.skipped / llm_cache.error, gauge `llm_cache`
+캐시에서 나온 응답은 response_metadata["llm_cache"]="hit"로 표시하고 usage는 비웁니다
+(API 토큰이 쓰이지 않았으므로 llm_usage 집계에서 제외).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+
+from ..utils.metrics import metrics
+from ..utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_HIT = "hit"
+REDIS_PREFIX = "llm_cache"
+REDIS_INDEX_KEY = f"{REDIS_PREFIX}:index"
+
+_TEMPERATURE_REPR = re.compile(r"\('temperature', ([^)]+)\)")
+_DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llm_cache.sqlite")
+
+
+def llm_temperature(llm_string: str) -> Optional[float]:
+    """LangChain llm_string에서 temperature 추출 (직렬화 JSON 또는 파라미터 repr 형식). 없으면 None."""
+    serialized, _, params = llm_string.partition("---")
+    try:
+        value = json.loads(serialized).get("kwargs", {}).get("temperature")
+    except (ValueError, AttributeError):
+        value = None
+    if value is None:
+        match = _TEMPERATURE_REPR.search(params or serialized)
+        value = match.group(1) if match else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def serialize_generations(generations: Sequence[Any]) -> Optional[str]:
+    items = []
+    for generation in generations:
+        message = getattr(generation, "message", None)
+        if message is None:
+            return None
+        items.append({"message": message_to_dict(message), "generation_info": generation.generation_info})
+    return json.dumps(items, ensure_ascii=False)
+
+
+def deserialize_generations(raw: str) -> List[ChatGeneration]:
+    generations = []
+    for item in json.loads(raw):
+        message = messages_from_dict([item["message"]])[0]
+        # 캐시 응답 표시 + API 토큰 사용량 제거
+        message.response_metadata = {**message.response_metadata, "llm_cache": LLM_CACHE_HIT}
+        if hasattr(message, "usage_metadata"):
+            message.usage_metadata = None
+        generations.append(ChatGeneration(message=message, generation_info=item.get("generation_info")))
+    return generations
+
+
+class SQLiteStore:
+    """로컬 SQLite 저장소 (만료 + LRU 크기 제한). 같은 파일을 여러 워커가 공유할 수 있음."""
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max(max_entries, 1)
+        self.evictions = 0
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_used_at ON llm_cache (used_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl_seconds, now),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            excess = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY used_at LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class RedisStore:
+    """Redis 저장소. 값은 SETEX(TTL), 크기 제한은 사용 시각 ZSET 인덱스로 오래된 항목부터 삭제."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(max_entries, 1)
+        self.evictions = 0
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"{REDIS_PREFIX}:{key}"
+
+    def get(self, r, key: str) -> Optional[str]:
+        raw = r.get(self._key(key))
+        if raw is not None:
+            r.zadd(REDIS_INDEX_KEY, {key: time.time()})
+        return raw
+
+    def set(self, r, key: str, value: str, ttl_seconds: int) -> None:
+        now = time.time()
+        pipe = r.pipeline()
+        pipe.setex(self._key(key), ttl_seconds, value)
+        pipe.zadd(REDIS_INDEX_KEY, {key: now})
+        # TTL이 지난 항목은 인덱스에서도 제거
+        pipe.zremrangebyscore(REDIS_INDEX_KEY, "-inf", now - ttl_seconds)
+        pipe.zcard(REDIS_INDEX_KEY)
+        size = pipe.execute()[-1]
+        excess = size - self.max_entries
+        if excess > 0:
+            evicted = [member for member, _ in r.zpopmin(REDIS_INDEX_KEY, excess)]
+            if evicted:
+                r.delete(*(self._key(member) for member in evicted))
+                self.evictions += len(evicted)
+
+    def clear(self, r) -> None:
+        members = r.zrange(REDIS_INDEX_KEY, 0, -1)
+        if members:
+            r.delete(*(self._key(member) for member in members))
+        r.delete(REDIS_INDEX_KEY)
+
+    def size(self, r) -> int:
+        return r.zcard(REDIS_INDEX_KEY)
+
+
+class AgentLLMCache(BaseCache):
+    """temperature 0 호출만 저장하는 LangChain BaseCache (Redis → SQLite 폴백)."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int, sqlite_path: str) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.redis_store = RedisStore(max_entries)
+        self.sqlite_store = SQLiteStore(sqlite_path, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    @staticmethod
+    def eligible(llm_string: str) -> bool:
+        return llm_temperature(llm_string) == 0
+
+    def _read(self, key: str) -> Optional[str]:
+        r = get_redis()
+        if r is not None:
+            try:
+                return self.redis_store.get(r, key)
+            except Exception as exc:
+                logger.warning("LLM cache Redis read failed, using SQLite: %s", exc)
+                metrics.incr("llm_cache.error")
+        return self.sqlite_store.get(key)
+
+    def _write(self, key: str, value: str) -> None:
+        r = get_redis()
+        if r is not None:
+            try:
+                self.redis_store.set(r, key, value, self.ttl_seconds)
+                return
+            except Exception as exc:
+                logger.warning("LLM cache Redis write failed, using SQLite: %s", exc)
+                metrics.incr("llm_cache.error")
+        self.sqlite_store.set(key, value, self.ttl_seconds)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if not self.eligible(llm_string):
+            self.skipped += 1
+            metrics.incr("llm_cache.skipped")
+            return None
+        try:
+            raw = self._read(cache_key(prompt, llm_string))
+            generations = deserialize_generations(raw) if raw is not None else None
+        except Exception as exc:
+            logger.warning("LLM cache lookup failed: %s", exc)
+            metrics.incr("llm_cache.error")
+            generations = None
+        if generations is None:
+            self.misses += 1
+            metrics.incr("llm_cache.miss")
+            return None
+        self.hits += 1
+        metrics.incr("llm_cache.hit")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if not self.eligible(llm_string):
+            return
+        value = serialize_generations(return_val)
+        if value is None:
+            return
+        try:
+            self._write(cache_key(prompt, llm_string), value)
+        except Exception as exc:
+            logger.warning("LLM cache write failed: %s", exc)
+            metrics.incr("llm_cache.error")
+
+    def clear(self, **kwargs: Any) -> None:
+        r = get_redis()
+        if r is not None:
+            try:
+                self.redis_store.clear(r)
+            except Exception as exc:
+                logger.warning("LLM cache Redis clear failed: %s", exc)
+        self.sqlite_store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        r = get_redis()
+        return {
+            "backend": "redis" if r is not None else "sqlite",
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.redis_store.evictions + self.sqlite_store.evictions,
+        }
+
+
+def create_llm_cache() -> Optional[AgentLLMCache]:
+    """LLM_CACHE_ENABLED=1이면 AgentLLMCache (gauge `llm_cache` 등록), 아니면 None."""
+    if os.getenv("LLM_CACHE_ENABLED", "1") != "1":
+        return None
+    cache = AgentLLMCache(
+        ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600")),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+        sqlite_path=os.getenv("LLM_CACHE_SQLITE_PATH", _DEFAULT_SQLITE_PATH),
+    )
+    metrics.register_gauge("llm_cache", cache.stats)
+    return cache
@@ -0,0 +1,395 @@
+"""Latency-aware routing across several Azure OpenAI deployments.
+
+AZURE_OPENAI_DEPLOYMENTS에 배포를 2개 이상 지정하면 하나의 채팅 모델처럼 동작하는
+RoutedChatModel을 만듭니다 (에이전트, 플랜 캐시, 방 요약이 같은 풀을 공유).
+- 선택: 쿨다운이 아닌 배포 중 EWMA 지연시간 × (진행 중 요청 + 1)이 가장 작은 배포
+  (아직 샘플이 없는 배포 우선, LLM_POOL_EXPLORE_RATE 확률로 다른 배포를 탐색해 EWMA 갱신)
+- 429: Retry-After(없으면 LLM_POOL_COOLDOWN_SECONDS, 연속 429마다 2배) 동안 제외하고 다음 배포로 재시도
+- 5xx/404/연결 오류/타임아웃: 다음 배포로 재시도, 연속 LLM_POOL_FAILURE_THRESHOLD회면 쿨다운
+- 400 등 요청 자체 오류는 재시도하지 않음
+- 스트리밍은 첫 청크를 받기 전까지만 다른 배포로 재시도
+
+AZURE_OPENAI_DEPLOYMENTS 형식:
+- "gpt4o-a,gpt4o-b": AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_API_KEY를 공유하는 배포 이름 목록
+- JSON 배열: [{"deployment": "gpt4o", "endpoint": "https://...", "api_key": "...", "api_version": "..."}]
+  (생략한 필드는 AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_API_KEY / OPENAI_API_VERSION 사용)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import threading
+from contextlib import aclosing
+from time import monotonic
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import openai
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_openai import AzureChatOpenAI
+
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LLM_POOL_EWMA_ALPHA = float(os.getenv("LLM_POOL_EWMA_ALPHA", "0.3"))
+LLM_POOL_COOLDOWN_SECONDS = float(os.getenv("LLM_POOL_COOLDOWN_SECONDS", "10"))
+LLM_POOL_MAX_COOLDOWN_SECONDS = float(os.getenv("LLM_POOL_MAX_COOLDOWN_SECONDS", "120"))
+LLM_POOL_FAILURE_THRESHOLD = int(os.getenv("LLM_POOL_FAILURE_THRESHOLD", "2"))
+LLM_POOL_EXPLORE_RATE = float(os.getenv("LLM_POOL_EXPLORE_RATE", "0.05"))
+LLM_POOL_TIMEOUT_SECONDS = float(os.getenv("LLM_POOL_TIMEOUT_SECONDS", "60"))
+
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_UNAVAILABLE = "unavailable"
+
+
+def classify_error(exc: BaseException) -> Optional[str]:
+    """다른 배포로 재시도할 오류면 종류를, 요청 자체 오류면 None."""
+    status = getattr(exc, "status_code", None)
+    if status == 429:
+        return ERROR_RATE_LIMITED
+    if isinstance(exc, openai.APIConnectionError):  # APITimeoutError 포함
+        return ERROR_UNAVAILABLE
+    if status is not None and (status >= 500 or status == 404):
+        return ERROR_UNAVAILABLE
+    return None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """429 응답의 retry-after-ms / retry-after 헤더 (초)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                continue
+    return None
+
+
+class Deployment:
+    """배포 1개의 라우팅 상태 (DeploymentPool의 lock 아래에서만 변경)."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.ewma_ms: Optional[float] = None
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.rate_limit_streak = 0
+        self.requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+
+
+class DeploymentPool:
+    """
+    EWMA 지연시간 기반 선택 + 429/장애 쿨다운.
+    상태는 배포 이름 단위이므로, HTTP 클라이언트가 다른 여러 RoutedChatModel이 같은 풀을 공유할 수 있습니다.
+    """
+
+    def __init__(
+        self,
+        deployments: Sequence[str],
+        alpha: float = LLM_POOL_EWMA_ALPHA,
+        cooldown_seconds: float = LLM_POOL_COOLDOWN_SECONDS,
+        max_cooldown_seconds: float = LLM_POOL_MAX_COOLDOWN_SECONDS,
+        failure_threshold: int = LLM_POOL_FAILURE_THRESHOLD,
+        explore_rate: float = LLM_POOL_EXPLORE_RATE,
+        clock: Callable[[], float] = monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if not deployments:
+            raise ValueError("DeploymentPool needs at least one deployment")
+        self.deployments = [Deployment(name) for name in deployments]
+        self.entries: List[Dict[str, str]] = []
+        self.alpha = alpha
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.failure_threshold = max(failure_threshold, 1)
+        self.explore_rate = explore_rate
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _score(deployment: Deployment) -> Tuple[bool, float, int]:
+        if deployment.ewma_ms is None:
+            return (False, 0.0, deployment.in_flight)
+        return (True, deployment.ewma_ms * (deployment.in_flight + 1), deployment.in_flight)
+
+    def candidates(self) -> List[Deployment]:
+        """이번 요청에서 시도할 순서: 가용 배포는 점수순, 쿨다운 중인 배포는 풀리는 순으로 뒤에."""
+        with self._lock:
+            now = self.clock()
+            available = sorted(
+                (d for d in self.deployments if d.cooldown_until <= now), key=self._score
+            )
+            cooling = sorted(
+                (d for d in self.deployments if d.cooldown_until > now), key=lambda d: d.cooldown_until
+            )
+            if len(available) > 1 and self.rng.random() < self.explore_rate:
+                explored = self.rng.choice(available[1:])
+                available.remove(explored)
+                available.insert(0, explored)
+        return available + cooling
+
+    def begin(self, deployment: Deployment) -> float:
+        with self._lock:
+            deployment.in_flight += 1
+            deployment.requests += 1
+        metrics.incr(f"llm_pool.requests.{deployment.name}")
+        return self.clock()
+
+    def release(self, deployment: Deployment) -> None:
+        with self._lock:
+            deployment.in_flight -= 1
+
+    def record_success(self, deployment: Deployment, started: float) -> None:
+        elapsed_ms = (self.clock() - started) * 1000
+        with self._lock:
+            deployment.in_flight -= 1
+            deployment.consecutive_failures = 0
+            deployment.rate_limit_streak = 0
+            if deployment.ewma_ms is None:
+                deployment.ewma_ms = elapsed_ms
+            else:
+                deployment.ewma_ms += self.alpha * (elapsed_ms - deployment.ewma_ms)
+        metrics.observe("llm_pool.latency_ms", elapsed_ms)
+
+    def record_error(self, deployment: Deployment, exc: BaseException) -> bool:
+        """오류를 반영하고, 다른 배포로 재시도해도 되면 True."""
+        kind = classify_error(exc)
+        with self._lock:
+            deployment.in_flight -= 1
+            if kind is None:
+                return False
+            now = self.clock()
+            if kind == ERROR_RATE_LIMITED:
+                deployment.rate_limited += 1
+                deployment.rate_limit_streak += 1
+                cooldown = retry_after_seconds(exc)
+                if cooldown is None:
+                    cooldown = self.cooldown_seconds * 2 ** (deployment.rate_limit_streak - 1)
+                deployment.cooldown_until = now + min(cooldown, self.max_cooldown_seconds)
+            else:
+                deployment.failures += 1
+                deployment.consecutive_failures += 1
+                if deployment.consecutive_failures >= self.failure_threshold:
+                    deployment.cooldown_until = now + self.cooldown_seconds
+                    deployment.consecutive_failures = 0
+        metrics.incr(f"llm_pool.{kind}")
+        logger.warning("LLM deployment %s %s (%s); failing over", deployment.name, kind, exc)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = self.clock()
+            return {
+                d.name: {
+                    "ewma_ms": round(d.ewma_ms, 1) if d.ewma_ms is not None else None,
+                    "in_flight": d.in_flight,
+                    "cooldown_s": round(max(d.cooldown_until - now, 0.0), 1),
+                    "requests": d.requests,
+                    "failures": d.failures,
+                    "rate_limited": d.rate_limited,
+                }
+                for d in self.deployments
+            }
+
+
+class RoutedChatModel(BaseChatModel):
+    """DeploymentPool에서 배포를 골라 호출하는 채팅 모델 (실패 시 다음 배포로 재시도)."""
+
+    pool: DeploymentPool
+    llms: Dict[str, BaseChatModel]
+
+    @property
+    def _llm_type(self) -> str:
+        return "azure-openai-routed"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # temperature는 LLM 캐시 키/대상 판단(llm_string)에 쓰임
+        first = next(iter(self.llms.values()), None)
+        return {
+            "deployments": [d.name for d in self.pool.deployments],
+            "temperature": getattr(first, "temperature", None),
+        }
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    @staticmethod
+    def _tag(result: ChatResult, deployment: Deployment) -> ChatResult:
+        result.llm_output = {**(result.llm_output or {}), "deployment": deployment.name}
+        return result
+
+    # 콜백/토큰 이벤트는 바깥(RoutedChatModel)에서 한 번만 발생하도록 내부 모델에는 run_manager를 넘기지 않음
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        last_error: Optional[BaseException] = None
+        for deployment in self.pool.candidates():
+            started = self.pool.begin(deployment)
+            try:
+                result = self.llms[deployment.name]._generate(messages, stop=stop, **kwargs)
+            except Exception as exc:
+                if not self.pool.record_error(deployment, exc):
+                    raise
+                last_error = exc
+                continue
+            except BaseException:
+                # 취소(asyncio.CancelledError) 등: 실패로 집계하지 않고 in_flight만 반환
+                self.pool.release(deployment)
+                raise
+            self.pool.record_success(deployment, started)
+            return self._tag(result, deployment)
+        raise last_error
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        last_error: Optional[BaseException] = None
+        for deployment in self.pool.candidates():
+            started = self.pool.begin(deployment)
+            try:
+                result = await self.llms[deployment.name]._agenerate(messages, stop=stop, **kwargs)
+            except Exception as exc:
+                if not self.pool.record_error(deployment, exc):
+                    raise
+                last_error = exc
+                continue
+            except BaseException:
+                # 취소(asyncio.CancelledError) 등: 실패로 집계하지 않고 in_flight만 반환
+                self.pool.release(deployment)
+                raise
+            self.pool.record_success(deployment, started)
+            return self._tag(result, deployment)
+        raise last_error
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        last_error: Optional[BaseException] = None
+        for deployment in self.pool.candidates():
+            started = self.pool.begin(deployment)
+            stream = self.llms[deployment.name]._stream(messages, stop=stop, **kwargs)
+            try:
+                first = next(stream)
+            except StopIteration:
+                self.pool.record_success(deployment, started)
+                return
+            except Exception as exc:
+                stream.close()
+                if not self.pool.record_error(deployment, exc):
+                    raise
+                last_error = exc
+                continue
+            except BaseException:
+                stream.close()
+                self.pool.release(deployment)
+                raise
+            try:
+                yield first
+                yield from stream
+            except Exception as exc:
+                self.pool.record_error(deployment, exc)
+                raise
+            except BaseException:
+                self.pool.release(deployment)
+                raise
+            self.pool.record_success(deployment, started)
+            return
+        raise last_error
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        last_error: Optional[BaseException] = None
+        for deployment in self.pool.candidates():
+            started = self.pool.begin(deployment)
+            async with aclosing(self.llms[deployment.name]._astream(messages, stop=stop, **kwargs)) as stream:
+                try:
+                    first = await anext(stream)
+                except StopAsyncIteration:
+                    self.pool.record_success(deployment, started)
+                    return
+                except Exception as exc:
+                    if not self.pool.record_error(deployment, exc):
+                        raise
+                    last_error = exc
+                    continue
+                except BaseException:
+                    self.pool.release(deployment)
+                    raise
+                try:
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+                except Exception as exc:
+                    self.pool.record_error(deployment, exc)
+                    raise
+                except BaseException:
+                    self.pool.release(deployment)
+                    raise
+            self.pool.record_success(deployment, started)
+            return
+        raise last_error
+
+
+def parse_deployments(raw: str) -> List[Dict[str, str]]:
+    """AZURE_OPENAI_DEPLOYMENTS 값을 [{"deployment", "endpoint", "api_key", "api_version"}]로 변환."""
+    raw = (raw or "").strip()
+    if not raw:
+        return []
+    if raw.startswith("["):
+        entries = [dict(entry) for entry in json.loads(raw)]
+    else:
+        entries = [{"deployment": name.strip()} for name in raw.split(",") if name.strip()]
+    for entry in entries:
+        entry.setdefault("endpoint", os.getenv("AZURE_OPENAI_ENDPOINT"))
+        entry.setdefault("api_key", os.getenv("AZURE_OPENAI_API_KEY"))
+        entry.setdefault("api_version", os.getenv("OPENAI_API_VERSION"))
+        entry.setdefault("name", entry["deployment"])
+    return entries
+
+
+def build_deployment_llm(entry: Dict[str, str], temperature: float = 0, **kwargs: Any) -> AzureChatOpenAI:
+    # 재시도는 풀이 다른 배포로 하므로 SDK 자체 재시도(429 백오프)는 끔
+    # stream_usage: 스트리밍 응답에도 토큰 사용량(캐시 적중분 포함)을 받음
+    return AzureChatOpenAI(
+        azure_deployment=entry["deployment"],
+        azure_endpoint=entry["endpoint"],
+        api_key=entry["api_key"],
+        api_version=entry["api_version"],
+        temperature=temperature,
+        max_retries=0,
+        timeout=LLM_POOL_TIMEOUT_SECONDS,
+        stream_usage=True,
+        **kwargs,
+    )
+
+
+def create_deployment_pool(raw: Optional[str] = None) -> Optional[DeploymentPool]:
+    """배포가 2개 이상 설정되어 있으면 DeploymentPool, 아니면 None (단일 배포 get_azure_openai_llm 사용)."""
+    entries = parse_deployments(os.getenv("AZURE_OPENAI_DEPLOYMENTS", "") if raw is None else raw)
+    if len(entries) < 2:
+        return None
+    pool = DeploymentPool([entry["name"] for entry in entries])
+    pool.entries = entries
+    metrics.register_gauge("llm_pool", pool.stats)
+    logger.info("LLM deployment pool: %s", ", ".join(d.name for d in pool.deployments))
+    return pool
+
+
+def build_routed_llm(pool: DeploymentPool, cache: Optional[BaseCache] = None, **kwargs: Any) -> RoutedChatModel:
+    """
+    풀의 배포마다 모델을 만들어 RoutedChatModel로 묶음. kwargs(http_client 등)는 각 배포 모델에 전달.
+    cache(LLM 응답 캐시)는 라우팅 전에 한 번 조회하도록 RoutedChatModel에만 설정.
+    """
+    llms = {entry["name"]: build_deployment_llm(entry, **kwargs) for entry in pool.entries}
+    return RoutedChatModel(pool=pool, llms=llms, cache=cache)
+
+
+def create_routed_llm(raw: Optional[str] = None) -> Optional[RoutedChatModel]:
+    pool = create_deployment_pool(raw)
+    return build_routed_llm(pool) if pool is not None else None
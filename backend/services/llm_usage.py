@@ -0,0 +1,106 @@
+"""Per-run LLM token usage including prompt-cache hits.
+
+Azure OpenAI는 1024 토큰 이상 동일한 prefix(시스템 프롬프트 + 도구 정의 + 앞부분 메시지)를
+자동으로 캐시하고, 응답 usage의 prompt_tokens_details.cached_tokens로 재사용된 토큰 수를 알려줍니다.
+LangChain은 이를 AIMessage.usage_metadata["input_token_details"]["cache_read"]로 노출하므로
+에이전트 실행마다 콜백으로 모아 ChatLogs.details(tokens)와 metrics에 남깁니다.
+
+- metrics counter: llm.calls, llm.prompt_tokens, llm.cached_tokens, llm.uncached_tokens, llm.completion_tokens
+- metrics observe: llm.call_ms.cached / llm.call_ms.uncached (캐시 적중 여부별 호출 지연시간)
+스트리밍 호출은 stream_usage=True여야 마지막 청크에 usage가 포함됩니다.
+LLM 응답 캐시(llm_cache) 적중은 API 호출이 아니므로 calls/토큰에서 빼고 llm_cache_hits로 셉니다.
+"""
+
+from __future__ import annotations
+
+from time import monotonic
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from ..utils.metrics import metrics
+
+
+def is_llm_cache_hit(response: LLMResult) -> bool:
+    """LLM 응답 캐시(llm_cache)에서 나온 응답인지 (API 호출/토큰 사용 없음)."""
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "response_metadata", None) or {}
+            if metadata.get("llm_cache") == "hit":
+                return True
+    return False
+
+
+def usage_from_result(response: LLMResult) -> Optional[Dict[str, int]]:
+    """LLMResult에서 {"prompt", "cached", "completion"} 토큰 수. usage가 없으면 None."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                details = usage.get("input_token_details") or {}
+                return {
+                    "prompt": usage.get("input_tokens", 0),
+                    "cached": details.get("cache_read", 0) or 0,
+                    "completion": usage.get("output_tokens", 0),
+                }
+    return None
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """에이전트 실행 1회 동안의 LLM 호출 수와 토큰(캐시 적중분 포함) 합계."""
+
+    # 비동기 실행에서도 executor로 넘기지 않고 바로 호출 (집계만 하므로 블로킹 없음)
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.llm_cache_hits = 0
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = monotonic()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if is_llm_cache_hit(response):
+            self.llm_cache_hits += 1
+            return
+        usage = usage_from_result(response)
+        self.calls += 1
+        metrics.incr("llm.calls")
+        if usage is None:
+            metrics.incr("llm.usage_missing")
+            return
+
+        uncached = usage["prompt"] - usage["cached"]
+        self.prompt_tokens += usage["prompt"]
+        self.cached_tokens += usage["cached"]
+        self.completion_tokens += usage["completion"]
+        metrics.incr("llm.prompt_tokens", usage["prompt"])
+        metrics.incr("llm.cached_tokens", usage["cached"])
+        metrics.incr("llm.uncached_tokens", uncached)
+        metrics.incr("llm.completion_tokens", usage["completion"])
+        if started is not None:
+            kind = "cached" if usage["cached"] else "uncached"
+            metrics.observe(f"llm.call_ms.{kind}", (monotonic() - started) * 1000)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        if not self.calls and not self.llm_cache_hits:
+            return None
+        return {
+            "calls": self.calls,
+            "llm_cache_hits": self.llm_cache_hits,
+            "prompt": self.prompt_tokens,
+            "cached": self.cached_tokens,
+            "uncached": self.prompt_tokens - self.cached_tokens,
+            "completion": self.completion_tokens,
+            "cache_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+        }
@@ -0,0 +1,96 @@
+"""Write-behind buffers for ChatLogs / AuthLogs.
+
+채팅/로그인 요청 경로에서 감사 로그 INSERT(연결 대여 + 커밋)를 빼고 메모리 큐에만 넣습니다.
+백그라운드 스레드가 LOG_BUFFER_BATCH_SIZE개 또는 LOG_BUFFER_FLUSH_INTERVAL_MS마다 multi-row INSERT로 저장하고,
+앱 종료 시 남은 행을 모두 저장합니다. 시각(timestamp/logged_at)은 큐에 넣는 시점으로 기록합니다.
+버퍼가 시작되지 않은 경우(스크립트/벤치마크)에는 기존처럼 바로 INSERT합니다.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from ..repositories import auth_logs_repo, chat_logs_repo
+from ..utils.metrics import metrics
+from ..utils.write_behind import WriteBehindBuffer
+
+_BATCH_SIZE = int(os.getenv("LOG_BUFFER_BATCH_SIZE", "100"))
+_FLUSH_INTERVAL_SECONDS = int(os.getenv("LOG_BUFFER_FLUSH_INTERVAL_MS", "500")) / 1000
+_MAX_PENDING = int(os.getenv("LOG_BUFFER_MAX_PENDING", "10000"))
+
+chat_log_writer = WriteBehindBuffer(
+    "chat_logs_writer",
+    chat_logs_repo.insert_chat_logs,
+    batch_size=_BATCH_SIZE,
+    flush_interval_seconds=_FLUSH_INTERVAL_SECONDS,
+    max_pending=_MAX_PENDING,
+)
+auth_log_writer = WriteBehindBuffer(
+    "auth_logs_writer",
+    auth_logs_repo.create_auth_logs,
+    batch_size=_BATCH_SIZE,
+    flush_interval_seconds=_FLUSH_INTERVAL_SECONDS,
+    max_pending=_MAX_PENDING,
+)
+metrics.register_gauge("chat_logs_writer", chat_log_writer.stats)
+metrics.register_gauge("auth_logs_writer", auth_log_writer.stats)
+
+
+def _utcnow() -> datetime:
+    # ChatLogs/AuthLogs 시각 컬럼은 DATETIME(UTC, tz 없음)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def start_log_writers(engine) -> None:
+    chat_log_writer.start(engine)
+    auth_log_writer.start(engine)
+
+
+def stop_log_writers(timeout: float = 10.0) -> None:
+    """남은 로그를 모두 저장하고 종료 (shutdown 훅)."""
+    chat_log_writer.stop(timeout)
+    auth_log_writer.stop(timeout)
+
+
+def record_chat_log(
+    engine,
+    user_name: str,
+    command: str,
+    status: str,
+    details: Optional[Dict[str, Any]] = None,
+) -> None:
+    if not chat_log_writer.running:
+        chat_logs_repo.insert_chat_log(engine, user_name, command, status, details)
+        return
+    chat_log_writer.enqueue({
+        "timestamp": _utcnow(),
+        "user_name": user_name,
+        "command": command,
+        "status": status,
+        "details": details,
+    })
+
+
+def record_auth_log(engine, **row: Any) -> None:
+    """row: create_auth_log 인자 (user_id, email, event_type, success, user_agent, ip_address)."""
+    if not auth_log_writer.running:
+        auth_logs_repo.create_auth_log(engine, **row)
+        return
+    auth_log_writer.enqueue({**row, "logged_at": _utcnow()})
+
+
+def pending_failed_logins(ip_address: Optional[str], email: Optional[str], window_seconds: int) -> int:
+    """아직 저장 전인 로그인 실패 중 ip 또는 email이 같은 최근 행 수 (DB 집계와 합산)."""
+    since = _utcnow().timestamp() - window_seconds
+
+    def matches(row: Dict[str, Any]) -> bool:
+        return (
+            row.get("event_type") == "login"
+            and not row.get("success")
+            and row["logged_at"].timestamp() >= since
+            and ((ip_address and row.get("ip_address") == ip_address) or (email and row.get("email") == email))
+        )
+
+    return len(auth_log_writer.pending(matches))
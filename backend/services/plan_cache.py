@@ -0,0 +1,153 @@
+"""NL→SQL plan cache: replay the agent's generated SQL for repeat questions.
+
+에이전트가 질문을 `sql_db_query` 호출로 변환하면 그 SQL을 (정규화된 질문 → SQL)로 저장합니다.
+같은 질문이 다시 오면 도구 루프 없이 SQL을 바로 실행하고, 결과 문장화만 LLM 1회
+(또는 템플릿)로 처리합니다. 데이터는 매번 새로 조회하므로 테이블 버전 검사가 필요 없습니다.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from ..utils.metrics import metrics
+from ..utils.question import is_context_dependent, question_hash
+from ..utils.tiered_cache import TieredCache
+from .sql_guard import guard_query, is_read_only_sql
+
+logger = logging.getLogger(__name__)
+
+SQL_QUERY_TOOL = "sql_db_query"
+METADATA_TOOLS = {"sql_db_list_tables", "sql_db_schema", "sql_db_query_checker"}
+
+MAX_RESULT_ROWS = 50
+
+# 사용자 현재 시간에서 파생된 날짜 리터럴은 재실행 시 의미가 달라지므로 저장하지 않음
+_DATE_LITERAL_RE = re.compile(r"'\d{4}-\d{2}-\d{2}")
+
+WORDING_SYSTEM_PROMPT = (
+    "You are the Smart Lab assistant. Answer the user's question using only the SQL result below. "
+    "Reply in the same language as the question, concisely, without mentioning SQL."
+)
+
+
+def is_replayable_sql(sql: str) -> bool:
+    return is_read_only_sql(sql) and not _DATE_LITERAL_RE.search(sql)
+
+
+def _tool_query(tool_input: Any) -> str:
+    if isinstance(tool_input, dict):
+        return str(tool_input.get("query") or "")
+    return str(tool_input or "")
+
+
+def extract_plan(intermediate_steps: Optional[List[Any]]) -> Optional[str]:
+    """
+    에이전트 실행에서 재사용 가능한 SQL을 추출합니다.
+    메타데이터 도구 외에는 sql_db_query만 호출했고, 그중 성공한 쿼리가 정확히 1개인 실행만 저장합니다.
+    (조회 후 JOIN, 건수 + 상세처럼 여러 쿼리로 만든 답변은 쿼리 1개 재실행으로 재현할 수 없음)
+    """
+    plans: List[str] = []
+    for step in intermediate_steps or []:
+        if not isinstance(step, (list, tuple)) or len(step) != 2:
+            return None
+        action, observation = step
+        tool = getattr(action, "tool", None)
+        if tool in METADATA_TOOLS:
+            continue
+        if tool != SQL_QUERY_TOOL:
+            return None
+        if str(observation).startswith("Error"):
+            continue
+        plans.append(_tool_query(getattr(action, "tool_input", None)))
+    if len(plans) != 1 or not is_replayable_sql(plans[0]):
+        return None
+    return plans[0].strip().rstrip(";")
+
+
+def run_plan(engine, sql: str) -> Tuple[List[str], List[Sequence[Any]]]:
+    """저장된 SQL을 에이전트 경로와 같은 sql_guard 검사/TOP 재작성 후 실행 (거부 시 QueryRejectedError)."""
+    statement = guard_query(sql, MAX_RESULT_ROWS)
+    with engine.connect() as conn:
+        result = conn.execute(text(statement))
+        columns = list(result.keys())
+        # WITH/UNION처럼 TOP을 넣지 못한 쿼리는 fetch 단계에서 상한 적용
+        rows = [tuple(row) for row in result.fetchmany(MAX_RESULT_ROWS)]
+    return columns, rows
+
+
+def format_rows(columns: List[str], rows: List[Sequence[Any]]) -> str:
+    lines = [" | ".join(columns)]
+    lines.extend(" | ".join("" if value is None else str(value) for value in row) for row in rows)
+    return "\n".join(lines)
+
+
+def render_template(columns: List[str], rows: List[Sequence[Any]]) -> Optional[str]:
+    """LLM 없이 표현 가능한 결과 형태면 템플릿 응답을 반환합니다."""
+    if not rows:
+        return "조회 결과가 없습니다."
+    if len(rows) == 1 and len(columns) == 1:
+        return f"조회 결과: {rows[0][0]}"
+    return None
+
+
+class PlanCache:
+    def __init__(self, cache: TieredCache, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._cache = cache
+        # 결과 문장화에 사용할 LLM (init_app_state에서 설정, 없으면 템플릿만 사용)
+        self.llm = None
+
+    def eligible(self, question: str) -> bool:
+        return self.enabled and bool(question and question.strip()) and not is_context_dependent(question)
+
+    def get(self, question: str) -> Optional[str]:
+        if not self.eligible(question):
+            return None
+        entry = self._cache.get(question_hash(question))
+        return entry.get("sql") if entry else None
+
+    def record(self, question: str, intermediate_steps: Optional[List[Any]]) -> bool:
+        if not self.eligible(question):
+            return False
+        sql = extract_plan(intermediate_steps)
+        if not sql:
+            return False
+        self._cache.set(question_hash(question), {"sql": sql})
+        metrics.incr("plan_cache.record")
+        return True
+
+    def forget(self, question: str) -> None:
+        self._cache.delete(question_hash(question))
+
+    async def word_answer(self, question: str, columns: List[str], rows: List[Sequence[Any]]) -> Optional[str]:
+        templated = render_template(columns, rows)
+        if templated is not None:
+            metrics.incr("plan_cache.template")
+            return templated
+        if self.llm is None:
+            return None
+        message = await self.llm.ainvoke([
+            ("system", WORDING_SYSTEM_PROMPT),
+            ("human", f"Question: {question}\n\nSQL result:\n{format_rows(columns, rows)}"),
+        ])
+        metrics.incr("plan_cache.llm_wording")
+        return getattr(message, "content", None) or None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "llm_wording": self.llm is not None, **self._cache.stats()}
+
+
+plan_cache = PlanCache(
+    TieredCache(
+        "plan_cache",
+        max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "512")),
+        ttl_seconds=int(os.getenv("PLAN_CACHE_TTL_SECONDS", "86400")),
+    ),
+    enabled=os.getenv("PLAN_CACHE_ENABLED", "1") == "1",
+)
+metrics.register_gauge("plan_cache", plan_cache.stats)
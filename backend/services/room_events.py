@@ -0,0 +1,199 @@
+"""Real-time chat room events (SSE subscriptions + Redis pub/sub fan-out across workers).
+
+채팅방 목록/메시지를 주기적으로 다시 조회하지 않도록, 메시지 저장·방 생성/수정/삭제 시점에
+구독 중인 클라이언트에게 이벤트를 보냅니다.
+
+- 채널: `rooms`(방 목록: room / room_created / room_updated / room_deleted),
+  `room:{id}`(방 메시지: message / room_deleted)
+- REDIS_URL 설정 시 Redis 채널 하나(chat_rooms:events)로 발행하고, 워커마다 구독 스레드 1개가
+  받아서 자기 워커의 구독자에게 전달 → uvicorn 워커가 여러 개여도 모든 탭이 같은 이벤트를 받음
+- Redis 미사용/구독 스레드 중단 시에는 같은 워커의 구독자에게만 바로 전달
+- 구독자 큐가 가득 차면(느린 클라이언트) 쌓인 이벤트를 버리고 `resync` 이벤트 1개로 대체 → 클라이언트가 다시 조회
+- metrics: room_events.published / room_events.delivered / room_events.dropped / room_events.error, gauge `room_events`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from ..utils.metrics import metrics
+from ..utils.redis_client import get_redis
+from ..utils.sse import format_sse
+
+logger = logging.getLogger(__name__)
+
+ROOMS_CHANNEL = "rooms"
+REDIS_CHANNEL = "chat_rooms:events"
+EVENT_RESYNC = "resync"
+EVENT_ROOM_DELETED = "room_deleted"
+
+_QUEUE_SIZE = int(os.getenv("ROOM_EVENTS_QUEUE_SIZE", "100"))
+_KEEPALIVE_SECONDS = float(os.getenv("ROOM_EVENTS_KEEPALIVE_SECONDS", "15"))
+_RECONNECT_SECONDS = 2.0
+
+
+def room_channel(room_id: int) -> str:
+    return f"room:{room_id}"
+
+
+class Subscription:
+    """구독자 1명 (SSE 연결 1개). 이벤트는 구독한 이벤트 루프에서 큐에 넣음."""
+
+    def __init__(self, channel: str, loop: asyncio.AbstractEventLoop, queue_size: int) -> None:
+        self.channel = channel
+        self.loop = loop
+        self.queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue(maxsize=max(queue_size, 1))
+
+    def deliver(self, item: Tuple[str, Any]) -> None:
+        if self.queue.full():
+            dropped = self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            metrics.incr("room_events.dropped", dropped)
+            item = (EVENT_RESYNC, {"channel": self.channel})
+        self.queue.put_nowait(item)
+        metrics.incr("room_events.delivered")
+
+    async def get(self, timeout: float) -> Optional[Tuple[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RoomEventBroker:
+    def __init__(self, queue_size: int = _QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._listening = False
+
+    # ── 구독 ──────────────────────────────────────────
+
+    def subscribe(self, channel: str) -> Subscription:
+        """이벤트 루프 안에서 호출."""
+        subscription = Subscription(channel, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+
+    # ── 발행 ──────────────────────────────────────────
+
+    def publish(self, channel: str, event: str, data: Any) -> None:
+        """이벤트 발행. 실패해도 예외를 올리지 않음 (메시지 저장 경로에서 호출)."""
+        payload = {"channel": channel, "event": event, "data": jsonable_encoder(data)}
+        metrics.incr("room_events.published")
+        r = get_redis()
+        if r is not None and self._listening:
+            try:
+                r.publish(REDIS_CHANNEL, json.dumps(payload, ensure_ascii=False))
+                return
+            except Exception as exc:
+                logger.warning("Room event Redis publish failed, delivering locally: %s", exc)
+                metrics.incr("room_events.error")
+        self._dispatch(payload)
+
+    def _dispatch(self, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(payload["channel"], ()))
+        item = (payload["event"], payload["data"])
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, item)
+            except RuntimeError:
+                # 이벤트 루프가 이미 닫힘 (종료 중)
+                self.unsubscribe(subscription)
+
+    # ── Redis 구독 스레드 ─────────────────────────────
+
+    def start(self) -> None:
+        """REDIS_URL 설정 시 워커 간 전달용 구독 스레드 시작 (startup 훅)."""
+        if get_redis() is None or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="room-events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=_RECONNECT_SECONDS + 1)
+        self._thread = None
+        self._listening = False
+
+    def _listen(self) -> None:
+        while not self._stopping.is_set():
+            r = get_redis()
+            if r is None:
+                return
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(REDIS_CHANNEL)
+                self._listening = True
+                while not self._stopping.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._dispatch(json.loads(message["data"]))
+            except Exception as exc:
+                logger.warning("Room event listener failed, reconnecting in %.0fs: %s", _RECONNECT_SECONDS, exc)
+                metrics.incr("room_events.error")
+            finally:
+                # 구독이 끊긴 동안은 이 워커의 발행을 로컬로 전달
+                self._listening = False
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            self._stopping.wait(_RECONNECT_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            channels = len(self._subscribers)
+            subscribers = sum(len(items) for items in self._subscribers.values())
+        return {
+            "backend": "redis" if self._listening else "local",
+            "channels": channels,
+            "subscribers": subscribers,
+        }
+
+
+room_events = RoomEventBroker()
+metrics.register_gauge("room_events", room_events.stats)
+
+
+async def stream_channel(request, channel: str) -> AsyncIterator[str]:
+    """채널 이벤트를 SSE 프레임으로 보냄. 연결이 유지되는 동안 keepalive 주석을 주기적으로 보냄."""
+    subscription = room_events.subscribe(channel)
+    try:
+        yield format_sse("ready", {"channel": channel})
+        while True:
+            item = await subscription.get(_KEEPALIVE_SECONDS)
+            if item is None:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            event, data = item
+            yield format_sse(event, data)
+            if event == EVENT_ROOM_DELETED and channel != ROOMS_CHANNEL:
+                return
+    finally:
+        room_events.unsubscribe(subscription)
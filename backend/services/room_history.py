@@ -0,0 +1,336 @@
+"""Per-room ring buffer of the latest messages (conversation context without a DB read).
+
+채팅방에 메시지가 올 때마다 get_conversation_context가 ChatMessages TOP(N) 조회와
+ChatRooms 요약 조회를 하던 것을, 방별 최근 N개 메시지 + 롤링 요약 캐시로 대체합니다.
+
+- 저장소: Redis list(REDIS_URL 설정 시, 워커 간 공유) / Redis 미사용 시 워커 메모리 (LRU, 방 수 제한)
+- 채우기: 캐시에 없는 방은 DB에서 읽어 채움 (read-through)
+- 갱신: save_messages 후 append (이미 캐시된 방만, 최근 N개로 잘라냄), 요약은 update_room_summary 성공 후 set_summary
+- 무효화: 방 삭제 시 invalidate
+- DB 조회와 채우기 사이에 새 메시지가 저장되면(세대 번호 변경) 채우지 않고 DB 결과만 반환 → 오래된 목록이 캐시되지 않음
+- Redis 오류 시 해당 요청은 DB에서 읽고, 쓰기 오류면 방 캐시를 지워 다음 조회에서 다시 채움
+- metrics: room_history.hit / room_history.miss / room_history.fill_skipped / room_history.error, gauge `room_history`
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from datetime import datetime
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Optional, Sequence
+
+from redis.exceptions import WatchError
+
+from ..repositories import chat_rooms_repo
+from ..utils.constants import MAX_HISTORY_MESSAGES
+from ..utils.metrics import metrics
+from ..utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "room_history"
+
+
+def _encode(row: Dict[str, Any]) -> str:
+    return json.dumps(row, ensure_ascii=False, default=lambda value: value.isoformat())
+
+
+def _decode(raw: str) -> Dict[str, Any]:
+    row = json.loads(raw)
+    if isinstance(row.get("created_at"), str):
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+def _summary_state(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    row = row or {}
+    return {"summary": row.get("summary"), "summary_message_id": row.get("summary_message_id")}
+
+
+class LocalHistoryStore:
+    """워커 메모리 저장소 (Redis 미사용 시). 방 단위 LRU + TTL."""
+
+    def __init__(self, size: int, max_rooms: int, ttl_seconds: float) -> None:
+        self.size = size
+        self.max_rooms = max(max_rooms, 1)
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._rooms: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def _entry(self, room_id: int, create: bool = False) -> Optional[Dict[str, Any]]:
+        entry = self._rooms.get(room_id)
+        if entry is not None and entry["expires_at"] <= monotonic():
+            entry["messages"] = None
+            entry["summary"] = None
+        if entry is None and create:
+            entry = {"gen": 0, "messages": None, "summary": None}
+            self._rooms[room_id] = entry
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+                self.evictions += 1
+        if entry is not None:
+            entry["expires_at"] = monotonic() + self.ttl_seconds
+            self._rooms.move_to_end(room_id)
+        return entry
+
+    def generation(self, room_id: int) -> Any:
+        with self._lock:
+            entry = self._rooms.get(room_id)
+            # 다른 방 때문에 밀려나 세대 번호가 초기화된 경우도 구분
+            return (entry["gen"] if entry else 0, self.evictions)
+
+    def read(self, room_id: int) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entry(room_id)
+            if entry is None or entry["messages"] is None:
+                return None
+            return list(entry["messages"])
+
+    def fill(self, room_id: int, rows: Sequence[Dict[str, Any]], generation: Any) -> bool:
+        with self._lock:
+            entry = self._rooms.get(room_id)
+            if (entry["gen"] if entry else 0, self.evictions) != generation:
+                return False
+            entry = self._entry(room_id, create=True)
+            entry["messages"] = deque(rows, maxlen=self.size)
+            return True
+
+    def append(self, room_id: int, rows: Sequence[Dict[str, Any]]) -> None:
+        with self._lock:
+            entry = self._entry(room_id, create=True)
+            entry["gen"] += 1
+            if entry["messages"] is not None:
+                entry["messages"].extend(rows)
+
+    def read_summary(self, room_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entry(room_id)
+            return dict(entry["summary"]) if entry and entry["summary"] is not None else None
+
+    def write_summary(self, room_id: int, state: Dict[str, Any], only_if_absent: bool = False) -> None:
+        with self._lock:
+            entry = self._entry(room_id, create=True)
+            if only_if_absent and entry["summary"] is not None:
+                return
+            entry["summary"] = dict(state)
+
+    def delete(self, room_id: int) -> None:
+        with self._lock:
+            entry = self._rooms.get(room_id)
+            if entry is not None:
+                entry["gen"] += 1
+                entry["messages"] = None
+                entry["summary"] = None
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+
+class RedisHistoryStore:
+    """Redis 저장소. room_history:{id} list(JSON 메시지), :gen 세대 번호, :summary 요약 JSON."""
+
+    def __init__(self, size: int, ttl_seconds: int) -> None:
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _keys(room_id: int):
+        base = f"{REDIS_PREFIX}:{room_id}"
+        return base, f"{base}:gen", f"{base}:summary"
+
+    def generation(self, r, room_id: int) -> Any:
+        return r.get(self._keys(room_id)[1])
+
+    def read(self, r, room_id: int) -> Optional[List[Dict[str, Any]]]:
+        raw = r.lrange(self._keys(room_id)[0], 0, -1)
+        return [_decode(item) for item in raw] if raw else None
+
+    def fill(self, r, room_id: int, rows: Sequence[Dict[str, Any]], generation: Any) -> bool:
+        list_key, gen_key, _ = self._keys(room_id)
+        with r.pipeline() as pipe:
+            pipe.watch(gen_key)
+            if pipe.get(gen_key) != generation:
+                return False
+            pipe.multi()
+            pipe.delete(list_key)
+            pipe.rpush(list_key, *(_encode(row) for row in rows))
+            pipe.ltrim(list_key, -self.size, -1)
+            pipe.expire(list_key, self.ttl_seconds)
+            try:
+                pipe.execute()
+            except WatchError:
+                # 사이에 메시지가 저장됨
+                return False
+        return True
+
+    def append(self, r, room_id: int, rows: Sequence[Dict[str, Any]]) -> None:
+        list_key, gen_key, _ = self._keys(room_id)
+        pipe = r.pipeline()
+        pipe.incr(gen_key)
+        pipe.expire(gen_key, self.ttl_seconds)
+        # 캐시된 방(list가 있는 경우)에만 추가 → 일부만 담긴 목록이 생기지 않음
+        pipe.rpushx(list_key, *(_encode(row) for row in rows))
+        pipe.ltrim(list_key, -self.size, -1)
+        pipe.expire(list_key, self.ttl_seconds)
+        pipe.execute()
+
+    def read_summary(self, r, room_id: int) -> Optional[Dict[str, Any]]:
+        raw = r.get(self._keys(room_id)[2])
+        return json.loads(raw) if raw else None
+
+    def write_summary(self, r, room_id: int, state: Dict[str, Any], only_if_absent: bool = False) -> None:
+        r.set(self._keys(room_id)[2], json.dumps(state, ensure_ascii=False), ex=self.ttl_seconds, nx=only_if_absent)
+
+    def delete(self, r, room_id: int) -> None:
+        list_key, gen_key, summary_key = self._keys(room_id)
+        pipe = r.pipeline()
+        pipe.delete(list_key, summary_key)
+        pipe.incr(gen_key)
+        pipe.expire(gen_key, self.ttl_seconds)
+        pipe.execute()
+
+
+class RoomHistoryCache:
+    def __init__(self, size: int, ttl_seconds: int, local_max_rooms: int, enabled: bool = True) -> None:
+        self.size = max(size, 1)
+        self.enabled = enabled
+        self.redis_store = RedisHistoryStore(self.size, ttl_seconds)
+        self.local_store = LocalHistoryStore(self.size, local_max_rooms, ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+
+    def _error(self, action: str, exc: Exception) -> None:
+        logger.warning("Room history Redis %s failed: %s", action, exc)
+        metrics.incr("room_history.error")
+
+    def history(self, engine, room_id: int, limit: int) -> List[Dict[str, Any]]:
+        """최근 limit개 메시지 (오래된 순)."""
+        if not self.enabled or limit > self.size:
+            return self._load(engine, room_id, limit)
+
+        r = get_redis()
+        try:
+            cached = self.redis_store.read(r, room_id) if r is not None else self.local_store.read(room_id)
+        except Exception as exc:
+            self._error("read", exc)
+            return self._load(engine, room_id, limit)
+        if cached is not None:
+            self.hits += 1
+            metrics.incr("room_history.hit")
+            # 동시 저장으로 append 순서가 바뀌었을 수 있으므로 message_id로 정렬
+            cached.sort(key=lambda row: row.get("message_id") or 0)
+            return cached[-limit:]
+
+        self.misses += 1
+        metrics.incr("room_history.miss")
+        try:
+            generation = self.redis_store.generation(r, room_id) if r is not None else self.local_store.generation(room_id)
+            rows = self._load(engine, room_id, self.size)
+            if rows:
+                filled = (
+                    self.redis_store.fill(r, room_id, rows, generation)
+                    if r is not None
+                    else self.local_store.fill(room_id, rows, generation)
+                )
+                if not filled:
+                    metrics.incr("room_history.fill_skipped")
+        except Exception as exc:
+            self._error("fill", exc)
+            return self._load(engine, room_id, limit)
+        return rows[-limit:]
+
+    @staticmethod
+    def _load(engine, room_id: int, limit: int) -> List[Dict[str, Any]]:
+        # list_messages는 DESC로 가져오므로 reverse하여 시간순 정렬
+        return [dict(row) for row in reversed(chat_rooms_repo.list_messages(engine, room_id, limit, cursor=None))]
+
+    def append(self, room_id: int, rows: Sequence[Dict[str, Any]]) -> None:
+        """저장된 메시지 행을 캐시된 방의 목록 끝에 추가 (없는 방은 세대 번호만 증가)."""
+        if not self.enabled or not rows:
+            return
+        rows = [dict(row) for row in rows]
+        r = get_redis()
+        if r is None:
+            self.local_store.append(room_id, rows)
+            return
+        try:
+            self.redis_store.append(r, room_id, rows)
+        except Exception as exc:
+            self._error("append", exc)
+            self.invalidate(room_id)
+
+    def summary_state(self, engine, room_id: int) -> Dict[str, Any]:
+        """{"summary", "summary_message_id"} (캐시 없으면 DB에서 읽어 채움)."""
+        if not self.enabled:
+            return _summary_state(chat_rooms_repo.get_room_summary(engine, room_id))
+        r = get_redis()
+        try:
+            cached = self.redis_store.read_summary(r, room_id) if r is not None else self.local_store.read_summary(room_id)
+        except Exception as exc:
+            self._error("read", exc)
+            return _summary_state(chat_rooms_repo.get_room_summary(engine, room_id))
+        if cached is not None:
+            return cached
+
+        state = _summary_state(chat_rooms_repo.get_room_summary(engine, room_id))
+        try:
+            # 요약 갱신(set_summary)이 먼저 끝났으면 덮어쓰지 않음
+            if r is not None:
+                self.redis_store.write_summary(r, room_id, state, only_if_absent=True)
+            else:
+                self.local_store.write_summary(room_id, state, only_if_absent=True)
+        except Exception as exc:
+            self._error("fill", exc)
+        return state
+
+    def set_summary(self, room_id: int, summary: str, summary_message_id: int) -> None:
+        """update_room_summary 성공 후 호출."""
+        if not self.enabled:
+            return
+        state = {"summary": summary, "summary_message_id": summary_message_id}
+        r = get_redis()
+        if r is None:
+            self.local_store.write_summary(room_id, state)
+            return
+        try:
+            self.redis_store.write_summary(r, room_id, state)
+        except Exception as exc:
+            self._error("write", exc)
+            self.invalidate(room_id)
+
+    def invalidate(self, room_id: int) -> None:
+        self.local_store.delete(room_id)
+        r = get_redis()
+        if r is None:
+            return
+        try:
+            self.redis_store.delete(r, room_id)
+        except Exception as exc:
+            self._error("delete", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if get_redis() is not None else "local",
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "local_rooms": len(self.local_store),
+            "local_evictions": self.local_store.evictions,
+        }
+
+
+room_history = RoomHistoryCache(
+    size=int(os.getenv("ROOM_HISTORY_SIZE", str(MAX_HISTORY_MESSAGES))),
+    ttl_seconds=int(os.getenv("ROOM_HISTORY_TTL_SECONDS", "3600")),
+    local_max_rooms=int(os.getenv("ROOM_HISTORY_LOCAL_MAX_ROOMS", "1000")),
+    enabled=os.getenv("ROOM_HISTORY_ENABLED", "1") == "1",
+)
+metrics.register_gauge("room_history", room_history.stats)
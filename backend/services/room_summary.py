@@ -0,0 +1,184 @@
+"""Rolling per-room conversation summary and history token budget.
+
+매 메시지마다 최근 원문 히스토리를 그대로 프롬프트에 붙이면 긴 답변이 쌓일수록 입력 토큰이 늘어납니다.
+- 어시스턴트 답변 저장 후, 최근 SUMMARY_KEEP_RECENT_MESSAGES개를 제외한 메시지가
+  SUMMARY_FOLD_MIN_MESSAGES개 이상 쌓이면 ChatRooms.summary에 백그라운드로 접어 넣습니다
+  (summary_message_id까지 반영됨). 요약 LLM 호출은 답변 몇 턴에 한 번만 일어납니다.
+- 프롬프트에는 요약 + 요약 이후 메시지만 넣고, HISTORY_TOKEN_BUDGET 안으로 잘라냅니다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..repositories import chat_rooms_repo
+from ..utils.constants import (
+    HISTORY_MESSAGE_MAX_CHARS,
+    HISTORY_TOKEN_BUDGET,
+    ROLE_ASSISTANT,
+    ROLE_USER,
+    SUMMARY_BATCH_MESSAGES,
+    SUMMARY_FOLD_MIN_MESSAGES,
+    SUMMARY_KEEP_RECENT_MESSAGES,
+    SUMMARY_MAX_CHARS,
+)
+from ..utils.metrics import metrics
+from .agent_runner import AgentBusyError, agent_limiter
+from .room_history import room_history
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a smart-lab assistant chat room. "
+    "Merge the previous summary with the new messages. Keep only facts needed to answer follow-up "
+    "questions: reagents, experiments, event IDs, storage IDs, the user's requests and decisions. "
+    f"Write in Korean, at most {SUMMARY_MAX_CHARS} characters, as short bullet points."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 보수적 추정: ASCII 4자당 1토큰, 그 외(한글 등) 1자당 1토큰."""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def clip_text(text: str, max_chars: int) -> str:
+    text = text or ""
+    if len(text) <= max_chars:
+        return text
+    return text[: max_chars - 3].rstrip() + "..."
+
+
+def _message_line(message: Dict[str, Any]) -> str:
+    speaker = "사용자" if message.get("role") == ROLE_USER else "어시스턴트"
+    return f"{speaker}: {message.get('content', '')}"
+
+
+def fit_history_to_budget(
+    summary: Optional[str],
+    history: List[Dict[str, Any]],
+    budget: int = HISTORY_TOKEN_BUDGET,
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    요약 + 최근 메시지를 토큰 예산 안으로 맞춥니다.
+    요약을 먼저 배정하고, 남은 예산에서 최신 메시지부터 채웁니다 (오래된 메시지부터 제외).
+    """
+    summary = clip_text(summary, SUMMARY_MAX_CHARS) if summary else None
+    used = estimate_tokens(summary) if summary else 0
+    if used > budget:
+        # 요약 하나가 예산을 넘으면 뒤쪽(최근 내용)을 남기고 자름
+        summary = "..." + summary[-(budget - 4):]
+        used = estimate_tokens(summary)
+
+    kept: List[Dict[str, Any]] = []
+    for message in reversed(history):
+        clipped = {**message, "content": clip_text(message.get("content") or "", HISTORY_MESSAGE_MAX_CHARS)}
+        cost = estimate_tokens(_message_line(clipped))
+        if used + cost > budget:
+            break
+        kept.append(clipped)
+        used += cost
+
+    metrics.observe("chat.history_tokens", used)
+    return summary, list(reversed(kept))
+
+
+def fallback_summary(previous: Optional[str], messages: List[Dict[str, Any]]) -> str:
+    """LLM을 쓸 수 없을 때: 사용자 질문 위주로 이어 붙이고 최근 내용 기준으로 자름."""
+    lines = [previous] if previous else []
+    for message in messages:
+        limit = 200 if message.get("role") == ROLE_USER else 120
+        lines.append(f"- {clip_text(_message_line(message), limit)}")
+    combined = "\n".join(lines)
+    if len(combined) > SUMMARY_MAX_CHARS:
+        combined = "..." + combined[-(SUMMARY_MAX_CHARS - 3):]
+    return combined
+
+
+class RoomSummarizer:
+    def __init__(self) -> None:
+        # 요약 생성용 LLM (init_app_state에서 설정, 없으면 fallback_summary 사용)
+        self.llm = None
+        self._in_progress: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, engine, room_id: int) -> None:
+        """어시스턴트 답변 저장 후 호출. 응답 지연 없이 백그라운드에서 요약을 갱신합니다."""
+        if room_id in self._in_progress:
+            return
+        task = asyncio.create_task(self.update(engine, room_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def update(self, engine, room_id: int) -> bool:
+        if room_id in self._in_progress:
+            return False
+        self._in_progress.add(room_id)
+        try:
+            return await self._update(engine, room_id)
+        except AgentBusyError:
+            # 다음 답변 이후 다시 시도
+            metrics.incr("chat.summary.skipped_busy")
+            return False
+        except Exception as exc:
+            logger.warning("Room summary update failed (room %s): %s", room_id, exc)
+            metrics.incr("chat.summary.failed")
+            return False
+        finally:
+            self._in_progress.discard(room_id)
+
+    async def _update(self, engine, room_id: int) -> bool:
+        state = await asyncio.to_thread(chat_rooms_repo.get_room_summary, engine, room_id)
+        if not state:
+            return False
+        covered_id = state.get("summary_message_id")
+        pending = await asyncio.to_thread(
+            chat_rooms_repo.list_messages_after,
+            engine,
+            room_id,
+            covered_id,
+            SUMMARY_BATCH_MESSAGES + SUMMARY_KEEP_RECENT_MESSAGES,
+        )
+        if len(pending) < SUMMARY_KEEP_RECENT_MESSAGES + SUMMARY_FOLD_MIN_MESSAGES:
+            return False
+
+        fold = list(pending[: len(pending) - SUMMARY_KEEP_RECENT_MESSAGES])
+        summary = await self._summarize(state.get("summary"), fold)
+        updated = await asyncio.to_thread(
+            chat_rooms_repo.update_room_summary,
+            engine,
+            room_id,
+            summary,
+            fold[-1].get("message_id"),
+            covered_id,
+        )
+        if updated:
+            room_history.set_summary(room_id, summary, fold[-1].get("message_id"))
+            metrics.incr("chat.summary.updated")
+        return updated
+
+    async def _summarize(self, previous: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        if self.llm is None:
+            return fallback_summary(previous, messages)
+
+        transcript = "\n".join(
+            clip_text(_message_line(message), HISTORY_MESSAGE_MAX_CHARS)
+            for message in messages
+            if message.get("role") in (ROLE_USER, ROLE_ASSISTANT)
+        )
+        async with agent_limiter.slot():
+            result = await self.llm.ainvoke([
+                ("system", SUMMARY_SYSTEM_PROMPT),
+                ("human", f"Previous summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"),
+            ])
+        content = getattr(result, "content", None)
+        if not content:
+            return fallback_summary(previous, messages)
+        return clip_text(content.strip(), SUMMARY_MAX_CHARS)
+
+
+room_summarizer = RoomSummarizer()
@@ -0,0 +1,147 @@
+"""Per-request deadlines and cooperative cancellation for agent runs.
+
+- 마감 시각: `X-Request-Deadline` 헤더(epoch ms) 또는 서버 기본값(AGENT_DEADLINE_SECONDS).
+  헤더 값이 서버 기본값보다 늦으면 서버 기본값을 사용합니다.
+- 협조적 취소: 에이전트 반복(LLM 호출)과 도구 호출 직전에 콜백에서 마감/연결 종료를 확인합니다.
+  동기 도구는 실행 중 중단할 수 없으므로 다음 단계로 넘어가기 전에 멈춥니다.
+- 강제 취소: 진행 중인 LLM 호출은 asyncio 취소로 즉시 중단합니다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from ..utils.metrics import metrics
+
+DEADLINE_HEADER = "x-request-deadline"
+CANCEL_REASON_DEADLINE = "deadline"
+CANCEL_REASON_DISCONNECTED = "disconnected"
+
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("AGENT_DEADLINE_SECONDS", "90"))
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class AgentCancelledError(RuntimeError):
+    """Raised when an agent run is stopped by its deadline or a client disconnect."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"Agent run cancelled ({reason})")
+        self.reason = reason
+
+
+def cancelled_status_code(exc: AgentCancelledError) -> int:
+    """마감 초과는 504, 클라이언트 연결 종료는 499(nginx 관례; 응답은 전달되지 않음)."""
+    return 504 if exc.reason == CANCEL_REASON_DEADLINE else 499
+
+
+def resolve_deadline(header_value: Optional[str], default_seconds: float = DEFAULT_DEADLINE_SECONDS) -> float:
+    """헤더(epoch ms)와 서버 기본값 중 이른 쪽을 monotonic 기준 마감 시각으로 변환합니다."""
+    deadline = monotonic() + default_seconds
+    if header_value:
+        try:
+            remaining = int(header_value) / 1000 - time.time()
+        except ValueError:
+            return deadline
+        deadline = min(deadline, monotonic() + remaining)
+    return deadline
+
+
+class RunControl:
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> None:
+        self.deadline = deadline
+        self.is_disconnected = is_disconnected
+        self.cancel_reason: Optional[str] = None
+
+    @classmethod
+    def from_request(cls, request, watch_disconnect: bool = True) -> "RunControl":
+        """
+        StreamingResponse는 Starlette가 연결 종료 시 스트림을 취소하므로
+        watch_disconnect=False로 마감만 적용합니다.
+        """
+        return cls(
+            deadline=resolve_deadline(request.headers.get(DEADLINE_HEADER)),
+            is_disconnected=request.is_disconnected if watch_disconnect else None,
+        )
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - monotonic()
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def _cancel(self, reason: str) -> AgentCancelledError:
+        self.cancel_reason = self.cancel_reason or reason
+        metrics.incr(f"agent.cancelled.{self.cancel_reason}")
+        return AgentCancelledError(self.cancel_reason)
+
+    async def check(self) -> None:
+        """에이전트 단계 사이에서 호출. 마감이 지났거나 클라이언트가 떠났으면 AgentCancelledError."""
+        if self.cancel_reason:
+            raise AgentCancelledError(self.cancel_reason)
+        if self.expired():
+            raise self._cancel(CANCEL_REASON_DEADLINE)
+        if self.is_disconnected is not None and await self.is_disconnected():
+            raise self._cancel(CANCEL_REASON_DISCONNECTED)
+
+    def callbacks(self) -> list:
+        return [CancellationCallback(self)]
+
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """마감 시간 제한과 연결 종료 감시를 걸고 실행합니다."""
+        task = asyncio.ensure_future(awaitable)
+        watcher = asyncio.create_task(self._watch_disconnect(task)) if self.is_disconnected else None
+        try:
+            remaining = self.remaining()
+            if remaining is not None and remaining <= 0:
+                task.cancel()
+                raise self._cancel(CANCEL_REASON_DEADLINE)
+            try:
+                return await asyncio.wait_for(task, timeout=remaining)
+            except asyncio.TimeoutError:
+                raise self._cancel(CANCEL_REASON_DEADLINE)
+            except asyncio.CancelledError:
+                if self.cancel_reason:
+                    raise AgentCancelledError(self.cancel_reason)
+                raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    async def _watch_disconnect(self, task: asyncio.Future) -> None:
+        while not task.done():
+            await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+            if await self.is_disconnected():
+                self._cancel(CANCEL_REASON_DISCONNECTED)
+                task.cancel()
+                return
+
+
+class CancellationCallback(AsyncCallbackHandler):
+    """LLM 호출/도구 호출 직전에 RunControl.check()를 실행합니다."""
+
+    raise_error = True
+
+    def __init__(self, control: RunControl) -> None:
+        self.control = control
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages, **kwargs: Any) -> None:
+        await self.control.check()
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts, **kwargs: Any) -> None:
+        await self.control.check()
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        await self.control.check()
@@ -0,0 +1,76 @@
+"""Precomputed compact schema context for the SQL agent.
+
+`sql_db_list_tables` / `sql_db_schema` 호출은 각각 LLM 왕복 + 카탈로그 조회가 필요합니다.
+에이전트 대상 테이블의 컬럼 목록을 카탈로그 쿼리 1회로 만들어 프롬프트 prefix에 한 번 주입하고,
+결과는 TieredCache(Redis 공유)에 저장해 워커 재시작 시에도 재사용합니다.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from ..repositories import schema_repo
+from ..utils.tiered_cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+# 에이전트가 조회하는 실험실 도메인 테이블
+# (사용자/인증/채팅 테이블은 개인정보가 있으므로 기본 대상에서 제외)
+DEFAULT_AGENT_TABLES = (
+    "Experiments",
+    "ExperimentData",
+    "Reagents",
+    "ExperimentReagents",
+    "ReagentDisposals",
+    "StorageEnvironment",
+    "WeightLog",
+    "FallEvents",
+    "MSDS_Table",
+)
+
+_schema_cache = TieredCache(
+    "schema_context",
+    max_entries=8,
+    ttl_seconds=int(os.getenv("SCHEMA_CONTEXT_TTL_SECONDS", "3600")),
+)
+
+
+def get_agent_tables() -> List[str]:
+    """AGENT_INCLUDE_TABLES(쉼표 구분)가 있으면 사용, 없으면 기본 도메인 테이블."""
+    raw = os.getenv("AGENT_INCLUDE_TABLES", "")
+    tables = [name.strip() for name in raw.split(",") if name.strip()]
+    return tables or list(DEFAULT_AGENT_TABLES)
+
+
+def format_table_lines(rows: List[Dict]) -> Dict[str, str]:
+    """{table: "Table(col type PK, col type NULL, ...)"} 형태의 한 줄 스키마."""
+    columns: Dict[str, List[str]] = {}
+    for row in rows:
+        parts = [row["column_name"], str(row["data_type"])]
+        if row.get("is_pk"):
+            parts.append("PK")
+        elif row.get("is_nullable") == "YES":
+            parts.append("NULL")
+        columns.setdefault(row["table_name"], []).append(" ".join(parts))
+    return {table: f"{table}({', '.join(cols)})" for table, cols in columns.items()}
+
+
+def build_schema_context(engine, tables: Optional[List[str]] = None) -> Tuple[str, Dict[str, str]]:
+    """
+    (prefix에 넣을 스키마 문서, SQLDatabase custom_table_info)를 반환합니다.
+    DB에 없는 테이블은 결과에서 빠집니다.
+    """
+    tables = tables or get_agent_tables()
+    cache_key = ",".join(sorted(tables))
+    table_lines = _schema_cache.get(cache_key)
+    if table_lines is None:
+        table_lines = format_table_lines(schema_repo.list_table_columns(engine, tables))
+        missing = sorted(set(tables) - set(table_lines))
+        if missing:
+            logger.warning("Agent tables not found in database: %s", ", ".join(missing))
+        _schema_cache.set(cache_key, table_lines)
+
+    document = "\n".join(f"- {table_lines[name]}" for name in tables if name in table_lines)
+    return document, table_lines
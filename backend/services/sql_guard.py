@@ -0,0 +1,259 @@
+"""Guardrail around the agent's `sql_db_query` tool.
+
+에이전트가 만든 SQL을 실행 전에 검사/재작성하고, 큰 결과는 서버에서 요약해 전달합니다.
+- 읽기 전용 단일 SELECT/WITH 문만 허용 (쓰기 키워드, 다중 문 거부)
+- 컬럼이 많은 테이블의 `SELECT *` 거부 (필요한 컬럼 목록을 오류 메시지로 안내)
+- `TOP (n)` 자동 삽입/상한 적용 (WITH/UNION/OFFSET 쿼리는 fetch 단계에서 상한 적용)
+- SQL_GUARD_MAX_COST > 0이면 SHOWPLAN 예상 비용이 큰 쿼리 거부
+- SQL_GUARD_MODEL_ROWS보다 많은 행은 컬럼 통계 + 앞부분 행으로 요약
+
+거부 사유는 "Error: ..." 관측값으로 돌아가므로 에이전트가 쿼리를 고쳐 다시 시도합니다.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections import Counter
+from numbers import Number
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_community.utilities import SQLDatabase
+from langchain_community.utilities.sql_database import truncate_word
+from sqlalchemy import text
+
+from ..repositories import schema_repo
+from ..utils.metrics import metrics
+from .answer_cache import tables_in_sql
+
+logger = logging.getLogger(__name__)
+
+SQL_GUARD_ENABLED = os.getenv("SQL_GUARD_ENABLED", "1") == "1"
+SQL_GUARD_MAX_ROWS = int(os.getenv("SQL_GUARD_MAX_ROWS", "200"))
+SQL_GUARD_MODEL_ROWS = int(os.getenv("SQL_GUARD_MODEL_ROWS", "30"))
+SQL_GUARD_WIDE_COLUMNS = int(os.getenv("SQL_GUARD_WIDE_COLUMNS", "8"))
+SQL_GUARD_MAX_COST = float(os.getenv("SQL_GUARD_MAX_COST", "0"))
+
+SUMMARY_SAMPLE_ROWS = 10
+SUMMARY_TOP_VALUES = 3
+
+# 문자열 리터럴/따옴표 식별자를 주석보다 먼저 매치 ('a -- b' 안의 --는 주석이 아님)
+_LITERAL_OR_COMMENT_RE = re.compile(
+    r"'(?:[^']|'')*'|\[[^\]]*\]|\"[^\"]*\"|--[^\n]*|/\*.*?\*/",
+    re.DOTALL,
+)
+_READ_ONLY_START_RE = re.compile(r"^\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+_WRITE_KEYWORD_RE = re.compile(
+    r"\b(?:INSERT|UPDATE|DELETE|MERGE|DROP|ALTER|CREATE|TRUNCATE|EXEC|EXECUTE|GRANT|REVOKE|INTO)\b",
+    re.IGNORECASE,
+)
+_SELECT_HEAD_RE = re.compile(
+    r"^\s*SELECT\s+(?P<quantifier>(?:DISTINCT|ALL)\s+)?(?:TOP\s*\(?\s*(?P<top>\d+)\s*\)?(?P<percent>\s+PERCENT)?\s+)?",
+    re.IGNORECASE,
+)
+_SELECT_STAR_RE = re.compile(
+    r"\bSELECT\s+(?:(?:DISTINCT|ALL)\s+)?(?:TOP\s*\(?\s*\d+\s*\)?\s+(?:PERCENT\s+)?)?(?:\[?\w+\]?\.)?\*",
+    re.IGNORECASE,
+)
+_UNBOUNDED_SHAPE_RE = re.compile(r"\b(?:UNION|EXCEPT|INTERSECT|OFFSET|FOR\s+XML|FOR\s+JSON)\b", re.IGNORECASE)
+
+
+class QueryRejectedError(ValueError):
+    """Raised when an agent query is not allowed to run."""
+
+
+def _is_comment(token: str) -> bool:
+    return token.startswith("--") or token.startswith("/*")
+
+
+def strip_sql(sql: str) -> str:
+    """주석과 끝 세미콜론을 제거한 문장 (문자열 리터럴 안의 내용은 그대로)."""
+    stripped = _LITERAL_OR_COMMENT_RE.sub(
+        lambda match: " " if _is_comment(match.group(0)) else match.group(0), sql or ""
+    )
+    return stripped.strip().rstrip(";").strip()
+
+
+def _code_only(statement: str) -> str:
+    """키워드 검사용: 리터럴/따옴표 식별자를 빈 값으로 바꿔 'delete pending' 같은 값이 쓰기로 오인되지 않게 함."""
+    return _LITERAL_OR_COMMENT_RE.sub(
+        lambda match: " " if _is_comment(match.group(0)) else "''", statement
+    )
+
+
+def is_read_only_sql(sql: str) -> bool:
+    """단일 SELECT/WITH 문이고 (리터럴/주석 밖에) 쓰기 키워드가 없으면 True."""
+    code = _code_only(strip_sql(sql))
+    if not code or ";" in code:
+        return False
+    return bool(_READ_ONLY_START_RE.match(code)) and not _WRITE_KEYWORD_RE.search(code)
+
+
+def parse_table_columns(table_info: Dict[str, str]) -> Dict[str, List[str]]:
+    """schema_context의 "Table(col type PK, col type, ...)" 한 줄 스키마에서 컬럼명 목록 추출."""
+    columns: Dict[str, List[str]] = {}
+    for table, line in table_info.items():
+        body = line[line.find("(") + 1 : line.rfind(")")]
+        columns[table] = [part.strip().split(" ")[0] for part in body.split(",") if part.strip()]
+    return columns
+
+
+def apply_row_cap(statement: str, max_rows: int) -> str:
+    """SELECT 문에 TOP (max_rows)를 넣거나 더 큰 TOP을 줄입니다. 재작성할 수 없는 형태는 그대로 반환."""
+    if _UNBOUNDED_SHAPE_RE.search(statement):
+        return statement
+    match = _SELECT_HEAD_RE.match(statement)
+    if match is None or match.group("percent"):
+        return statement
+    top = match.group("top")
+    if top is not None and int(top) <= max_rows:
+        return statement
+    quantifier = match.group("quantifier") or ""
+    return f"SELECT {quantifier}TOP ({max_rows}) {statement[match.end():]}"
+
+
+def guard_query(
+    sql: str,
+    max_rows: int = SQL_GUARD_MAX_ROWS,
+    table_columns: Optional[Dict[str, List[str]]] = None,
+    wide_columns: int = SQL_GUARD_WIDE_COLUMNS,
+) -> str:
+    """실행 가능한 형태로 재작성한 SQL을 반환합니다. 허용되지 않으면 QueryRejectedError."""
+    statement = strip_sql(sql)
+    if not is_read_only_sql(statement):
+        raise QueryRejectedError(
+            "Only a single read-only SELECT statement is allowed. Use the provided tools for writes."
+        )
+
+    if table_columns and _SELECT_STAR_RE.search(statement):
+        canonical = {name.lower(): name for name in table_columns}
+        for table in tables_in_sql(statement):
+            name = canonical.get(table.lower())
+            if name and len(table_columns[name]) > wide_columns:
+                raise QueryRejectedError(
+                    f"SELECT * on {name} is not allowed. Select only the columns you need from: "
+                    f"{', '.join(table_columns[name])}."
+                )
+
+    # 1행 더 받아서 상한에 걸렸는지(잘린 결과인지) 판별
+    return apply_row_cap(statement, max_rows + 1)
+
+
+def _describe_column(name: str, values: List[Any]) -> str:
+    present = [value for value in values if value is not None]
+    nulls = len(values) - len(present)
+    null_note = f", {nulls} null" if nulls else ""
+    if not present:
+        return f"- {name}: all null"
+    if all(isinstance(value, Number) and not isinstance(value, bool) for value in present):
+        average = sum(present) / len(present)
+        return f"- {name}: min {min(present)}, max {max(present)}, avg {average:.2f}{null_note}"
+    try:
+        low, high = min(present), max(present)
+    except TypeError:
+        low = high = None
+    counts = Counter(str(value) for value in present)
+    if low is not None and not isinstance(low, str):
+        # 날짜/시간 등 순서가 있는 값
+        return f"- {name}: {low} ~ {high}, {len(counts)} distinct{null_note}"
+    top = ", ".join(f"{truncate_word(value, length=40)} ({count})" for value, count in counts.most_common(SUMMARY_TOP_VALUES))
+    return f"- {name}: {len(counts)} distinct, top: {top}{null_note}"
+
+
+def summarize_rows(columns: List[str], rows: List[Sequence[Any]], capped: bool, max_string_length: int = 300) -> str:
+    """모델에 넘길 큰 결과 요약: 행 수, 컬럼별 통계, 앞부분 행."""
+    count = f"at least {len(rows)} (capped)" if capped else str(len(rows))
+    lines = [f"Result has {count} rows; summarized server-side instead of listing every row."]
+    lines.append("Column summary:")
+    for index, name in enumerate(columns):
+        lines.append(_describe_column(name, [row[index] for row in rows]))
+    sample = [tuple(truncate_word(value, length=max_string_length) for value in row) for row in rows[:SUMMARY_SAMPLE_ROWS]]
+    lines.append(f"First {len(sample)} rows {tuple(columns)}: {sample}")
+    lines.append("For totals, trends or rankings, query with COUNT/SUM/AVG and GROUP BY instead of raw rows.")
+    return "\n".join(lines)
+
+
+class GuardedSQLDatabase(SQLDatabase):
+    """SQLDatabase whose `run` (used by sql_db_query) goes through guard_query."""
+
+    def __init__(
+        self,
+        *args: Any,
+        table_columns: Optional[Dict[str, List[str]]] = None,
+        guard_enabled: bool = SQL_GUARD_ENABLED,
+        max_rows: int = SQL_GUARD_MAX_ROWS,
+        model_rows: int = SQL_GUARD_MODEL_ROWS,
+        max_cost: float = SQL_GUARD_MAX_COST,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.table_columns = table_columns or {}
+        self.guard_enabled = guard_enabled
+        self.max_rows = max_rows
+        self.model_rows = model_rows
+        self.max_cost = max_cost
+
+    def check_cost(self, sql: str) -> None:
+        if self.max_cost <= 0:
+            return
+        try:
+            cost = schema_repo.estimate_query_cost(self._engine, sql)
+        except Exception as exc:
+            # 예상 비용을 못 구하면 막지 않음 (TOP 상한은 이미 적용됨)
+            logger.warning("Query cost estimate failed: %s", exc)
+            return
+        if cost is None:
+            return
+        metrics.observe("sql_guard.estimated_cost", cost)
+        if cost > self.max_cost:
+            metrics.incr("sql_guard.rejected_cost")
+            raise QueryRejectedError(
+                f"Estimated query cost {cost:.1f} exceeds the limit {self.max_cost:.1f}. "
+                "Add WHERE filters on indexed columns or aggregate instead of scanning."
+            )
+
+    def run(self, command, fetch="all", include_columns=False, *, parameters=None, execution_options=None):
+        if not self.guard_enabled or fetch != "all" or not isinstance(command, str):
+            return super().run(
+                command, fetch, include_columns, parameters=parameters, execution_options=execution_options
+            )
+
+        try:
+            sql = guard_query(command, self.max_rows, self.table_columns)
+        except QueryRejectedError:
+            metrics.incr("sql_guard.rejected")
+            raise
+        if sql != strip_sql(command):
+            metrics.incr("sql_guard.rewritten")
+        self.check_cost(sql)
+
+        with self._engine.connect() as conn:
+            result = conn.execute(text(sql), parameters or {}, execution_options=execution_options or {})
+            if not result.returns_rows:
+                return ""
+            columns = list(result.keys())
+            # WITH/UNION처럼 TOP을 넣지 못한 쿼리도 fetch 단계에서 상한 적용
+            rows = [tuple(row) for row in result.fetchmany(self.max_rows + 1)]
+        capped = len(rows) > self.max_rows
+        rows = rows[: self.max_rows]
+        metrics.observe("sql_guard.rows", len(rows))
+
+        if not rows:
+            return ""
+        if len(rows) > self.model_rows or capped:
+            metrics.incr("sql_guard.summarized")
+            return summarize_rows(columns, rows, capped, self._max_string_length)
+
+        res = [tuple(truncate_word(value, length=self._max_string_length) for value in row) for row in rows]
+        if include_columns:
+            res = [dict(zip(columns, row)) for row in res]
+        return str(res)
+
+    def run_no_throw(self, command, fetch="all", include_columns=False, *, parameters=None, execution_options=None):
+        try:
+            return super().run_no_throw(
+                command, fetch, include_columns, parameters=parameters, execution_options=execution_options
+            )
+        except QueryRejectedError as exc:
+            return f"Error: {exc}"
@@ -1,485 +1,163 @@
 import os
-import urllib.parse
+import hashlib
 import logging
-from typing import Any, List
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from functools import wraps
+from time import monotonic
+from typing import Any, Dict, List, Optional, Union
 
-from dotenv import load_dotenv
 from langchain_openai import AzureChatOpenAI
 from langchain_community.utilities import SQLDatabase
 from langchain_community.agent_toolkits import create_sql_agent
-from langchain_core.prompts import FewShotPromptTemplate, PromptTemplate
+from langchain_community.agent_toolkits.sql.prompt import SQL_FUNCTIONS_SUFFIX
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from sqlalchemy import create_engine, text
 import sqlalchemy
-from azure.monitor.opentelemetry import configure_azure_monitor
-from opentelemetry.instrumentation.langchain import LangchainInstrumentor
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-# Suppress noisy Azure Monitor logs
-logging.getLogger("azure.core.pipeline.policies.http_logging_policy").setLevel(logging.WARNING)
-logging.getLogger("azure.monitor.opentelemetry.exporter").setLevel(logging.WARNING)
+# Env/schema bootstrap lives in a LangChain-free module so the API can start without this one.
+try:
+    from .db_setup import load_environment, get_connection_string, init_db_schema
+except ImportError:
+    from db_setup import load_environment, get_connection_string, init_db_schema
 
 logger = logging.getLogger(__name__)
 
 # Global engine instance for simple tool access
 db_engine = None
 
-def load_environment() -> None:
-    """Load and validate environment variables."""
-    # Calculate the path relative to this script file
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    env_path = os.path.join(script_dir, "azure_and_sql.env")
-    load_dotenv(dotenv_path=env_path)
-    
-    required_vars = [
-        "AZURE_OPENAI_ENDPOINT",
-        "AZURE_OPENAI_API_KEY",
-        "OPENAI_API_VERSION",
-        "AZURE_DEPLOYMENT_NAME",
-        "SQL_SERVER",
-        "SQL_DATABASE",
-        "SQL_USERNAME",
-        "SQL_PASSWORD",
-        "JWT_SECRET_KEY",
-    ]
-    
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
-    if missing_vars:
-        raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
-    logger.info("Environment variables loaded successfully.")
-
-def get_connection_string() -> str:
-    """Constructs the connection string."""
-    server = os.getenv("SQL_SERVER")
-    database = os.getenv("SQL_DATABASE")
-    username = os.getenv("SQL_USERNAME")
-    password = os.getenv("SQL_PASSWORD")
-    encoded_password = urllib.parse.quote_plus(password)
-    driver = os.getenv("SQL_DRIVER", "ODBC Driver 18 for SQL Server")
-    encoded_driver = urllib.parse.quote_plus(driver)
-    
-    return (
-        f"mssql+pyodbc://{username}:{encoded_password}@{server}/{database}"
-        f"?driver={encoded_driver}"
-    )
-
-def init_db_schema(engine):
-    """
-    Ensures the necessary Master-Detail tables exist in the database.
-    """
-    logger.info("Checking and initializing database schema...")
-    
-    # 1. Experiments (Parent)
-    table_exp = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Experiments' AND xtype='U')
-    CREATE TABLE Experiments (
-        exp_id INT IDENTITY(1,1) PRIMARY KEY,
-        exp_name NVARCHAR(100) UNIQUE NOT NULL,
-        researcher NVARCHAR(50),
-        status NVARCHAR(20),
-        exp_date DATE,
-        memo NVARCHAR(MAX),
-        created_at DATETIME DEFAULT GETUTCDATE()
-    );
-    """
-
-    table_exp_add_status = """
-    IF COL_LENGTH('Experiments', 'status') IS NULL
-        ALTER TABLE Experiments ADD status NVARCHAR(20);
-    """
-    table_exp_add_exp_date = """
-    IF COL_LENGTH('Experiments', 'exp_date') IS NULL
-        ALTER TABLE Experiments ADD exp_date DATE;
-    """
-    table_exp_add_memo = """
-    IF COL_LENGTH('Experiments', 'memo') IS NULL
-        ALTER TABLE Experiments ADD memo NVARCHAR(MAX);
-    """
-    
-    # 2. ExperimentData (Child)
-    # User requested schema change: weight -> volume
-    # Avoid destructive drop in production; allow only via explicit env flag.
-    table_data_drop = "DROP TABLE IF EXISTS ExperimentData;"
-    table_data_create = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ExperimentData' AND xtype='U')
-    CREATE TABLE ExperimentData (
-        data_id INT IDENTITY(1,1) PRIMARY KEY,
-        exp_id INT,
-        material NVARCHAR(100),
-        volume FLOAT,    -- Changed from weight to volume
-        density FLOAT,
-        mass FLOAT,
-        recorded_at DATETIME DEFAULT GETUTCDATE(),
-        FOREIGN KEY (exp_id) REFERENCES Experiments(exp_id)
-    );
-    """
-
-    # 3. ChatLogs (Conversation log table)
-    table_chat_logs = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ChatLogs' AND xtype='U')
-    CREATE TABLE ChatLogs (
-        log_id INT IDENTITY(1,1) PRIMARY KEY,
-        timestamp DATETIME DEFAULT GETUTCDATE(),
-        user_name NVARCHAR(100) NOT NULL,
-        command NVARCHAR(500) NOT NULL,
-        status NVARCHAR(20) NOT NULL
-    );
-    """
-
-    # 3.1 ChatRooms (Multi-room chat metadata)
-    table_chat_rooms = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ChatRooms' AND xtype='U')
-    CREATE TABLE ChatRooms (
-        room_id INT IDENTITY(1,1) PRIMARY KEY,
-        title NVARCHAR(200) NOT NULL,
-        room_type NVARCHAR(20) NOT NULL DEFAULT 'public',
-        created_by_user_id NVARCHAR(100) NULL,
-        created_at DATETIME DEFAULT GETUTCDATE(),
-        last_message_at DATETIME NULL,
-        last_message_preview NVARCHAR(200) NULL
-    );
-    """
-
-    # 3.2 ChatMessages (Multi-room chat history)
-    table_chat_messages = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ChatMessages' AND xtype='U')
-    CREATE TABLE ChatMessages (
-        message_id INT IDENTITY(1,1) PRIMARY KEY,
-        room_id INT NOT NULL,
-        role NVARCHAR(20) NOT NULL,
-        content NVARCHAR(MAX) NOT NULL,
-        sender_type NVARCHAR(20) NOT NULL,
-        sender_id NVARCHAR(100) NULL,
-        sender_name NVARCHAR(100) NULL,
-        created_at DATETIME DEFAULT GETUTCDATE(),
-        FOREIGN KEY (room_id) REFERENCES ChatRooms(room_id)
-    );
-    """
-
-    # 3.3 Users (Auth)
-    table_users = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Users' AND xtype='U')
-    CREATE TABLE Users (
-        user_id INT IDENTITY(1,1) PRIMARY KEY,
-        email NVARCHAR(100) UNIQUE NOT NULL,
-        name NVARCHAR(100) NULL,
-        affiliation NVARCHAR(100) NULL,
-        department NVARCHAR(100) NULL,
-        position NVARCHAR(50) NULL,
-        phone NVARCHAR(30) NULL,
-        contact_email NVARCHAR(100) NULL,
-        profile_image_url NVARCHAR(500) NULL,
-        password_hash NVARCHAR(255) NOT NULL,
-        role NVARCHAR(20) NOT NULL DEFAULT 'user',
-        is_active BIT DEFAULT 1,
-        created_at DATETIME DEFAULT GETUTCDATE(),
-        updated_at DATETIME DEFAULT GETUTCDATE(),
-        last_login_at DATETIME NULL
-    );
-    """
-    table_refresh_tokens = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='RefreshTokens' AND xtype='U')
-    CREATE TABLE RefreshTokens (
-        token_id INT IDENTITY(1,1) PRIMARY KEY,
-        user_id INT NOT NULL,
-        token_hash NVARCHAR(64) NOT NULL UNIQUE,
-        expires_at DATETIME NOT NULL,
-        created_at DATETIME DEFAULT GETUTCDATE(),
-        revoked_at DATETIME NULL,
-        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
-    );
-    """
-    table_refresh_tokens_index = """
-    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_refresh_tokens_user_id')
-    CREATE INDEX idx_refresh_tokens_user_id ON RefreshTokens(user_id);
-    """
-    table_auth_logs = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='AuthLogs' AND xtype='U')
-    CREATE TABLE AuthLogs (
-        log_id INT IDENTITY(1,1) PRIMARY KEY,
-        user_id INT NULL,
-        email NVARCHAR(100) NULL,
-        event_type NVARCHAR(20) NOT NULL,
-        success BIT NOT NULL,
-        ip_address NVARCHAR(45) NULL,
-        user_agent NVARCHAR(255) NULL,
-        logged_at DATETIME DEFAULT GETUTCDATE(),
-        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE SET NULL
-    );
-    """
-    table_auth_logs_add_ip = """
-    IF COL_LENGTH('AuthLogs', 'ip_address') IS NULL
-        ALTER TABLE AuthLogs ADD ip_address NVARCHAR(45) NULL;
-    """
-    table_auth_logs_index = """
-    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_auth_logs_user_id')
-    CREATE INDEX idx_auth_logs_user_id ON AuthLogs(user_id, logged_at);
-    """
-    table_auth_logs_index_email = """
-    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_auth_logs_email')
-    CREATE INDEX idx_auth_logs_email ON AuthLogs(email, logged_at);
-    """
-    table_auth_logs_index_ip = """
-    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_auth_logs_ip')
-    CREATE INDEX idx_auth_logs_ip ON AuthLogs(ip_address, logged_at);
-    """
-    table_users_add_affiliation = """
-    IF COL_LENGTH('Users', 'affiliation') IS NULL
-        ALTER TABLE Users ADD affiliation NVARCHAR(100) NULL;
-    """
-    table_users_add_department = """
-    IF COL_LENGTH('Users', 'department') IS NULL
-        ALTER TABLE Users ADD department NVARCHAR(100) NULL;
-    """
-    table_users_add_position = """
-    IF COL_LENGTH('Users', 'position') IS NULL
-        ALTER TABLE Users ADD position NVARCHAR(50) NULL;
-    """
-    table_users_add_phone = """
-    IF COL_LENGTH('Users', 'phone') IS NULL
-        ALTER TABLE Users ADD phone NVARCHAR(30) NULL;
-    """
-    table_users_add_contact_email = """
-    IF COL_LENGTH('Users', 'contact_email') IS NULL
-        ALTER TABLE Users ADD contact_email NVARCHAR(100) NULL;
-    """
-    table_users_add_profile_image_url = """
-    IF COL_LENGTH('Users', 'profile_image_url') IS NULL
-        ALTER TABLE Users ADD profile_image_url NVARCHAR(500) NULL;
-    """
-    table_user_consents = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='UserConsents' AND xtype='U')
-    CREATE TABLE UserConsents (
-        consent_id INT IDENTITY(1,1) PRIMARY KEY,
-        user_id INT NOT NULL,
-        consent_version NVARCHAR(50) NOT NULL,
-        consent_payload NVARCHAR(MAX) NOT NULL,
-        consent_source NVARCHAR(50) NULL,
-        ip_address NVARCHAR(45) NULL,
-        user_agent NVARCHAR(255) NULL,
-        created_at DATETIME DEFAULT GETUTCDATE(),
-        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
-    );
-    """
-    table_user_consents_index = """
-    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_user_consents_user_id')
-    CREATE INDEX idx_user_consents_user_id ON UserConsents(user_id);
-    """
-
-    # 4. Reagents (Inventory)
-    table_reagents = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Reagents' AND xtype='U')
-    CREATE TABLE Reagents (
-        reagent_id NVARCHAR(50) PRIMARY KEY,
-        name NVARCHAR(100) NOT NULL,
-        formula NVARCHAR(50),
-        purchase_date DATE,
-        open_date DATE NULL,
-        current_volume_value FLOAT NULL,
-        current_volume_unit NVARCHAR(10) NULL,
-        original_volume_value FLOAT NULL,
-        original_volume_unit NVARCHAR(10) NULL,
-        density FLOAT NULL,
-        mass FLOAT NULL,
-        purity FLOAT NULL,
-        location NVARCHAR(50) NULL,
-        status NVARCHAR(20) NULL,
-        created_at DATETIME DEFAULT GETUTCDATE()
-    );
-    """
-
-    # 5. ExperimentReagents (Usage)
-    table_experiment_reagents = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ExperimentReagents' AND xtype='U')
-    BEGIN
-        DECLARE @reagent_id_type NVARCHAR(100);
-        SELECT @reagent_id_type =
-            CASE
-                WHEN t.name IN ('varchar','nvarchar','char','nchar') THEN
-                    t.name + '(' + CASE
-                        WHEN c.max_length = -1 THEN 'MAX'
-                        ELSE CAST(CASE WHEN t.name IN ('nvarchar','nchar') THEN c.max_length / 2 ELSE c.max_length END AS NVARCHAR(10))
-                    END + ')'
-                WHEN t.name IN ('decimal','numeric') THEN
-                    t.name + '(' + CAST(c.precision AS NVARCHAR(10)) + ',' + CAST(c.scale AS NVARCHAR(10)) + ')'
-                ELSE t.name
-            END
-        FROM sys.columns c
-        JOIN sys.types t ON c.user_type_id = t.user_type_id
-        WHERE c.object_id = OBJECT_ID('Reagents') AND c.name = 'reagent_id';
-
-        IF @reagent_id_type IS NULL
-            SET @reagent_id_type = 'NVARCHAR(50)';
-
-        DECLARE @sql NVARCHAR(MAX) = N'
-        CREATE TABLE ExperimentReagents (
-            exp_reagent_id INT IDENTITY(1,1) PRIMARY KEY,
-            exp_id INT NOT NULL,
-            reagent_id ' + @reagent_id_type + ' NOT NULL,
-            dosage_value FLOAT NULL,
-            dosage_unit NVARCHAR(10) NULL,
-            created_at DATETIME DEFAULT GETUTCDATE(),
-            FOREIGN KEY (exp_id) REFERENCES Experiments(exp_id),
-            FOREIGN KEY (reagent_id) REFERENCES Reagents(reagent_id)
-        );';
-
-        EXEC sp_executesql @sql;
-    END;
-    """
-
-    # 6. ReagentDisposals
-    table_reagent_disposals = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ReagentDisposals' AND xtype='U')
-    BEGIN
-        DECLARE @reagent_id_type NVARCHAR(100);
-        SELECT @reagent_id_type =
-            CASE
-                WHEN t.name IN ('varchar','nvarchar','char','nchar') THEN
-                    t.name + '(' + CASE
-                        WHEN c.max_length = -1 THEN 'MAX'
-                        ELSE CAST(CASE WHEN t.name IN ('nvarchar','nchar') THEN c.max_length / 2 ELSE c.max_length END AS NVARCHAR(10))
-                    END + ')'
-                WHEN t.name IN ('decimal','numeric') THEN
-                    t.name + '(' + CAST(c.precision AS NVARCHAR(10)) + ',' + CAST(c.scale AS NVARCHAR(10)) + ')'
-                ELSE t.name
-            END
-        FROM sys.columns c
-        JOIN sys.types t ON c.user_type_id = t.user_type_id
-        WHERE c.object_id = OBJECT_ID('Reagents') AND c.name = 'reagent_id';
-
-        IF @reagent_id_type IS NULL
-            SET @reagent_id_type = 'NVARCHAR(50)';
-
-        DECLARE @sql NVARCHAR(MAX) = N'
-        CREATE TABLE ReagentDisposals (
-            disposal_id INT IDENTITY(1,1) PRIMARY KEY,
-            reagent_id ' + @reagent_id_type + ' NOT NULL,
-            disposal_date DATE NOT NULL,
-            reason NVARCHAR(100) NOT NULL,
-            disposed_by NVARCHAR(50) NOT NULL,
-            created_at DATETIME DEFAULT GETUTCDATE(),
-            FOREIGN KEY (reagent_id) REFERENCES Reagents(reagent_id)
-        );';
-
-        EXEC sp_executesql @sql;
-    END;
-    """
-
-    # 7. StorageEnvironment (Environment Sensors)
-    table_storage_environment = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='StorageEnvironment' AND xtype='U')
-    CREATE TABLE StorageEnvironment (
-        env_id INT IDENTITY(1,1) PRIMARY KEY,
-        location NVARCHAR(50) NOT NULL,
-        temp FLOAT NULL,
-        humidity FLOAT NULL,
-        status NVARCHAR(20) NULL,
-        recorded_at DATETIME DEFAULT GETUTCDATE()
-    );
-    """
-
-    # 8. WeightLog (Arduino Scale Data)
-    # Stores real-time weight measurements and occupancy status.
-    table_weight_log = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='WeightLog' AND xtype='U')
-    CREATE TABLE WeightLog (
-        LogID INT IDENTITY(1,1) PRIMARY KEY,
-        StorageID NVARCHAR(50) NOT NULL, -- e.g., 'Alpha'
-        WeightValue FLOAT NOT NULL,      -- in grams
-        Status NVARCHAR(20) NOT NULL,    -- 'Empty' or 'Occupied'
-        EmptyTime INT DEFAULT 0,         -- Duration in seconds
-        RecordedAt DATETIME DEFAULT GETUTCDATE()
-    );
-    """
-
-    # 9. TranslationCache (i18n cache)
-    table_translation_cache = """
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='TranslationCache' AND xtype='U')
-    CREATE TABLE TranslationCache (
-        cache_id INT IDENTITY(1,1) PRIMARY KEY,
-        source_hash NVARCHAR(64) NOT NULL,
-        source_lang NVARCHAR(10) NULL,
-        target_lang NVARCHAR(10) NOT NULL,
-        provider NVARCHAR(50) NOT NULL,
-        translated_text NVARCHAR(MAX) NOT NULL,
-        created_at DATETIME DEFAULT GETUTCDATE(),
-        last_accessed_at DATETIME NULL,
-        hit_count INT DEFAULT 0,
-        expires_at DATETIME NULL
-    );
-    """
-
-    table_translation_cache_index = """
-    IF NOT EXISTS (
-        SELECT * FROM sys.indexes
-        WHERE name = 'IX_TranslationCache_Lookup'
-          AND object_id = OBJECT_ID('TranslationCache')
-    )
-    CREATE INDEX IX_TranslationCache_Lookup
-    ON TranslationCache (source_hash, source_lang, target_lang, provider);
-    """
-
-    
+# ---------------------------------------------------------
+# Per-run Tool Context
+# ---------------------------------------------------------
+# One agent run shares a single pooled connection across its tool calls, memoizes
+# read-only tool results (the agent often repeats the same call) and records
+# per-tool timings. Outside a run (e.g. the intent router fast path) tools fall
+# back to a short-lived connection from db_engine.
+
+TOOL_ERROR_PREFIXES = ("Error", "Failed", "Database engine not initialized")
+
+_current_run: ContextVar[Optional["AgentRunContext"]] = ContextVar("agent_run_context", default=None)
+
+
+class AgentRunContext:
+    def __init__(self, engine=None):
+        self.engine = engine
+        self._connection = None
+        # Parallel tool calls run in executor threads; serialize use of the shared connection.
+        self._lock = threading.RLock()
+        self._memo: Dict[Any, str] = {}
+        self.tool_stats: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            if self._connection is None:
+                self._connection = self.engine.connect()
+            try:
+                yield self._connection
+            except Exception:
+                self._connection.rollback()
+                raise
+
+    def cached(self, key) -> Optional[str]:
+        with self._lock:
+            return self._memo.get(key)
+
+    def remember(self, key, value: str) -> None:
+        with self._lock:
+            self._memo[key] = value
+
+    def invalidate(self) -> None:
+        """Writes can change what read tools return, so drop memoized reads."""
+        with self._lock:
+            self._memo.clear()
+
+    def record(self, tool_name: str, elapsed_ms: float, cache_hit: bool) -> None:
+        with self._lock:
+            stats = self.tool_stats.setdefault(tool_name, {"calls": 0, "cache_hits": 0, "total_ms": 0.0})
+            stats["calls"] += 1
+            stats["cache_hits"] += int(cache_hit)
+            stats["total_ms"] = round(stats["total_ms"] + elapsed_ms, 1)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tools": {name: dict(stats) for name, stats in self.tool_stats.items()}}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                # Write tools commit explicitly; anything left is an open read transaction.
+                self._connection.rollback()
+            finally:
+                self._connection.close()
+                self._connection = None
+
+
+@contextmanager
+def agent_run_context(engine=None):
+    """Scope one agent run: tools called inside share a connection and memo."""
+    run = AgentRunContext(engine or db_engine)
+    token = _current_run.set(run)
     try:
-        with engine.connect() as conn:
-            # Experiments table logic remains (Create if not exists)
-            conn.execute(text(table_exp))
-            conn.execute(text(table_exp_add_status))
-            conn.execute(text(table_exp_add_exp_date))
-            conn.execute(text(table_exp_add_memo))
-            
-            # ExperimentData table logic (Create if not exists).
-            # If RESET_EXPERIMENTDATA=1, drop and recreate.
-            if os.getenv("RESET_EXPERIMENTDATA", "0") == "1":
-                logger.warning("RESET_EXPERIMENTDATA=1 set. Dropping and recreating ExperimentData.")
-                conn.execute(text(table_data_drop))
-                conn.execute(text(table_data_create))
-            else:
-                conn.execute(text(table_data_create))
-
-            # ChatLogs table logic (Create if not exists)
-            conn.execute(text(table_chat_logs))
-            conn.execute(text(table_chat_rooms))
-            conn.execute(text(table_chat_messages))
-            conn.execute(text(table_users))
-            conn.execute(text(table_refresh_tokens))
-            conn.execute(text(table_refresh_tokens_index))
-            conn.execute(text(table_auth_logs))
-            conn.execute(text(table_auth_logs_add_ip))
-            conn.execute(text(table_auth_logs_index))
-            conn.execute(text(table_auth_logs_index_email))
-            conn.execute(text(table_auth_logs_index_ip))
-            conn.execute(text(table_users_add_affiliation))
-            conn.execute(text(table_users_add_department))
-            conn.execute(text(table_users_add_position))
-            conn.execute(text(table_users_add_phone))
-            conn.execute(text(table_users_add_contact_email))
-            conn.execute(text(table_users_add_profile_image_url))
-            conn.execute(text(table_user_consents))
-            conn.execute(text(table_user_consents_index))
-
-            # Reagents and related tables
-            conn.execute(text(table_reagents))
-            conn.execute(text(table_experiment_reagents))
-            conn.execute(text(table_reagent_disposals))
-            conn.execute(text(table_storage_environment))
-            conn.execute(text(table_weight_log))
-            conn.execute(text(table_translation_cache))
-            conn.execute(text(table_translation_cache_index))
-            conn.commit()
-        logger.info("Schema initialization complete.")
-    except Exception as e:
-        logger.error(f"Schema initialization failed: {e}")
+        yield run
+    finally:
+        run.close()
+        try:
+            _current_run.reset(token)
+        except ValueError:
+            # Async generators may be closed from another context.
+            _current_run.set(None)
+
+
+@contextmanager
+def tool_connection():
+    run = _current_run.get()
+    if run is None or run.engine is None:
+        with db_engine.connect() as conn:
+            yield conn
+    else:
+        with run.connection() as conn:
+            yield conn
+
+
+def run_tool(read_only: bool):
+    """Time a tool call within the current run; memoize results of read-only tools."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            run = _current_run.get()
+            if run is None:
+                return func(*args, **kwargs)
+
+            started = monotonic()
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            result = run.cached(key) if read_only else None
+            cache_hit = result is not None
+            if not cache_hit:
+                result = func(*args, **kwargs)
+                succeeded = isinstance(result, str) and not result.startswith(TOOL_ERROR_PREFIXES)
+                if read_only and succeeded:
+                    run.remember(key, result)
+                elif not read_only:
+                    run.invalidate()
+            run.record(func.__name__, (monotonic() - started) * 1000, cache_hit)
+            return result
+        return wrapper
+    return decorator
+
 
 # ---------------------------------------------------------
 # Custom Tools for Lab Support
 # ---------------------------------------------------------
 
 @tool
+@run_tool(read_only=False)
 def create_experiment(exp_name: str, researcher: str = "Assistant") -> str:
     """
     Creates a new experiment session.
@@ -495,7 +173,7 @@ def create_experiment(exp_name: str, researcher: str = "Assistant") -> str:
         
     query = "INSERT INTO Experiments (exp_name, researcher) VALUES (:name, :rscr)"
     try:
-        with db_engine.connect() as conn:
+        with tool_connection() as conn:
             conn.execute(text(query), {"name": exp_name, "rscr": researcher})
             conn.commit()
         return f"Experiment '{exp_name}' created successfully."
@@ -503,6 +181,7 @@ def create_experiment(exp_name: str, researcher: str = "Assistant") -> str:
         return f"Failed to create experiment: {e}"
 
 @tool
+@run_tool(read_only=False)
 def log_experiment_data(exp_name: str, material: str, volume: float, density: float, mass: float = None) -> str:
     """
     Logs a measurement into a specific experiment.
@@ -528,7 +207,7 @@ def log_experiment_data(exp_name: str, material: str, volume: float, density: fl
     """
     
     try:
-        with db_engine.connect() as conn:
+        with tool_connection() as conn:
             result = conn.execute(text(insert_query), {
                 "mat": material, 
                 "vol": volume, 
@@ -550,6 +229,7 @@ def log_experiment_data(exp_name: str, material: str, volume: float, density: fl
 # ---------------------------------------------------------
 
 @tool
+@run_tool(read_only=True)
 def fetch_pending_verification() -> str:
     """
     Retrieves the list of fall events that have been logged but not yet verified.
@@ -567,7 +247,7 @@ def fetch_pending_verification() -> str:
     ORDER BY Timestamp DESC;
     """
     try:
-        with db_engine.connect() as conn:
+        with tool_connection() as conn:
             result = conn.execute(text(query))
             rows = result.fetchall()
             if not rows:
@@ -577,11 +257,12 @@ def fetch_pending_verification() -> str:
             events = []
             for row in rows:
                 events.append(f"EventID: {row.EventID}, Time: {row.Timestamp}, Cam: {row.CameraID}, Angle: {row.RiskAngle}")
-            return "\\n".join(events)
+            return "\n".join(events)
     except Exception as e:
         return f"Error fetching pending falls: {e}"
 
 @tool
+@run_tool(read_only=False)
 def update_verification_status(event_id: int, status_code: int, subject: str = "Agent") -> str:
     """
     Updates the verification status of a fall event.
@@ -601,7 +282,7 @@ def update_verification_status(event_id: int, status_code: int, subject: str = "
     WHERE EventID = :eid;
     """
     try:
-        with db_engine.connect() as conn:
+        with tool_connection() as conn:
             result = conn.execute(text(query), {"status": status_code, "eid": event_id, "subj": subject})
             conn.commit()
             if result.rowcount == 0:
@@ -611,6 +292,7 @@ def update_verification_status(event_id: int, status_code: int, subject: str = "
         return f"Error updating status: {e}"
 
 @tool
+@run_tool(read_only=True)
 def get_experiment_summary(experiment_id: str) -> str:
     """
     Retrieves summary stats for a specific experiment (e.g., total falls, confirmed, false alarms).
@@ -629,21 +311,22 @@ def get_experiment_summary(experiment_id: str) -> str:
     WHERE ExperimentID = :expid;
     """
     try:
-        with db_engine.connect() as conn:
+        with tool_connection() as conn:
             result = conn.execute(text(query), {"expid": experiment_id})
             row = result.fetchone()
             if not row:
                 return f"No data found for Experiment {experiment_id}"
             
-            return (f"Experiment {experiment_id} Summary:\\n"
-                    f"- Total Events: {row.TotalEvents}\\n"
-                    f"- Confirmed Falls: {row.ConfirmedFalls}\\n"
-                    f"- False Alarms: {row.FalseAlarms}\\n"
+            return (f"Experiment {experiment_id} Summary:\n"
+                    f"- Total Events: {row.TotalEvents}\n"
+                    f"- Confirmed Falls: {row.ConfirmedFalls}\n"
+                    f"- False Alarms: {row.FalseAlarms}\n"
                     f"- Avg Risk Angle: {row.AvgRiskAngle:.1f}")
     except Exception as e:
         return f"Error fetching summary: {e}"
 
 @tool
+@run_tool(read_only=True)
 def get_storage_status(storage_id: str) -> str:
     """
     Retrieves the current status of a generic storage location (e.g., 'Alpha'), primarily for weight/occupancy.
@@ -660,7 +343,7 @@ def get_storage_status(storage_id: str) -> str:
     ORDER BY RecordedAt DESC;
     """
     try:
-        with db_engine.connect() as conn:
+        with tool_connection() as conn:
             result = conn.execute(text(query), {"sid": storage_id})
             row = result.fetchone()
             if not row:
@@ -678,94 +361,347 @@ def get_storage_status(storage_id: str) -> str:
     except Exception as e:
         return f"Error fetching storage status: {e}"
 
-def create_conversational_agent(llm: AzureChatOpenAI, db: SQLDatabase) -> Any:
+REAGENT_NOT_FOUND_PREFIX = "No reagent found"
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so a reagent name such as '10%_HCl' is matched literally."""
+    for char in ("\\", "%", "_", "["):
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+@tool
+@run_tool(read_only=True)
+def get_reagent_stock(reagent_name: str) -> str:
     """
-    Create a SQL Agent with Few-Shot Prompting, Domain Knowledge, and Custom Tools.
+    Retrieves the remaining stock of chemicals whose name or formula matches the given text
+    (e.g., 'Sulfuric Acid', 'H2SO4', '황산'). Disposed reagents are excluded.
+    Use this for "how much X is left" / "is X in stock" questions.
     """
-    
-    # 1. Define Few-Shot Examples (Merged: Fall Detection + Lab Experiments)
-    examples = [
-        # --- [UPDATED] Fall Detection Examples (Focus: Most Recent & Correct Table Name) ---
-        {
-            "input": "가장 최근에 일어난 넘어짐 사고를 보고해.",
-            "sql_cmd": "SELECT TOP 1 * FROM FallEvents WHERE Status = 'FALL_CONFIRMED' ORDER BY Timestamp DESC;"
-        },
-        {
-            "input": "가장 최근에 일어난 엎어짐 사고의 시간을 보고해.",
-            "sql_cmd": "SELECT TOP 1 Timestamp FROM FallEvents WHERE Status = 'FALL_CONFIRMED' ORDER BY Timestamp DESC;"
-        },
-        {
-            "input": "Cylinder_Cam_01에서 발생한 마지막 사고가 언제야?",
-            "sql_cmd": "SELECT TOP 1 Timestamp FROM FallEvents WHERE CameraID = 'Cylinder_Cam_01' AND Status = 'FALL_CONFIRMED' ORDER BY Timestamp DESC;"
-        },
-        
-        # --- Lab Experiment WRITE Examples (Tool Usage) ---
-        {
-            "input": "새로운 실험 세션을 만들어줘. 이름은 'Experiment_001'이고 담당자는 'Kim'이야.",
-            "sql_cmd": "FUNCTION_CALL: create_experiment(exp_name='Experiment_001', researcher='Kim')"
-        },
-        {
-            "input": "'Experiment_001' 실험에 데이터 추가해. 물질은 'Graphene', 부피 10.5, 밀도 2.2, 질량 23.1.",
-            "sql_cmd": "FUNCTION_CALL: log_experiment_data(exp_name='Experiment_001', material='Graphene', volume=10.5, density=2.2, mass=23.1)"
-        },
-        
-        # --- Lab Experiment READ Examples (JOIN Queries) ---
-        {
-            "input": "'Experiment_001'에 대한 실험 정보를 다 보여줘.",
-            "sql_cmd": "SELECT e.exp_name, e.researcher, e.created_at, d.material, d.volume, d.density, d.mass FROM Experiments e JOIN ExperimentData d ON e.exp_id = d.exp_id WHERE e.exp_name = 'Experiment_001';"
-        },
-        
-        # --- Fall Verification Examples (Process Logic) ---
-        {
-            "input": "지금 확인 안 된 낙하 사고 있어?",
-            "sql_cmd": "FUNCTION_CALL: fetch_pending_verification()"
-        },
-        {
-            "input": "이벤트 105번은 진짜 넘어진 거 맞아. 확인 처리해줘.",
-            "sql_cmd": "FUNCTION_CALL: update_verification_status(event_id=105, status_code=1, subject='Agent')"
-        },
-        {
-            "input": "이벤트 106번은 센서 오류 같아. 무시해.",
-            "sql_cmd": "FUNCTION_CALL: update_verification_status(event_id=106, status_code=2, subject='Agent')"
-        },
-        {
-            "input": "'EXP_2024_A' 넘어짐 사고 요약해줘.",
-            "sql_cmd": "FUNCTION_CALL: get_experiment_summary(experiment_id='EXP_2024_A')"
-        },
-        
-        # --- Domain 4: Real-time Asset Monitoring Examples (WeightLog) ---
-        {
-            "input": "시약 창고 Alpha 비어있어?",
-            "sql_cmd": "FUNCTION_CALL: get_storage_status(storage_id='Alpha')"
-        },
-        {
-            "input": "현재 무게 얼마야?",
-            "sql_cmd": "FUNCTION_CALL: get_storage_status(storage_id='Alpha')"
-        },
-        {
-            "input": "지금 저울 상태 알려줘.",
-            "sql_cmd": "FUNCTION_CALL: get_storage_status(storage_id='Alpha')"
-        },
-
-        # --- Domain 5: Chemical Inventory Examples (Reagents) ---
-        {
-            "input": "우리 랩에 황산 재고 있어?",
-            "sql_cmd": "SELECT * FROM Reagents WHERE name LIKE '%Sulfuric Acid%' OR name LIKE '%황산%';"
-        },
-        {
-            "input": "수산화나트륨 얼마나 남았어?",
-            "sql_cmd": "SELECT name, current_volume_value, current_volume_unit FROM Reagents WHERE name LIKE '%Sodium Hydroxide%' OR name LIKE '%수산화나트륨%';"
-        }
-    ]
-
-    # 2. Define Example Formatter
-    example_prompt = PromptTemplate(
-        input_variables=["input", "sql_cmd"],
-        template="User Input: {input}\nSQL Query/Action: {sql_cmd}"
+    global db_engine
+    if not db_engine:
+        return "Database engine not initialized."
+
+    query = """
+    SELECT TOP 5 reagent_name, formula, current_volume, total_capacity, location
+    FROM Reagents
+    WHERE (reagent_name LIKE :pattern ESCAPE '\\' OR formula LIKE :pattern ESCAPE '\\')
+      AND (status != 'disposed' OR status IS NULL)
+    ORDER BY reagent_name;
+    """
+    try:
+        with tool_connection() as conn:
+            rows = conn.execute(text(query), {"pattern": f"%{_escape_like(reagent_name.strip())}%"}).fetchall()
+            if not rows:
+                return f"{REAGENT_NOT_FOUND_PREFIX} matching '{reagent_name}'."
+
+            lines = []
+            for row in rows:
+                lines.append(
+                    f"- {row.reagent_name} ({row.formula or '-'}): "
+                    f"{row.current_volume} / {row.total_capacity}, Location: {row.location or '-'}"
+                )
+            return "\n".join(lines)
+    except Exception as e:
+        return f"Error fetching reagent stock: {e}"
+
+# ---------------------------------------------------------
+# Aggregation Tool (trends, totals, rankings computed in SQL)
+# ---------------------------------------------------------
+# Precompiled, parameterized aggregates so trend/ranking questions return a compact
+# table instead of raw rows the LLM would have to count. :since is the first UTC day
+# of the window; :top_k bounds ranking results.
+
+MAX_AGGREGATE_DAYS = 90
+MAX_AGGREGATE_TOP_K = 20
+
+AGGREGATE_QUERIES = {
+    "fall_events_daily": {
+        "description": "Daily fall event counts with verification breakdown",
+        "daily": True,
+        "sql": """
+        SELECT CAST(Timestamp AS DATE) AS day,
+               COUNT(*) AS total,
+               SUM(CASE WHEN VerificationStatus = 1 THEN 1 ELSE 0 END) AS confirmed,
+               SUM(CASE WHEN VerificationStatus = 2 THEN 1 ELSE 0 END) AS false_alarm,
+               SUM(CASE WHEN VerificationStatus = 0 THEN 1 ELSE 0 END) AS pending
+        FROM FallEvents
+        WHERE Timestamp >= :since
+        GROUP BY CAST(Timestamp AS DATE)
+        ORDER BY day;
+        """,
+    },
+    "fall_events_by_camera": {
+        "description": "Fall events per camera, most frequent first",
+        "daily": False,
+        "sql": """
+        SELECT TOP (:top_k) CameraID AS camera,
+               COUNT(*) AS total,
+               SUM(CASE WHEN VerificationStatus = 1 THEN 1 ELSE 0 END) AS confirmed,
+               CAST(AVG(RiskAngle) AS DECIMAL(6, 1)) AS avg_risk_angle
+        FROM FallEvents
+        WHERE Timestamp >= :since
+        GROUP BY CameraID
+        ORDER BY total DESC;
+        """,
+    },
+    "reagent_usage_top": {
+        "description": "Most used reagents by total used volume",
+        "daily": False,
+        "sql": """
+        SELECT TOP (:top_k) reagent_name,
+               COUNT(*) AS uses,
+               SUM(used_volume) AS total_used
+        FROM ExperimentReagentUsage
+        WHERE recorded_at >= :since
+        GROUP BY reagent_name
+        ORDER BY total_used DESC;
+        """,
+    },
+    "reagent_usage_daily": {
+        "description": "Daily reagent usage (number of uses and total volume)",
+        "daily": True,
+        "sql": """
+        SELECT CAST(recorded_at AS DATE) AS day,
+               COUNT(*) AS uses,
+               SUM(used_volume) AS total_used
+        FROM ExperimentReagentUsage
+        WHERE recorded_at >= :since
+        GROUP BY CAST(recorded_at AS DATE)
+        ORDER BY day;
+        """,
+    },
+    "storage_weight_daily": {
+        "description": "Daily weight statistics and empty ratio per storage",
+        "daily": False,
+        "sql": """
+        SELECT StorageID AS storage_id,
+               CAST(RecordedAt AS DATE) AS day,
+               CAST(AVG(WeightValue) AS DECIMAL(10, 1)) AS avg_weight,
+               MIN(WeightValue) AS min_weight,
+               MAX(WeightValue) AS max_weight,
+               CAST(AVG(CASE WHEN Status = 'Empty' THEN 1.0 ELSE 0.0 END) AS DECIMAL(4, 2)) AS empty_ratio
+        FROM WeightLog
+        WHERE RecordedAt >= :since
+        GROUP BY StorageID, CAST(RecordedAt AS DATE)
+        ORDER BY storage_id, day;
+        """,
+    },
+}
+
+
+def _day_key(value) -> str:
+    return str(value)[:10]
+
+
+def _fill_days(rows: List[dict], since: date, days: int) -> List[dict]:
+    """Add zero rows for days without data so the trend has one row per day."""
+    by_day = {_day_key(row["day"]): row for row in rows}
+    value_columns = [column for column in (rows[0] if rows else {}) if column != "day"]
+    filled = []
+    for offset in range(days):
+        key = (since + timedelta(days=offset)).isoformat()
+        filled.append(by_day.get(key) or {"day": key, **{column: 0 for column in value_columns}})
+    return filled
+
+
+def _format_table(rows: List[dict]) -> str:
+    columns = list(rows[0])
+    lines = [" | ".join(columns)]
+    for row in rows:
+        lines.append(" | ".join(_day_key(row[c]) if c == "day" else ("" if row[c] is None else str(row[c])) for c in columns))
+    return "\n".join(lines)
+
+
+def _daily_notes(metric: str, rows: List[dict]) -> List[str]:
+    """Totals, rates and first-half vs second-half trend for daily series."""
+    notes = []
+    if metric == "fall_events_daily":
+        total = sum(row["total"] or 0 for row in rows)
+        confirmed = sum(row["confirmed"] or 0 for row in rows)
+        false_alarm = sum(row["false_alarm"] or 0 for row in rows)
+        notes.append(f"Total events: {total} (confirmed {confirmed}, false alarm {false_alarm}, pending {total - confirmed - false_alarm})")
+        if total:
+            notes.append(f"Verification processed rate: {(confirmed + false_alarm) / total:.1%}")
+        value_key = "total"
+    else:
+        notes.append(f"Total uses: {sum(row['uses'] or 0 for row in rows)}, total volume: {sum(row['total_used'] or 0 for row in rows)}")
+        value_key = "total_used"
+    half = len(rows) // 2
+    if half:
+        first = sum(row[value_key] or 0 for row in rows[:half])
+        second = sum(row[value_key] or 0 for row in rows[-half:])
+        change = "n/a" if not first else f"{(second - first) / first:+.0%}"
+        notes.append(f"Trend ({value_key}): first {half} days {first} -> last {half} days {second} ({change})")
+    return notes
+
+
+def _clamp_int_arg(name: str, value: Any, maximum: int) -> int:
+    """Parse an integer tool argument and clamp it to 1..maximum (ValueError if it is not an integer)."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    try:
+        number = int(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer between 1 and {maximum}") from None
+    return min(max(number, 1), maximum)
+
+
+@tool
+@run_tool(read_only=True)
+def aggregate_lab_data(metric: str, days: Union[int, str] = 7, top_k: Union[int, str] = 5) -> str:
+    """
+    Computes trends, totals and rankings in the database and returns a compact table.
+    Use this instead of fetching raw rows for "trend", "per day", "TOP N", "most used", "rate" questions.
+
+    Args:
+        metric: One of
+            'fall_events_daily' (daily fall events with confirmed/false alarm/pending, processed rate, trend),
+            'fall_events_by_camera' (events per camera, TOP N),
+            'reagent_usage_top' (most used reagents by total used volume, TOP N),
+            'reagent_usage_daily' (daily reagent usage count and volume, trend),
+            'storage_weight_daily' (daily weight avg/min/max and empty ratio per storage).
+        days: Look-back window in days including today (1-90, default 7).
+        top_k: Number of rows for ranking metrics (1-20, default 5).
+    """
+    global db_engine
+    if not db_engine:
+        return "Database engine not initialized."
+
+    spec = AGGREGATE_QUERIES.get(metric)
+    if spec is None:
+        return f"Error: unknown metric '{metric}'. Available: {', '.join(AGGREGATE_QUERIES)}."
+
+    try:
+        days = _clamp_int_arg("days", days, MAX_AGGREGATE_DAYS)
+        top_k = _clamp_int_arg("top_k", top_k, MAX_AGGREGATE_TOP_K)
+    except ValueError as e:
+        # model-supplied values like "7d" or "" become an observation instead of failing the run
+        return f"Error: {e}"
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    params = {"since": datetime.combine(since, datetime.min.time())}
+    if ":top_k" in spec["sql"]:
+        params["top_k"] = top_k
+
+    try:
+        with tool_connection() as conn:
+            rows = [dict(row) for row in conn.execute(text(spec["sql"]), params).mappings().all()]
+    except Exception as e:
+        return f"Error computing {metric}: {e}"
+
+    if spec["daily"]:
+        rows = _fill_days(rows, since, days) if rows else []
+    header = f"{spec['description']} (last {days} days since {since.isoformat()} UTC)"
+    if not rows:
+        return f"{header}\nNo data in this period."
+
+    lines = [header, _format_table(rows)]
+    if spec["daily"]:
+        lines.extend(_daily_notes(metric, rows))
+    return "\n".join(lines)
+
+
+def build_schema_section(schema_context: str) -> str:
+    """Prefix section for the preloaded compact schema (the system message is literal, no escaping)."""
+    return (
+        "\n### Database Schema (preloaded)\n"
+        "The columns below are authoritative and already loaded. Do NOT call `sql_db_list_tables` "
+        "or `sql_db_schema` for these tables; write the query directly. "
+        "If an example conflicts with this schema, follow the schema.\n"
+        f"{schema_context}\n"
     )
 
-    # 3. Define Comprehensive System Prefix
-    system_prefix = """
+# Few-Shot Examples (Merged: Fall Detection + Lab Experiments)
+# In dynamic mode only the examples most similar to the question are appended to the user message.
+FEW_SHOT_EXAMPLES = [
+    # --- [UPDATED] Fall Detection Examples (Focus: Most Recent & Correct Table Name) ---
+    {
+        "input": "가장 최근에 일어난 넘어짐 사고를 보고해.",
+        "sql_cmd": "SELECT TOP 1 EventID, Timestamp, CameraID, RiskAngle, Status, EventSummary FROM FallEvents WHERE Status = 'FALL_CONFIRMED' ORDER BY Timestamp DESC;"
+    },
+    {
+        "input": "가장 최근에 일어난 엎어짐 사고의 시간을 보고해.",
+        "sql_cmd": "SELECT TOP 1 Timestamp FROM FallEvents WHERE Status = 'FALL_CONFIRMED' ORDER BY Timestamp DESC;"
+    },
+    {
+        "input": "Cylinder_Cam_01에서 발생한 마지막 사고가 언제야?",
+        "sql_cmd": "SELECT TOP 1 Timestamp FROM FallEvents WHERE CameraID = 'Cylinder_Cam_01' AND Status = 'FALL_CONFIRMED' ORDER BY Timestamp DESC;"
+    },
+
+    # --- Lab Experiment WRITE Examples (Tool Usage) ---
+    {
+        "input": "새로운 실험 세션을 만들어줘. 이름은 'Experiment_001'이고 담당자는 'Kim'이야.",
+        "sql_cmd": "FUNCTION_CALL: create_experiment(exp_name='Experiment_001', researcher='Kim')"
+    },
+    {
+        "input": "'Experiment_001' 실험에 데이터 추가해. 물질은 'Graphene', 부피 10.5, 밀도 2.2, 질량 23.1.",
+        "sql_cmd": "FUNCTION_CALL: log_experiment_data(exp_name='Experiment_001', material='Graphene', volume=10.5, density=2.2, mass=23.1)"
+    },
+
+    # --- Lab Experiment READ Examples (JOIN Queries) ---
+    {
+        "input": "'Experiment_001'에 대한 실험 정보를 다 보여줘.",
+        "sql_cmd": "SELECT e.exp_name, e.researcher, e.created_at, d.material, d.volume, d.density, d.mass FROM Experiments e JOIN ExperimentData d ON e.exp_id = d.exp_id WHERE e.exp_name = 'Experiment_001';"
+    },
+
+    # --- Fall Verification Examples (Process Logic) ---
+    {
+        "input": "지금 확인 안 된 낙하 사고 있어?",
+        "sql_cmd": "FUNCTION_CALL: fetch_pending_verification()"
+    },
+    {
+        "input": "이벤트 105번은 진짜 넘어진 거 맞아. 확인 처리해줘.",
+        "sql_cmd": "FUNCTION_CALL: update_verification_status(event_id=105, status_code=1, subject='Agent')"
+    },
+    {
+        "input": "이벤트 106번은 센서 오류 같아. 무시해.",
+        "sql_cmd": "FUNCTION_CALL: update_verification_status(event_id=106, status_code=2, subject='Agent')"
+    },
+    {
+        "input": "'EXP_2024_A' 넘어짐 사고 요약해줘.",
+        "sql_cmd": "FUNCTION_CALL: get_experiment_summary(experiment_id='EXP_2024_A')"
+    },
+
+    # --- Aggregation Examples (trends / rankings computed server-side) ---
+    {
+        "input": "최근 2주간 넘어짐 사고 추이랑 확인 처리율 알려줘.",
+        "sql_cmd": "FUNCTION_CALL: aggregate_lab_data(metric='fall_events_daily', days=14)"
+    },
+    {
+        "input": "이번 달 가장 많이 쓴 시약 5개와 사용량은?",
+        "sql_cmd": "FUNCTION_CALL: aggregate_lab_data(metric='reagent_usage_top', days=30, top_k=5)"
+    },
+
+    # --- Domain 4: Real-time Asset Monitoring Examples (WeightLog) ---
+    {
+        "input": "시약 창고 Alpha 비어있어?",
+        "sql_cmd": "FUNCTION_CALL: get_storage_status(storage_id='Alpha')"
+    },
+    {
+        "input": "현재 무게 얼마야?",
+        "sql_cmd": "FUNCTION_CALL: get_storage_status(storage_id='Alpha')"
+    },
+    {
+        "input": "지금 저울 상태 알려줘.",
+        "sql_cmd": "FUNCTION_CALL: get_storage_status(storage_id='Alpha')"
+    },
+
+    # --- Domain 5: Chemical Inventory Examples (Reagents) ---
+    {
+        "input": "우리 랩에 황산 재고 있어?",
+        "sql_cmd": "SELECT name, formula, current_volume_value, current_volume_unit, location FROM Reagents WHERE name LIKE '%Sulfuric Acid%' OR name LIKE '%황산%';"
+    },
+    {
+        "input": "수산화나트륨 얼마나 남았어?",
+        "sql_cmd": "SELECT name, current_volume_value, current_volume_unit FROM Reagents WHERE name LIKE '%Sodium Hydroxide%' OR name LIKE '%수산화나트륨%';"
+    }
+]
+
+EXAMPLE_TEMPLATE = "User Input: {input}\nSQL Query/Action: {sql_cmd}"
+
+# Static system prefix (no per-request content; see build_system_prompt)
+SYSTEM_PREFIX = """
 You are a smart laboratory assistant agent. You manage five distinct domains of data:
 
 ### Domain 1: Cylinder Stability (Fall Detection)
@@ -809,22 +745,65 @@ You are a smart laboratory assistant agent. You manage five distinct domains of
 ### General Rules:
 - **Priority**: If user asks "What is the weight now?", check **Domain 4 (Tool: get_storage_status)** first.
 - Use MSSQL syntax (TOP instead of LIMIT).
+- Select only the columns you need; `SELECT *` on wide tables is rejected by the query tool.
+- **Trends / totals / rankings** over a period (e.g. "최근 7일 추이", "가장 많이 사용된 시약 TOP 3"): call `aggregate_lab_data` instead of fetching raw rows and counting them yourself.
 - Always answer in Korean unless requested otherwise.
 
 Here are examples of how to map user intent to SQL or Actions:
 """
 
-    # 4. Construct Full Prompt
-    few_shot_prompt = FewShotPromptTemplate(
-        examples=examples,
-        example_prompt=example_prompt,
-        prefix=system_prefix,
-        suffix="\nUser Input: {input}\nSQL Query/Action:",
-        input_variables=["input"]
-    )
-    
-    full_system_message = few_shot_prompt.format(input="")
-    full_system_message = full_system_message.replace("\nUser Input: \nSQL Query/Action:", "")
+EXAMPLES_HEADER = "Here are examples of how to map user intent to SQL or Actions:\n"
+
+DYNAMIC_EXAMPLES_NOTE = (
+    "Examples relevant to the current question, when available, are included in the user message "
+    "under [참고 예시] (format: User Input / SQL Query/Action).\n"
+)
+
+def build_system_prompt(schema_context: Optional[str] = None, embed_examples: bool = True) -> str:
+    """
+    Static system prefix shared by every request (and every executor in the pool).
+
+    It must stay byte-identical across requests so Azure OpenAI prompt caching can reuse it:
+    only module constants and the schema document go in here. Anything per-request
+    (history, user local time, selected examples, the question) belongs in the user message.
+    """
+    if embed_examples:
+        examples = "\n\n".join(EXAMPLE_TEMPLATE.format(**example) for example in FEW_SHOT_EXAMPLES)
+        prompt = f"{SYSTEM_PREFIX}\n\n{examples}"
+    else:
+        prompt = SYSTEM_PREFIX.replace(EXAMPLES_HEADER, DYNAMIC_EXAMPLES_NOTE)
+    if schema_context:
+        prompt = prompt.replace("### General Rules:", build_schema_section(schema_context) + "\n### General Rules:", 1)
+    return prompt
+
+
+def prompt_fingerprint(text: str) -> str:
+    """Short hash of the static prefix (compare across workers/deploys to confirm it is unchanged)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def create_conversational_agent(
+    llm: AzureChatOpenAI,
+    db: SQLDatabase,
+    schema_context: Optional[str] = None,
+    embed_examples: bool = True,
+) -> Any:
+    """
+    Create a SQL Agent with Few-Shot Prompting, Domain Knowledge, and Custom Tools.
+    schema_context: compact schema document injected once into the prefix (skips schema discovery calls).
+    embed_examples: False keeps the prefix static and example-free; selected examples are
+        appended to each user message instead (dynamic few-shot).
+
+    Prompt layout (cache-friendly): [system: static prefix] + [tools] + [user: {input}] + scratchpad.
+    The system message is a literal SystemMessage, so nothing in it is templated per request.
+    """
+    system_prompt = build_system_prompt(schema_context, embed_examples)
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=system_prompt),
+        HumanMessagePromptTemplate.from_template("{input}"),
+        AIMessage(content=SQL_FUNCTIONS_SUFFIX),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
 
     try:
         agent_executor = create_sql_agent(
@@ -833,15 +812,21 @@ Here are examples of how to map user intent to SQL or Actions:
             agent_type="openai-tools",
             verbose=True,
             handle_parsing_errors=True,
-            prefix=full_system_message,
+            prompt=prompt,
             extra_tools=[
                 create_experiment, 
                 log_experiment_data,
                 fetch_pending_verification,
                 update_verification_status,
                 get_experiment_summary,
-                get_storage_status
-            ] # Injecting Custom Tools
+                get_storage_status,
+                get_reagent_stock,
+                aggregate_lab_data
+            ], # Injecting Custom Tools
+            # 답변 캐시가 어떤 테이블을 읽었는지 판단할 수 있도록 도구 호출 기록을 함께 반환
+            agent_executor_kwargs={"return_intermediate_steps": True},
+            # Call the model via (a)invoke so the LLM cache applies; token callbacks still stream.
+            stream_runnable=False,
         )
         logger.info("Conversational SQL Agent created with Lab Tools and Few-Shot Context.")
         return agent_executor
@@ -857,6 +842,9 @@ def main():
         # 0. Initialize Azure Monitor Tracing
         conn_str = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
         if conn_str:
+            from azure.monitor.opentelemetry import configure_azure_monitor
+            from opentelemetry.instrumentation.langchain import LangchainInstrumentor
+
             configure_azure_monitor()
             LangchainInstrumentor().instrument()
             logger.info("✅ Azure Monitor & Tracing enabled. Sending telemetry to Azure AI Foundry.")
@@ -926,12 +914,18 @@ def main():
         logger.critical(f"Unexpected error: {e}")
         exit(1)
 
-def get_azure_openai_llm() -> AzureChatOpenAI:
+def get_azure_openai_llm(**kwargs) -> AzureChatOpenAI:
+    """
+    Extra kwargs (e.g. http_client / http_async_client) are passed to AzureChatOpenAI.
+    stream_usage keeps token usage (incl. cached prompt tokens) on streamed responses too.
+    """
     return AzureChatOpenAI(
         azure_deployment=os.getenv("AZURE_DEPLOYMENT_NAME"),
         api_version=os.getenv("OPENAI_API_VERSION"),
         temperature=0,
-        verbose=True
+        verbose=True,
+        stream_usage=True,
+        **kwargs,
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,274 @@
+"""
+Few-shot Mode Benchmark (static vs dynamic)
+
+sql_agent.py의 create_conversational_agent를 두 가지 few-shot 모드로 생성해
+hyperparameter_optimizer.py의 TEST_QUERIES로 비교합니다.
+- static: 모든 예제를 시스템 prefix에 포함 (기존 방식)
+- dynamic: prefix는 예제 없이 고정, 질문별 TF-IDF 상위 k개 예제만 사용자 메시지에 추가
+
+측정 항목: 질문당 프롬프트 토큰(Azure usage 기준), 지연시간, 성공률, 기대 테이블 적중률
+
+사용법:
+    cd backend
+    python -m tests.few_shot_benchmark
+    python -m tests.few_shot_benchmark --top-k 3 --iterations 2
+
+삭제해도 메인 시스템에 영향 없음.
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set
+from dataclasses import dataclass, asdict
+from statistics import mean
+
+# 프로젝트 루트(backend 패키지 import용)와 backend 디렉토리를 path에 추가
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+from langchain_community.callbacks import get_openai_callback
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import create_engine
+
+from backend import sql_agent as app_agent
+from backend.services.answer_cache import READ_TOOL_TABLES, tables_in_sql
+from backend.services.few_shot_service import (
+    DynamicFewShot,
+    FEW_SHOT_MODE_DYNAMIC,
+    FEW_SHOT_MODE_STATIC,
+)
+from tests.hyperparameter_optimizer import (
+    TEST_QUERIES,
+    load_environment,
+    get_connection_string,
+    get_llm,
+)
+
+MODES = [FEW_SHOT_MODE_STATIC, FEW_SHOT_MODE_DYNAMIC]
+
+# 쓰기 도구가 다루는 테이블 (기대 테이블 적중 판정용)
+WRITE_TOOL_TABLES = {
+    "create_experiment": {"Experiments"},
+    "log_experiment_data": {"ExperimentData"},
+    "update_verification_status": {"FallEvents"},
+}
+
+# aggregate_lab_data는 metric에 따라 읽는 테이블이 다름
+AGGREGATE_METRIC_TABLES = {
+    "fall_events_daily": {"FallEvents"},
+    "fall_events_by_camera": {"FallEvents"},
+    "reagent_usage_top": {"ExperimentReagentUsage"},
+    "reagent_usage_daily": {"ExperimentReagentUsage"},
+    "storage_weight_daily": {"WeightLog"},
+}
+
+
+# ============================================================
+# 결과 데이터 구조
+# ============================================================
+
+@dataclass
+class BenchmarkResult:
+    mode: str
+    iteration: int
+    query: str
+    difficulty: str
+    expected_table: Optional[str]
+    latency_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+    llm_calls: int
+    agent_steps: int
+    execution_success: bool
+    table_hit: bool
+    error_message: Optional[str] = None
+
+
+# ============================================================
+# 테스트 실행
+# ============================================================
+
+def touched_tables(intermediate_steps: List[Any]) -> Set[str]:
+    """에이전트 실행이 참조한 테이블 (SQL 파싱 + 커스텀 도구 매핑)."""
+    tables: Set[str] = set()
+    for action, _ in intermediate_steps or []:
+        tool = getattr(action, "tool", None)
+        if tool == "sql_db_query":
+            tool_input = getattr(action, "tool_input", "")
+            query = tool_input.get("query", "") if isinstance(tool_input, dict) else str(tool_input)
+            tables |= tables_in_sql(query)
+        if tool == "aggregate_lab_data":
+            tool_input = getattr(action, "tool_input", {})
+            metric = tool_input.get("metric") if isinstance(tool_input, dict) else None
+            tables |= AGGREGATE_METRIC_TABLES.get(metric, set())
+        tables |= READ_TOOL_TABLES.get(tool, set())
+        tables |= WRITE_TOOL_TABLES.get(tool, set())
+    return {name.lower() for name in tables}
+
+
+def run_single_query(agent, few_shot: DynamicFewShot, mode: str, iteration: int, query_info: Dict) -> BenchmarkResult:
+    query = query_info["query"]
+    expected = query_info.get("expected_table")
+    agent_input = few_shot.augment(query, query)
+
+    start_time = time.time()
+    with get_openai_callback() as usage:
+        try:
+            result = agent.invoke({"input": agent_input})
+            steps = result.get("intermediate_steps", [])
+            execution_success = True
+            error_message = None
+        except Exception as e:
+            steps = []
+            execution_success = False
+            error_message = str(e)
+    latency_ms = (time.time() - start_time) * 1000
+
+    if expected is None:
+        table_hit = execution_success
+    else:
+        table_hit = expected.lower() in touched_tables(steps)
+
+    return BenchmarkResult(
+        mode=mode,
+        iteration=iteration,
+        query=query,
+        difficulty=query_info["difficulty"],
+        expected_table=expected,
+        latency_ms=latency_ms,
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        llm_calls=usage.successful_requests,
+        agent_steps=len(steps),
+        execution_success=execution_success,
+        table_hit=table_hit,
+        error_message=error_message,
+    )
+
+
+def run_mode(mode: str, db: SQLDatabase, queries: List[Dict], top_k: int, iterations: int) -> List[BenchmarkResult]:
+    few_shot = DynamicFewShot(mode=mode, top_k=top_k, min_score=0.05)
+    few_shot.configure(app_agent.FEW_SHOT_EXAMPLES, app_agent.EXAMPLE_TEMPLATE)
+
+    llm = get_llm(temperature=0.0)
+    agent = app_agent.create_conversational_agent(
+        llm, db, embed_examples=(mode == FEW_SHOT_MODE_STATIC)
+    )
+
+    results = []
+    print(f"\n  모드: {mode}")
+    for iteration in range(1, iterations + 1):
+        print(f"    반복 {iteration}/{iterations}...")
+        for query_info in queries:
+            result = run_single_query(agent, few_shot, mode, iteration, query_info)
+            results.append(result)
+            status = "✓" if result.execution_success and result.table_hit else "✗"
+            print(
+                f"      {status} {result.query[:30]}... "
+                f"({result.latency_ms:.0f}ms, prompt {result.prompt_tokens} tok, {result.agent_steps} steps)"
+            )
+    return results
+
+
+# ============================================================
+# 결과 저장 및 분석
+# ============================================================
+
+def save_results(results: List[BenchmarkResult], output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_filepath = os.path.join(output_dir, f"few_shot_benchmark_{timestamp}.csv")
+
+    with open(csv_filepath, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=list(asdict(results[0]).keys()))
+        writer.writeheader()
+        for r in results:
+            writer.writerow(asdict(r))
+    return csv_filepath
+
+
+def print_summary(results: List[BenchmarkResult]) -> None:
+    print(f"\n{'='*70}")
+    print("Few-shot 모드 비교")
+    print(f"{'='*70}")
+    print(f"\n{'모드':<10} {'프롬프트 토큰':<14} {'지연시간':<12} {'단계 수':<9} {'성공률':<9} {'테이블 적중률':<12}")
+    print("-" * 70)
+
+    summary = {}
+    for mode in MODES:
+        rows = [r for r in results if r.mode == mode]
+        if not rows:
+            continue
+        summary[mode] = {
+            "prompt_tokens": mean(r.prompt_tokens for r in rows),
+            "latency": mean(r.latency_ms for r in rows),
+            "steps": mean(r.agent_steps for r in rows),
+            "success": sum(1 for r in rows if r.execution_success) / len(rows),
+            "table_hit": sum(1 for r in rows if r.table_hit) / len(rows),
+        }
+        s = summary[mode]
+        print(
+            f"{mode:<10} {s['prompt_tokens']:<14.0f} {s['latency']:<9.0f}ms  "
+            f"{s['steps']:<9.2f} {s['success']:<9.1%} {s['table_hit']:<12.1%}"
+        )
+
+    if len(summary) == 2:
+        static, dynamic = summary[FEW_SHOT_MODE_STATIC], summary[FEW_SHOT_MODE_DYNAMIC]
+        if static["prompt_tokens"]:
+            saved = 1 - dynamic["prompt_tokens"] / static["prompt_tokens"]
+            print(f"\n프롬프트 토큰 절감: {saved:.1%}")
+        if static["latency"]:
+            faster = 1 - dynamic["latency"] / static["latency"]
+            print(f"지연시간 변화: {-faster:+.1%}")
+        print(f"테이블 적중률 변화: {dynamic['table_hit'] - static['table_hit']:+.1%}p")
+
+
+# ============================================================
+# 메인 실행
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Few-shot static vs dynamic benchmark")
+    parser.add_argument("--top-k", type=int, default=4, help="dynamic 모드 예제 수 (기본: 4)")
+    parser.add_argument("--iterations", type=int, default=1, help="반복 횟수 (기본: 1)")
+    parser.add_argument("--difficulty", type=str, default="all",
+                        help="테스트 난이도 (simple/medium/complex/edge_case/all)")
+    parser.add_argument("--output", type=str, default=None, help="결과 저장 디렉토리")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("Few-shot Mode Benchmark")
+    print("="*70)
+
+    print("\n[1/3] 환경 설정 중...")
+    load_environment()
+    engine = create_engine(get_connection_string(), pool_pre_ping=True)
+    app_agent.db_engine = engine
+    db = SQLDatabase(engine, sample_rows_in_table_info=0, lazy_table_reflection=True)
+    print("  완료!")
+
+    difficulties = ["simple", "medium", "complex", "edge_case"] if args.difficulty == "all" else [args.difficulty]
+    queries = [q for diff in difficulties for q in TEST_QUERIES.get(diff, [])]
+
+    print(f"\n[2/3] 테스트 실행 중... (쿼리 {len(queries)}개)")
+    results: List[BenchmarkResult] = []
+    for mode in MODES:
+        results.extend(run_mode(mode, db, queries, args.top_k, args.iterations))
+
+    output_dir = args.output or os.path.join(BACKEND_DIR, "test_results")
+    csv_path = save_results(results, output_dir)
+
+    print_summary(results)
+    print("\n" + "="*70)
+    print("[3/3] 테스트 완료!")
+    print("="*70)
+    print(f"\n결과 파일: {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,14 @@ SQL Agent Hyperparameter Optimizer
     python -m tests.hyperparameter_optimizer --phase 1
     python -m tests.hyperparameter_optimizer --phase all
     python -m tests.hyperparameter_optimizer --phase 5 --iterations 5
+    python -m tests.hyperparameter_optimizer --phase all --workers 4 --rpm 60
+
+병렬/재개:
+- --workers N: 워커 N개가 (설정, 반복, 쿼리) 작업을 동시에 실행
+- --rpm N: 전체 워커가 공유하는 분당 쿼리 시작 예산 (Azure OpenAI rate limit 대응, 0이면 제한 없음)
+- 완료된 TestResult는 체크포인트 JSONL(--checkpoint)에 한 줄씩 추가되며,
+  같은 명령을 다시 실행하면 완료된 작업은 건너뛰고 남은 작업만 실행
+- 결과 요약에 설정별 p50/p95 지연시간 리포트(CSV) 추가
 
 삭제해도 메인 시스템에 영향 없음.
 """
@@ -23,6 +31,8 @@ import csv
 import json
 import time
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
@@ -352,16 +362,104 @@ def run_single_query(agent, query_info: Dict) -> TestResult:
     )
 
 
+def phase_configurations(phase: int) -> List[Tuple[str, Any, Dict[str, float]]]:
+    """Phase의 (param_name, param_value, LLM 파라미터) 목록"""
+    config = PHASE_CONFIG[phase]
+    if phase == 5:
+        configurations = []
+        for combo in config["combinations"]:
+            llm_params = {k: v for k, v in combo.items() if k != "label"}
+            configurations.append((combo["label"], llm_params, llm_params))
+        return configurations
+
+    param_name = config["param"]
+    return [
+        (param_name, value, {**config["default_others"], param_name: value})
+        for value in config["values"]
+    ]
+
+
+# ============================================================
+# 병렬 실행 / 체크포인트
+# ============================================================
+
+class RateLimiter:
+    """워커 전체가 공유하는 분당 쿼리 시작 예산 (0 이하이면 제한 없음)"""
+
+    def __init__(self, per_minute: float) -> None:
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def task_key(phase: int, param_name: str, param_value: Any, iteration: int, query: str) -> str:
+    """체크포인트에서 작업을 식별하는 키"""
+    return json.dumps([phase, param_name, param_value, iteration, query], ensure_ascii=False, sort_keys=True)
+
+
+class Checkpoint:
+    """완료된 TestResult를 JSONL로 누적 저장. 재실행 시 완료된 작업은 건너뜀."""
+
+    def __init__(self, path: str, retry_failed: bool = False) -> None:
+        self.path = path
+        self.completed: Dict[str, TestResult] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if not os.path.exists(path):
+            return
+
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 중단 시 잘린 마지막 줄
+            result = TestResult(**record["result"])
+            if retry_failed and not result.execution_success:
+                self.completed.pop(record["key"], None)
+                continue
+            self.completed[record["key"]] = result
+
+        if content and not content.endswith("\n"):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    def add(self, key: str, result: TestResult) -> None:
+        line = json.dumps(
+            {"key": key, "result": asdict(result), "completed_at": datetime.now().isoformat()},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self.completed[key] = result
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
 def run_phase_test(
     db: SQLDatabase,
     engine,
     phase: int,
     iterations: int = 1,
-    selected_difficulties: List[str] = None
+    selected_difficulties: List[str] = None,
+    workers: int = 1,
+    limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional[Checkpoint] = None,
 ) -> List[PhaseResult]:
-    """Phase별 테스트 실행"""
+    """Phase별 테스트 실행 (워커 풀, 체크포인트에 있는 작업은 건너뜀)"""
     config = PHASE_CONFIG[phase]
-    results = []
+    configurations = phase_configurations(phase)
 
     # 테스트할 쿼리 선택
     if selected_difficulties is None:
@@ -371,84 +469,83 @@ def run_phase_test(
     for diff in selected_difficulties:
         test_queries.extend(TEST_QUERIES.get(diff, []))
 
+    completed: Dict[str, TestResult] = dict(checkpoint.completed) if checkpoint else {}
+    tasks = []
+    for param_name, param_value, llm_params in configurations:
+        label = param_name if phase == 5 else f"{param_name}={param_value}"
+        for iteration in range(1, iterations + 1):
+            for query_info in test_queries:
+                key = task_key(phase, param_name, param_value, iteration, query_info["query"])
+                if key not in completed:
+                    tasks.append((key, label, llm_params, iteration, query_info))
+
+    total = len(configurations) * iterations * len(test_queries)
     print(f"\n{'='*70}")
     print(f"Phase {phase}: {config['name']}")
     print(f"테스트 쿼리 수: {len(test_queries)}")
     print(f"반복 횟수: {iterations}")
+    print(f"작업: {total}개 (체크포인트 완료 {total - len(tasks)}개, 남은 작업 {len(tasks)}개), 워커 {workers}개")
     print(f"{'='*70}")
 
-    if phase == 5:
-        # 조합 테스트
-        for combo in config["combinations"]:
-            label = combo.pop("label")
-            print(f"\n  조합: {label}")
-            print(f"  파라미터: {combo}")
-
-            for iteration in range(iterations):
-                print(f"    반복 {iteration + 1}/{iterations}...")
-
-                llm = get_llm(**combo)
-                agent = create_agent(llm, db, engine)
-
-                test_results = []
-                for query_info in test_queries:
-                    result = run_single_query(agent, query_info)
-                    test_results.append(result)
-
-                success_rate = sum(1 for r in test_results if r.execution_success) / len(test_results)
-                avg_latency = mean(r.latency_ms for r in test_results)
-
-                phase_result = PhaseResult(
-                    phase=phase,
-                    param_name=label,
-                    param_value=combo,
-                    iteration=iteration + 1,
-                    results=test_results,
-                    avg_latency=avg_latency,
-                    success_rate=success_rate,
-                    timestamp=datetime.now().isoformat()
-                )
-                results.append(phase_result)
-
-            combo["label"] = label  # 복원
-    else:
-        # 단일 파라미터 테스트
-        param_name = config["param"]
-        default_others = config["default_others"]
-
-        for param_value in config["values"]:
-            print(f"\n  {param_name}={param_value}")
-
-            for iteration in range(iterations):
-                print(f"    반복 {iteration + 1}/{iterations}...")
-
-                # 파라미터 설정
-                llm_params = {**default_others, param_name: param_value}
-                llm = get_llm(**llm_params)
-                agent = create_agent(llm, db, engine)
-
-                test_results = []
-                for query_info in test_queries:
-                    result = run_single_query(agent, query_info)
-                    test_results.append(result)
-                    # 진행 상황 표시
-                    status = "✓" if result.execution_success else "✗"
-                    print(f"      {status} {result.query[:30]}... ({result.latency_ms:.0f}ms)")
-
-                success_rate = sum(1 for r in test_results if r.execution_success) / len(test_results)
-                avg_latency = mean(r.latency_ms for r in test_results)
-
-                phase_result = PhaseResult(
-                    phase=phase,
-                    param_name=param_name,
-                    param_value=param_value,
-                    iteration=iteration + 1,
-                    results=test_results,
-                    avg_latency=avg_latency,
-                    success_rate=success_rate,
-                    timestamp=datetime.now().isoformat()
-                )
-                results.append(phase_result)
+    # 에이전트는 상태가 없으므로 같은 LLM 파라미터끼리 반복/워커 간 공유
+    agents: Dict[str, Any] = {}
+    agents_lock = threading.Lock()
+
+    def get_agent(llm_params: Dict[str, float]):
+        agent_key = json.dumps(llm_params, sort_keys=True)
+        with agents_lock:
+            if agent_key not in agents:
+                agents[agent_key] = create_agent(get_llm(**llm_params), db, engine)
+            return agents[agent_key]
+
+    def run_task(task) -> Tuple[str, str, int, TestResult]:
+        key, label, llm_params, iteration, query_info = task
+        agent = get_agent(llm_params)
+        if limiter is not None:
+            limiter.acquire()
+        result = run_single_query(agent, query_info)
+        if checkpoint is not None:
+            checkpoint.add(key, result)
+        return key, label, iteration, result
+
+    pool = ThreadPoolExecutor(max_workers=max(workers, 1))
+    try:
+        futures = [pool.submit(run_task, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            key, label, iteration, result = future.result()
+            completed[key] = result
+            # 진행 상황 표시
+            status = "✓" if result.execution_success else "✗"
+            print(
+                f"    [{done}/{len(tasks)}] {label} #{iteration} "
+                f"{status} {result.query[:30]}... ({result.latency_ms:.0f}ms)"
+            )
+    except KeyboardInterrupt:
+        # 완료된 작업은 체크포인트에 남아 있으므로 다음 실행에서 이어서 진행
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    results = []
+    for param_name, param_value, _ in configurations:
+        for iteration in range(1, iterations + 1):
+            test_results = [
+                completed[task_key(phase, param_name, param_value, iteration, query_info["query"])]
+                for query_info in test_queries
+            ]
+            success_rate = sum(1 for r in test_results if r.execution_success) / len(test_results)
+            avg_latency = mean(r.latency_ms for r in test_results)
+
+            results.append(PhaseResult(
+                phase=phase,
+                param_name=param_name,
+                param_value=param_value,
+                iteration=iteration,
+                results=test_results,
+                avg_latency=avg_latency,
+                success_rate=success_rate,
+                timestamp=datetime.now().isoformat()
+            ))
 
     return results
 
@@ -545,6 +642,67 @@ def print_phase_summary(results: List[PhaseResult], phase: int):
     return best_param
 
 
+def percentile(values: List[float], pct: float) -> float:
+    """선형 보간 백분위수"""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_report(results: List[PhaseResult]) -> List[Dict[str, Any]]:
+    """설정별(반복 합산) 쿼리 지연시간 p50/p95 집계"""
+    groups: Dict[str, List[TestResult]] = {}
+    for r in results:
+        label = r.param_name if isinstance(r.param_value, dict) else str(r.param_value)
+        groups.setdefault(label, []).extend(r.results)
+
+    rows = []
+    for label, test_results in groups.items():
+        latencies = [t.latency_ms for t in test_results]
+        rows.append({
+            "phase": results[0].phase,
+            "config": label,
+            "queries": len(test_results),
+            "success_rate": sum(1 for t in test_results if t.execution_success) / len(test_results),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "mean_ms": mean(latencies),
+            "max_ms": max(latencies),
+        })
+    return rows
+
+
+def save_latency_report(rows: List[Dict[str, Any]], output_dir: str, phase: int) -> str:
+    """지연시간 리포트를 CSV로 저장"""
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_filepath = os.path.join(output_dir, f"phase{phase}_latency_{timestamp}.csv")
+
+    with open(csv_filepath, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                **row,
+                "success_rate": f"{row['success_rate']:.2%}",
+                **{k: f"{row[k]:.1f}" for k in ("p50_ms", "p95_ms", "mean_ms", "max_ms")},
+            })
+    return csv_filepath
+
+
+def print_latency_report(rows: List[Dict[str, Any]]):
+    """설정별 p50/p95 지연시간 출력"""
+    print(f"\n{'설정':<20} {'쿼리 수':<10} {'성공률':<10} {'p50':<12} {'p95':<12} {'최대':<12}")
+    print("-" * 70)
+    for row in rows:
+        print(
+            f"{row['config']:<20} {row['queries']:<10} {row['success_rate']:<10.1%} "
+            f"{row['p50_ms']:<9.0f}ms  {row['p95_ms']:<9.0f}ms  {row['max_ms']:<9.0f}ms"
+        )
+
+
 # ============================================================
 # 메인 실행
 # ============================================================
@@ -559,6 +717,14 @@ def main():
                         help="결과 저장 디렉토리")
     parser.add_argument("--difficulty", type=str, default="all",
                         help="테스트 난이도 (simple/medium/complex/edge_case/all)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="동시 실행 워커 수 (기본: 1)")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="분당 쿼리 시작 예산, 전체 워커 공유 (기본: 0 = 제한 없음)")
+    parser.add_argument("--checkpoint", type=str, default=None,
+                        help="체크포인트 JSONL 경로 (기본: <output>/optimizer_checkpoint.jsonl)")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="체크포인트의 실패한 작업도 다시 실행")
 
     args = parser.parse_args()
 
@@ -582,6 +748,11 @@ def main():
     else:
         output_dir = args.output
 
+    checkpoint_path = args.checkpoint or os.path.join(output_dir, "optimizer_checkpoint.jsonl")
+    checkpoint = Checkpoint(checkpoint_path, retry_failed=args.retry_failed)
+    limiter = RateLimiter(args.rpm)
+    print(f"  체크포인트: {checkpoint_path} (완료된 작업 {len(checkpoint.completed)}개)")
+
     # 난이도 선택
     if args.difficulty == "all":
         difficulties = ["simple", "medium", "complex", "edge_case"]
@@ -603,7 +774,10 @@ def main():
             engine=engine,
             phase=phase,
             iterations=args.iterations,
-            selected_difficulties=difficulties
+            selected_difficulties=difficulties,
+            workers=args.workers,
+            limiter=limiter,
+            checkpoint=checkpoint,
         )
         all_results[phase] = results
 
@@ -613,8 +787,13 @@ def main():
         print(f"    CSV: {csv_path}")
         print(f"    JSON: {json_path}")
 
+        latency_rows = latency_report(results)
+        latency_path = save_latency_report(latency_rows, output_dir, phase)
+        print(f"    Latency: {latency_path}")
+
         # 요약 출력
         best_param = print_phase_summary(results, phase)
+        print_latency_report(latency_rows)
 
     # 최종 요약
     print("\n" + "="*70)
@@ -624,7 +803,8 @@ def main():
     print("\n다음 단계:")
     print("  1. CSV 파일로 성능 비교")
     print("  2. JSON 파일로 상세 분석")
-    print("  3. 최적 파라미터를 sql_agent.py에 적용")
+    print("  3. Latency CSV로 설정별 p50/p95 비교")
+    print("  4. 최적 파라미터를 sql_agent.py에 적용")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+"""
+LLM Deployment Pool Benchmark (로컬 fake OpenAI 호환 서버)
+
+services/llm_pool.RoutedChatModel의 라우팅/쿨다운/페일오버를 Azure 없이 확인합니다.
+배포마다 Azure OpenAI chat.completions 형식(일반/스트리밍)으로 응답하는 로컬 HTTP 서버를 띄우고,
+지연시간과 429/500 비율을 다르게 설정해 동시 요청을 보냅니다.
+
+기본 시나리오:
+- fast: 평균 80ms
+- slow: 평균 300ms
+- limited: 평균 80ms, 요청의 50%에 429 (Retry-After: 2)
+
+측정 항목: 배포별 요청 수/성공 수, 429·장애 횟수, EWMA, 전체 p50/p95 지연시간, 최종 실패 수,
+프롬프트 캐시 적중 토큰 (fake 서버는 배포별로 처음 본 첫 메시지 이후 같은 첫 메시지의 토큰을 cached로 보고)
+
+사용법:
+    cd backend
+    python -m tests.llm_pool_benchmark
+    python -m tests.llm_pool_benchmark --requests 200 --concurrency 16 --stream
+    python -m tests.llm_pool_benchmark --servers "a:50:0:0,b:50:0:0.3"   # name:latency_ms:429_rate:500_rate
+
+삭제해도 메인 시스템에 영향 없음.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import median
+from typing import List, Dict
+
+# 프로젝트 루트(backend 패키지 import용)를 path에 추가
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+os.environ.setdefault("JWT_SECRET_KEY", "llm-pool-benchmark")
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from backend.services.llm_pool import create_routed_llm
+from backend.services.llm_usage import TokenUsageCallback
+
+DEFAULT_SERVERS = "fast:80:0:0,slow:300:0:0,limited:80:0.5:0"
+
+# ============================================================
+# Fake Azure OpenAI 서버
+# ============================================================
+
+def fake_usage(request: Dict, seen_prefixes: set) -> Dict:
+    """글자 수/4를 토큰으로 보고, 이미 본 첫 메시지(정적 prefix)는 cached_tokens로 보고."""
+    messages = request.get("messages") or [{}]
+    prefix = json.dumps(messages[0], ensure_ascii=False, sort_keys=True)
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+    cached = len(prefix) // 4 if prefix in seen_prefixes else 0
+    seen_prefixes.add(prefix)
+    return {
+        "prompt_tokens": prompt_tokens, "completion_tokens": 4, "total_tokens": prompt_tokens + 4,
+        "prompt_tokens_details": {"cached_tokens": min(cached, prompt_tokens)},
+    }
+
+
+def make_handler(latency_ms: float, rate_limit: float, error_rate: float, rng: random.Random):
+    seen_prefixes: set = set()
+
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict, headers: Dict[str, str] = None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            roll = rng.random()
+            if roll < rate_limit:
+                self._send_json(429, {"error": {"code": "429", "message": "Rate limit"}}, {"Retry-After": "2"})
+                return
+            if roll < rate_limit + error_rate:
+                self._send_json(500, {"error": {"code": "500", "message": "Internal error"}})
+                return
+
+            time.sleep(max(rng.gauss(latency_ms, latency_ms * 0.2), 1) / 1000)
+            text = f"ok from {self.server.name}"
+            if not request.get("stream"):
+                self._send_json(200, {
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                    "model": "gpt-4o",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": fake_usage(request, seen_prefixes),
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for index, word in enumerate(text.split(" ")):
+                chunk = {
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": "gpt-4o",
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": (" " if index else "") + word},
+                                 "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                usage_chunk = {
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": "gpt-4o", "choices": [], "usage": fake_usage(request, seen_prefixes),
+                }
+                self.wfile.write(f"data: {json.dumps(usage_chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    return FakeOpenAIHandler
+
+
+def start_servers(spec: str, seed: int = 42) -> List[Dict]:
+    servers = []
+    for index, item in enumerate(spec.split(",")):
+        name, latency, rate_limit, error_rate = item.split(":")
+        handler = make_handler(float(latency), float(rate_limit), float(error_rate), random.Random(seed + index))
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.name = name
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append({
+            "name": name,
+            "deployment": name,
+            "endpoint": f"http://127.0.0.1:{server.server_address[1]}",
+            "api_key": "fake",
+            "api_version": "2024-08-01-preview",
+            "server": server,
+        })
+    return servers
+
+
+# ============================================================
+# 실행
+# ============================================================
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+# 모든 요청이 공유하는 정적 prefix (프롬프트 캐시 적중 확인용)
+STATIC_PREFIX = "You are a benchmark assistant. " * 200
+
+
+async def run_requests(llm, total: int, concurrency: int, stream: bool, usage: TokenUsageCallback) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    answered: Dict[str, int] = {}
+    failures: List[str] = []
+
+    async def one(index: int):
+        async with semaphore:
+            messages = [SystemMessage(content=STATIC_PREFIX), HumanMessage(content=f"request {index}")]
+            config = {"callbacks": [usage]}
+            started = time.perf_counter()
+            try:
+                if stream:
+                    text = "".join([chunk.content async for chunk in llm.astream(messages, config=config)])
+                else:
+                    text = (await llm.ainvoke(messages, config=config)).content
+            except Exception as e:
+                failures.append(type(e).__name__)
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+            name = text.rsplit(" ", 1)[-1]
+            answered[name] = answered.get(name, 0) + 1
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return {"latencies": latencies, "answered": answered, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM deployment pool benchmark with fake servers")
+    parser.add_argument("--servers", type=str, default=DEFAULT_SERVERS,
+                        help="name:latency_ms:429_rate:500_rate 목록 (쉼표 구분)")
+    parser.add_argument("--requests", type=int, default=100, help="총 요청 수 (기본: 100)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수 (기본: 8)")
+    parser.add_argument("--stream", action="store_true", help="스트리밍 요청으로 측정")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("LLM Deployment Pool Benchmark")
+    print("="*70)
+
+    servers = start_servers(args.servers)
+    config = json.dumps([{k: v for k, v in s.items() if k != "server"} for s in servers])
+    llm = create_routed_llm(config)
+    for s in servers:
+        print(f"  {s['name']}: {s['endpoint']}")
+
+    started = time.perf_counter()
+    usage = TokenUsageCallback()
+    outcome = asyncio.run(run_requests(llm, args.requests, args.concurrency, args.stream, usage))
+    elapsed = time.perf_counter() - started
+
+    latencies = outcome["latencies"]
+    print(f"\n{'배포':<12} {'요청':<8} {'응답':<8} {'429':<6} {'장애':<6} {'EWMA':<10}")
+    print("-" * 56)
+    for name, stat in llm.pool.stats().items():
+        ewma = f"{stat['ewma_ms']:.0f}ms" if stat["ewma_ms"] is not None else "-"
+        print(
+            f"{name:<12} {stat['requests']:<8} {outcome['answered'].get(name, 0):<8} "
+            f"{stat['rate_limited']:<6} {stat['failures']:<6} {ewma:<10}"
+        )
+
+    print(f"\n성공 {len(latencies)}/{args.requests} (최종 실패: {len(outcome['failures'])}) - {elapsed:.1f}s")
+    if latencies:
+        print(
+            f"p50 {median(latencies):.0f}ms / p95 {percentile(latencies, 95):.0f}ms / "
+            f"max {max(latencies):.0f}ms"
+        )
+    tokens = usage.summary()
+    if tokens:
+        print(
+            f"프롬프트 토큰 {tokens['prompt']} (cached {tokens['cached']}, "
+            f"uncached {tokens['uncached']}, 적중률 {tokens['cache_ratio']:.1%})"
+        )
+
+    for s in servers:
+        s["server"].shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,577 @@
+"""
+Offline Agent Benchmark (fake / recorded LLM + seeded SQLite)
+
+Azure OpenAI와 SQL Server 없이 에이전트 실행 경로(agent_runner.ainvoke_agent →
+create_conversational_agent → 도구/GuardedSQLDatabase)의 서버 측 오버헤드를 측정합니다.
+- fake: 질문별로 정해진 도구 호출 후 답하는 결정적 채팅 모델 (기본값)
+- --record: 실제 Azure OpenAI 응답을 JSONL로 녹화 (네트워크 필요)
+- --replay: 녹화된 응답을 재생 (오프라인, 프롬프트가 바뀌면 해당 질문은 실패로 기록)
+
+DB는 시드 데이터를 넣은 SQLite(메모리)이며, MSSQL 문법(TOP, GETUTCDATE, CAST AS DATE)은
+실행 직전에 SQLite 문법으로 바꿉니다.
+
+측정 항목: 질문당 전체 지연시간, DB 시간/쿼리 수, LLM 호출 수, 도구 호출 수, 프롬프트 토큰(추정)
+
+사용법:
+    cd backend
+    python -m tests.offline_benchmark
+    python -m tests.offline_benchmark --iterations 5 --difficulty complex
+    python -m tests.offline_benchmark --record test_results/agent_recording.jsonl
+    python -m tests.offline_benchmark --replay test_results/agent_recording.jsonl
+
+삭제해도 메인 시스템에 영향 없음.
+"""
+
+import os
+import sys
+import csv
+import json
+import re
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, asdict
+from statistics import mean, median
+
+# 프로젝트 루트(backend 패키지 import용)와 backend 디렉토리를 path에 추가
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+os.environ.setdefault("JWT_SECRET_KEY", "offline-benchmark")
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from backend import sql_agent as app_agent
+from backend.services.agent_runner import ainvoke_agent
+from backend.services.few_shot_service import dynamic_few_shot
+from backend.services.room_summary import estimate_tokens
+from backend.services.schema_context import format_table_lines
+from backend.services.sql_guard import GuardedSQLDatabase, parse_table_columns
+from tests.hyperparameter_optimizer import TEST_QUERIES
+
+# ============================================================
+# 시드 DB (SQLite)
+# ============================================================
+
+SEED_TABLES = {
+    "Experiments": """
+        CREATE TABLE Experiments (
+            exp_id INTEGER PRIMARY KEY, exp_name TEXT UNIQUE NOT NULL, researcher TEXT,
+            status TEXT, exp_date DATE, memo TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    "ExperimentData": """
+        CREATE TABLE ExperimentData (
+            data_id INTEGER PRIMARY KEY, exp_id INTEGER, material TEXT, volume REAL,
+            density REAL, mass REAL, recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    "Reagents": """
+        CREATE TABLE Reagents (
+            reagent_id TEXT PRIMARY KEY, reagent_name TEXT NOT NULL, formula TEXT,
+            purchase_date DATE, open_date DATE, current_volume REAL, total_capacity REAL,
+            purity REAL, location TEXT, density REAL, mass REAL, status TEXT,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    "ExperimentReagentUsage": """
+        CREATE TABLE ExperimentReagentUsage (
+            usage_id INTEGER PRIMARY KEY, exp_id INTEGER NOT NULL, reagent_id TEXT NOT NULL,
+            used_volume REAL, recorded_at TIMESTAMP, reagent_name TEXT, formula TEXT,
+            density REAL, mass REAL, purity REAL, location TEXT
+        )""",
+    "ReagentDisposals": """
+        CREATE TABLE ReagentDisposals (
+            disposal_id INTEGER PRIMARY KEY, reagent_id TEXT NOT NULL, disposal_date DATE NOT NULL,
+            reason TEXT NOT NULL, disposed_by TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    "FallEvents": """
+        CREATE TABLE FallEvents (
+            EventID INTEGER PRIMARY KEY, Timestamp TIMESTAMP, CameraID TEXT, RiskAngle REAL,
+            Status TEXT, EventSummary TEXT, ExperimentID TEXT, VerificationStatus INTEGER DEFAULT 0,
+            VerifiedAt TIMESTAMP, VerifySubject TEXT
+        )""",
+    "WeightLog": """
+        CREATE TABLE WeightLog (
+            LogID INTEGER PRIMARY KEY, StorageID TEXT NOT NULL, WeightValue REAL NOT NULL,
+            Status TEXT NOT NULL, EmptyTime INTEGER DEFAULT 0, RecordedAt TIMESTAMP
+        )""",
+}
+
+REAGENTS = [
+    ("Sulfuric Acid", "H2SO4"), ("Sodium Hydroxide", "NaOH"), ("Ethanol", "C2H5OH"),
+    ("Methanol", "CH3OH"), ("Acetone", "C3H6O"), ("Hydrochloric Acid", "HCl"),
+    ("Nitric Acid", "HNO3"), ("Toluene", "C7H8"),
+]
+LOCATIONS = ["Cabinet A", "Cabinet B", "Fridge 1"]
+CAMERAS = ["Cylinder_Cam_01", "Cylinder_Cam_02", "Cylinder_Cam_03"]
+RESEARCHERS = ["Kim", "Lee", "Park"]
+
+
+def _translate_mssql(statement: str, parameters):
+    """MSSQL 전용 문법을 SQLite로 변환 (TOP → LIMIT, GETUTCDATE, CAST AS DATE)."""
+    statement = statement.replace("GETUTCDATE()", "CURRENT_TIMESTAMP")
+    statement = re.sub(r"CAST\(([\w.]+) AS DATE\)", r"date(\1)", statement)
+    match = re.search(r"\bSELECT\s+(DISTINCT\s+)?TOP\s*\(?\s*(\d+|\?)\s*\)?\s+", statement, re.IGNORECASE)
+    if match:
+        limit = match.group(2)
+        statement = statement[: match.start()] + f"SELECT {match.group(1) or ''}" + statement[match.end():]
+        statement = statement.rstrip().rstrip(";") + f" LIMIT {limit}"
+        if limit == "?" and isinstance(parameters, (list, tuple)) and parameters:
+            # TOP (?)는 첫 번째 파라미터 → LIMIT ?는 마지막 파라미터
+            parameters = type(parameters)(list(parameters[1:]) + [parameters[0]])
+    return statement, parameters
+
+
+class DBTimer:
+    """엔진에서 실행된 쿼리 수와 누적 시간."""
+
+    def __init__(self, engine) -> None:
+        self.queries = 0
+        self.total_ms = 0.0
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        self.queries += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+
+    def reset(self) -> None:
+        self.queries = 0
+        self.total_ms = 0.0
+
+
+def create_seeded_engine(seed: int = 42):
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, context, executemany: _translate_mssql(statement, parameters),
+        retval=True,
+    )
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for ddl in SEED_TABLES.values():
+            conn.execute(text(ddl))
+
+        for index, (name, formula) in enumerate(REAGENTS, start=1):
+            conn.execute(
+                text(
+                    "INSERT INTO Reagents (reagent_id, reagent_name, formula, purchase_date, open_date, "
+                    "current_volume, total_capacity, purity, location, status) "
+                    "VALUES (:id, :name, :formula, :purchased, :opened, :current, 1000, 99.5, :location, 'normal')"
+                ),
+                {
+                    "id": f"R{index:03d}", "name": name, "formula": formula,
+                    "purchased": (now - timedelta(days=200)).date(),
+                    "opened": None if index % 3 == 0 else (now - timedelta(days=100)).date(),
+                    "current": round(rng.uniform(50, 1000), 1),
+                    "location": LOCATIONS[index % len(LOCATIONS)],
+                },
+            )
+
+        for exp_id in range(1, 13):
+            conn.execute(
+                text(
+                    "INSERT INTO Experiments (exp_id, exp_name, researcher, status, exp_date, created_at) "
+                    "VALUES (:id, :name, :researcher, :status, :date, :created)"
+                ),
+                {
+                    "id": exp_id, "name": f"Exp_{exp_id:03d}",
+                    "researcher": RESEARCHERS[exp_id % len(RESEARCHERS)],
+                    "status": "in_progress" if exp_id > 8 else "completed",
+                    "date": (now - timedelta(days=40 - exp_id * 3)).date(),
+                    "created": now - timedelta(days=40 - exp_id * 3),
+                },
+            )
+
+        for usage_id in range(1, 121):
+            name, formula = REAGENTS[rng.randrange(len(REAGENTS))]
+            conn.execute(
+                text(
+                    "INSERT INTO ExperimentReagentUsage (usage_id, exp_id, reagent_id, used_volume, recorded_at, "
+                    "reagent_name, formula, location) VALUES (:id, :exp, :rid, :used, :at, :name, :formula, :location)"
+                ),
+                {
+                    "id": usage_id, "exp": rng.randint(1, 12),
+                    "rid": f"R{REAGENTS.index((name, formula)) + 1:03d}",
+                    "used": round(rng.uniform(1, 50), 1),
+                    "at": now - timedelta(hours=rng.randint(0, 24 * 30)),
+                    "name": name, "formula": formula, "location": LOCATIONS[0],
+                },
+            )
+
+        for disposal_id in range(1, 6):
+            conn.execute(
+                text(
+                    "INSERT INTO ReagentDisposals (disposal_id, reagent_id, disposal_date, reason, disposed_by) "
+                    "VALUES (:id, :rid, :date, 'expired', 'Kim')"
+                ),
+                {"id": disposal_id, "rid": f"R{disposal_id:03d}", "date": (now - timedelta(days=disposal_id * 4)).date()},
+            )
+
+        for event_id in range(1, 301):
+            status = rng.choice([0, 1, 1, 2])
+            conn.execute(
+                text(
+                    "INSERT INTO FallEvents (EventID, Timestamp, CameraID, RiskAngle, Status, ExperimentID, "
+                    "VerificationStatus) VALUES (:id, :ts, :cam, :angle, 'FALL_CONFIRMED', :exp, :vs)"
+                ),
+                {
+                    "id": event_id, "ts": now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+                    "cam": rng.choice(CAMERAS), "angle": round(rng.uniform(45, 90), 1),
+                    "exp": f"Exp_{rng.randint(1, 12):03d}", "vs": status,
+                },
+            )
+
+        for log_id in range(1, 2001):
+            empty = rng.random() < 0.2
+            conn.execute(
+                text(
+                    "INSERT INTO WeightLog (LogID, StorageID, WeightValue, Status, EmptyTime, RecordedAt) "
+                    "VALUES (:id, :sid, :weight, :status, :empty_time, :at)"
+                ),
+                {
+                    "id": log_id, "sid": "Alpha" if log_id % 2 else "Beta",
+                    "weight": 0.0 if empty else round(rng.uniform(100, 900), 1),
+                    "status": "Empty" if empty else "Occupied",
+                    "empty_time": rng.randint(1, 300) if empty else 0,
+                    "at": now - timedelta(minutes=log_id * 10),
+                },
+            )
+    return engine
+
+
+def build_schema(engine):
+    """schema_context와 같은 형식의 (문서, custom_table_info)를 SQLite 카탈로그로 생성."""
+    inspector = inspect(engine)
+    rows = []
+    for table in SEED_TABLES:
+        pk = set(inspector.get_pk_constraint(table).get("constrained_columns") or [])
+        for column in inspector.get_columns(table):
+            rows.append({
+                "table_name": table,
+                "column_name": column["name"],
+                "data_type": str(column["type"]).lower(),
+                "is_nullable": "YES" if column.get("nullable") else "NO",
+                "is_pk": column["name"] in pk,
+            })
+    table_lines = format_table_lines(rows)
+    document = "\n".join(f"- {line}" for line in table_lines.values())
+    return document, table_lines
+
+
+# ============================================================
+# 결정적 fake 채팅 모델
+# ============================================================
+
+# 질문 → 도구 호출 순서 (마지막 도구 결과로 답변)
+FAKE_SCRIPTS: Dict[str, List[tuple]] = {
+    "황산 재고 있어?": [("get_reagent_stock", {"reagent_name": "Sulfuric Acid"})],
+    "실험 목록 보여줘": [("sql_db_query", {"query": "SELECT exp_id, exp_name, researcher, status FROM Experiments ORDER BY created_at DESC"})],
+    "총 시약 개수가 몇 개야?": [("sql_db_query", {"query": "SELECT COUNT(*) AS total FROM Reagents WHERE status != 'disposed' OR status IS NULL"})],
+    "가장 최근 사고 알려줘": [("sql_db_query", {"query": "SELECT TOP 1 EventID, Timestamp, CameraID, RiskAngle, Status FROM FallEvents ORDER BY Timestamp DESC"})],
+    "진행 중인 실험에서 사용된 시약 목록 보여줘": [("sql_db_query", {"query": (
+        "SELECT e.exp_name, u.reagent_name, u.used_volume FROM Experiments e "
+        "JOIN ExperimentReagentUsage u ON e.exp_id = u.exp_id WHERE e.status = 'in_progress'"
+    )})],
+    "위치별 시약 재고 현황 알려줘": [("sql_db_query", {"query": (
+        "SELECT location, COUNT(*) AS reagents, SUM(current_volume) AS total_volume FROM Reagents GROUP BY location"
+    )})],
+    "이번 달 폐기된 시약 목록": [("sql_db_query", {"query": (
+        "SELECT d.disposal_date, r.reagent_name, d.reason FROM ReagentDisposals d "
+        "JOIN Reagents r ON d.reagent_id = r.reagent_id ORDER BY d.disposal_date DESC"
+    )})],
+    "연구원별 실험 횟수 알려줘": [("sql_db_query", {"query": "SELECT researcher, COUNT(*) AS experiments FROM Experiments GROUP BY researcher"})],
+    "카메라별 사고 발생 횟수": [("aggregate_lab_data", {"metric": "fall_events_by_camera", "days": 30, "top_k": 5})],
+    "가장 많이 사용된 시약 TOP 3와 각각의 총 사용량 알려줘": [("aggregate_lab_data", {"metric": "reagent_usage_top", "days": 90, "top_k": 3})],
+    "최근 7일간 사고 발생 추이와 확인 처리율 분석해줘": [("aggregate_lab_data", {"metric": "fall_events_daily", "days": 7})],
+    "가장채근삭오알여조": [("sql_db_query", {"query": "SELECT TOP 1 EventID, Timestamp, CameraID FROM FallEvents ORDER BY Timestamp DESC"})],
+    "개봉일이 없는 시약 목록": [("sql_db_query", {"query": "SELECT reagent_name, formula, location FROM Reagents WHERE open_date IS NULL"})],
+}
+
+
+def _message_text(message) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """사용자 메시지의 마지막 줄(질문)로 FAKE_SCRIPTS를 찾아 도구 호출/답변을 순서대로 반환."""
+
+    latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        human_index = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        question = _message_text(messages[human_index]).strip().splitlines()[-1]
+        observations = [m for m in messages[human_index:] if isinstance(m, ToolMessage)]
+        script = FAKE_SCRIPTS.get(question, [])
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        step = len(observations)
+        if step < len(script):
+            name, args = script[step]
+            message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{step}"}])
+        else:
+            last = _message_text(observations[-1])[:300] if observations else "관련 데이터가 필요하지 않은 질문입니다."
+            message = AIMessage(content=f"[fake] {question}\n{last}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class RecordedChatModel(BaseChatModel):
+    """inner 모델 응답을 녹화하거나(record), 녹화 파일에서 재생(replay)."""
+
+    recording_path: str
+    inner: Any = None
+    _records: Dict[str, dict] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.inner is None and os.path.exists(self.recording_path):
+            with open(self.recording_path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._records[record["key"]] = record["message"]
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded"
+
+    @staticmethod
+    def request_key(messages, tools) -> str:
+        payload = [
+            [m.type, _message_text(m), getattr(m, "tool_calls", None), getattr(m, "tool_call_id", None)]
+            for m in messages
+        ]
+        raw = json.dumps([payload, tools], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = self.request_key(messages, kwargs.get("tools"))
+        if self.inner is None:
+            record = self._records.get(key)
+            if record is None:
+                raise KeyError("No recorded response for this prompt (prompt changed since recording?)")
+            message = messages_from_dict([record])[0]
+        else:
+            message = self.inner.invoke(messages, stop=stop, **kwargs)
+            with open(self.recording_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "message": message_to_dict(message)}, ensure_ascii=False) + "\n")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# ============================================================
+# 측정
+# ============================================================
+
+class UsageCallback(BaseCallbackHandler):
+    """LLM 호출 수, 프롬프트 토큰(추정: 메시지 + 도구 스키마), 도구 호출 수."""
+
+    def __init__(self) -> None:
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.tool_calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        self.llm_calls += 1
+        for batch in messages:
+            self.prompt_tokens += sum(estimate_tokens(_message_text(m)) for m in batch)
+        tools = (kwargs.get("invocation_params") or {}).get("tools")
+        if tools:
+            self.prompt_tokens += estimate_tokens(json.dumps(tools, ensure_ascii=False))
+
+    def on_tool_start(self, serialized, input_str, **kwargs) -> None:
+        self.tool_calls += 1
+
+
+@dataclass
+class OfflineResult:
+    mode: str
+    iteration: int
+    query: str
+    difficulty: str
+    latency_ms: float
+    db_ms: float
+    db_queries: int
+    llm_calls: int
+    tool_calls: int
+    prompt_tokens: int
+    execution_success: bool
+    error_message: Optional[str] = None
+
+
+async def run_query(agent, timer: DBTimer, mode: str, iteration: int, query_info: Dict) -> OfflineResult:
+    query = query_info["query"]
+    usage = UsageCallback()
+    agent_with_usage = agent.with_config({"callbacks": [usage]})
+    timer.reset()
+
+    started = time.perf_counter()
+    try:
+        await ainvoke_agent(agent_with_usage, dynamic_few_shot.augment(query, query))
+        success, error = True, None
+    except Exception as e:
+        success, error = False, str(e)
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    return OfflineResult(
+        mode=mode,
+        iteration=iteration,
+        query=query,
+        difficulty=query_info["difficulty"],
+        latency_ms=latency_ms,
+        db_ms=timer.total_ms,
+        db_queries=timer.queries,
+        llm_calls=usage.llm_calls,
+        tool_calls=usage.tool_calls,
+        prompt_tokens=usage.prompt_tokens,
+        execution_success=success,
+        error_message=error,
+    )
+
+
+async def run_benchmark(agent, timer: DBTimer, mode: str, queries: List[Dict], iterations: int) -> List[OfflineResult]:
+    results = []
+    for iteration in range(1, iterations + 1):
+        print(f"  반복 {iteration}/{iterations}...")
+        for query_info in queries:
+            result = await run_query(agent, timer, mode, iteration, query_info)
+            results.append(result)
+            status = "✓" if result.execution_success else "✗"
+            print(
+                f"    {status} {result.query[:30]}... ({result.latency_ms:.1f}ms, "
+                f"DB {result.db_ms:.1f}ms/{result.db_queries}q, {result.tool_calls} tools, "
+                f"prompt ~{result.prompt_tokens} tok)"
+            )
+    return results
+
+
+# ============================================================
+# 결과 저장 및 분석
+# ============================================================
+
+def save_results(results: List[OfflineResult], output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_filepath = os.path.join(output_dir, f"offline_benchmark_{timestamp}.csv")
+
+    with open(csv_filepath, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=list(asdict(results[0]).keys()))
+        writer.writeheader()
+        for r in results:
+            writer.writerow(asdict(r))
+    return csv_filepath
+
+
+def print_summary(results: List[OfflineResult]) -> None:
+    print(f"\n{'='*78}")
+    print("난이도별 요약 (서버 측 오버헤드 = 지연시간 - DB 시간, fake 모델 기준)")
+    print(f"{'='*78}")
+    print(f"\n{'난이도':<11} {'p50 지연':<10} {'서버 오버헤드':<13} {'DB 시간':<9} {'쿼리 수':<8} {'도구 호출':<9} {'프롬프트 토큰':<12} {'성공률':<7}")
+    print("-" * 78)
+
+    for difficulty in ["simple", "medium", "complex", "edge_case"]:
+        rows = [r for r in results if r.difficulty == difficulty]
+        if not rows:
+            continue
+        print(
+            f"{difficulty:<11} {median(r.latency_ms for r in rows):<7.1f}ms  "
+            f"{mean(r.latency_ms - r.db_ms for r in rows):<10.1f}ms  "
+            f"{mean(r.db_ms for r in rows):<6.1f}ms  "
+            f"{mean(r.db_queries for r in rows):<8.1f} {mean(r.tool_calls for r in rows):<9.1f} "
+            f"{mean(r.prompt_tokens for r in rows):<12.0f} "
+            f"{sum(1 for r in rows if r.execution_success) / len(rows):<7.1%}"
+        )
+
+
+# ============================================================
+# 메인 실행
+# ============================================================
+
+def build_agent(llm, engine):
+    app_agent.db_engine = engine
+    document, table_info = build_schema(engine)
+    db = GuardedSQLDatabase(
+        engine,
+        include_tables=sorted(table_info),
+        sample_rows_in_table_info=0,
+        custom_table_info=table_info,
+        lazy_table_reflection=True,
+        table_columns=parse_table_columns(table_info),
+    )
+    dynamic_few_shot.configure(app_agent.FEW_SHOT_EXAMPLES, app_agent.EXAMPLE_TEMPLATE)
+    return app_agent.create_conversational_agent(
+        llm, db, schema_context=document, embed_examples=not dynamic_few_shot.enabled
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline agent benchmark (fake/recorded LLM + SQLite)")
+    parser.add_argument("--iterations", type=int, default=3, help="반복 횟수 (기본: 3)")
+    parser.add_argument("--difficulty", type=str, default="all",
+                        help="테스트 난이도 (simple/medium/complex/edge_case/all)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="fake 모델 응답 지연 (기본: 0)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", type=str, default=None, help="실제 Azure OpenAI 응답을 녹화할 JSONL 경로")
+    group.add_argument("--replay", type=str, default=None, help="재생할 녹화 JSONL 경로")
+    parser.add_argument("--output", type=str, default=None, help="결과 저장 디렉토리")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("Offline Agent Benchmark")
+    print("="*70)
+
+    print("\n[1/3] 시드 DB 및 모델 준비 중...")
+    engine = create_seeded_engine()
+    timer = DBTimer(engine)
+    if args.record:
+        from tests.hyperparameter_optimizer import load_environment, get_llm
+        load_environment()
+        llm, mode = RecordedChatModel(recording_path=args.record, inner=get_llm(temperature=0.0)), "record"
+    elif args.replay:
+        llm, mode = RecordedChatModel(recording_path=args.replay), "replay"
+    else:
+        llm, mode = ScriptedChatModel(latency_ms=args.llm_latency_ms), "fake"
+    agent = build_agent(llm, engine)
+    print(f"  완료! (모드: {mode})")
+
+    difficulties = ["simple", "medium", "complex", "edge_case"] if args.difficulty == "all" else [args.difficulty]
+    queries = [q for diff in difficulties for q in TEST_QUERIES.get(diff, [])]
+
+    print(f"\n[2/3] 테스트 실행 중... (쿼리 {len(queries)}개)")
+    results = asyncio.run(run_benchmark(agent, timer, mode, queries, args.iterations))
+
+    output_dir = args.output or os.path.join(BACKEND_DIR, "test_results")
+    csv_path = save_results(results, output_dir)
+
+    print_summary(results)
+    print("\n" + "="*70)
+    print("[3/3] 테스트 완료!")
+    print("="*70)
+    print(f"\n결과 파일: {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
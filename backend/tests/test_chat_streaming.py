@@ -0,0 +1,124 @@
+"""
+SSE 스트리밍 경로 테스트 (fake 스트리밍 LLM + 시드 SQLite)
+
+Azure OpenAI / SQL Server 없이 stream_agent_events와 stream_message_pair가 보내는
+이벤트 순서(tool_start → tool_end → token* → final/done, 실패 시 error)를 확인합니다.
+
+사용법:
+    cd backend
+    python -m pytest tests/test_chat_streaming.py -q
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from tests.offline_benchmark import build_agent, create_seeded_engine
+
+from backend.services import chat_rooms_service
+from backend.services.answer_cache import answer_cache
+from backend.services.plan_cache import plan_cache
+
+QUESTION = "황산 재고 있어?"
+ANSWER = "황산 재고는 충분합니다."
+
+
+class ToolCallingFakeChatModel(GenericFakeChatModel):
+    """GenericFakeChatModel은 bind_tools가 없으므로 도구 목록을 무시하고 자기 자신을 반환."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _tool_call_message(name: str, args: dict) -> AIMessage:
+    # GenericFakeChatModel은 additional_kwargs만 청크로 스트리밍하므로 OpenAI tool_calls 형식으로 전달
+    call = {"id": "call_0", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+    return AIMessage(content="", additional_kwargs={"tool_calls": [call]})
+
+
+@pytest.fixture
+def agent():
+    logging.disable(logging.CRITICAL)
+    llm = ToolCallingFakeChatModel(messages=iter([
+        _tool_call_message("get_reagent_stock", {"reagent_name": "Sulfuric Acid"}),
+        AIMessage(content=ANSWER),
+    ]))
+    yield build_agent(llm, create_seeded_engine())
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def room(monkeypatch):
+    """DB 저장/캐시/요약을 메모리 기록으로 대체한 채팅방."""
+    saved = {"logs": [], "assistant": None}
+
+    def row(message_id, role, content):
+        return {"message_id": message_id, "room_id": 1, "role": role, "content": content, "created_at": datetime(2024, 1, 1)}
+
+    def save_assistant_message(engine, room_id, output, message, user_name, status, details):
+        saved["assistant"] = {"output": output, "status": status}
+        return row(2, "assistant", output)
+
+    monkeypatch.setattr(chat_rooms_service, "get_conversation_context", lambda engine, room_id: (None, []))
+    monkeypatch.setattr(chat_rooms_service, "save_user_message", lambda engine, room_id, message, *args: row(1, "user", message))
+    monkeypatch.setattr(chat_rooms_service, "save_assistant_message", save_assistant_message)
+    monkeypatch.setattr(chat_rooms_service, "record_chat_log", lambda engine, user, command, status, *args: saved["logs"].append(status))
+    monkeypatch.setattr(chat_rooms_service.room_summarizer, "schedule", lambda engine, room_id: None)
+    monkeypatch.setattr(chat_rooms_service, "run_fast_path", lambda engine, message, user_name: None)
+    monkeypatch.setattr(answer_cache, "enabled", False)
+    monkeypatch.setattr(plan_cache, "enabled", False)
+    return saved
+
+
+async def _collect_events(agent):
+    return [item async for item in chat_rooms_service.stream_agent_events(agent, QUESTION)]
+
+
+async def _collect_frames(agent):
+    frames = []
+    async for frame in chat_rooms_service.stream_message_pair(None, agent, 1, QUESTION, "tester", "user", "u1"):
+        event = frame.split("\n", 1)[0].removeprefix("event: ")
+        frames.append(event)
+    return frames
+
+
+def _squash(names):
+    """연속된 token 이벤트를 하나로 합친 이벤트 이름 목록."""
+    return [name for index, name in enumerate(names) if not (name == "token" and index and names[index - 1] == "token")]
+
+
+def test_stream_agent_events_sequence(agent):
+    events = asyncio.run(_collect_events(agent))
+    names = [name for name, _ in events]
+
+    assert _squash(names) == ["tool_start", "tool_end", "token", "final"]
+    assert events[0][1]["name"] == "get_reagent_stock"
+    assert "".join(data["text"] for name, data in events if name == "token") == ANSWER
+    final = events[-1][1]
+    assert final["output"] == ANSWER
+    assert len(final["intermediate_steps"]) == 1
+
+
+def test_stream_message_pair_frames(agent, room):
+    frames = asyncio.run(_collect_frames(agent))
+
+    assert _squash(frames) == ["user_message", "tool_start", "tool_end", "token", "done"]
+    assert room["assistant"] == {"output": ANSWER, "status": "completed"}
+    assert room["logs"] == []
+
+
+def test_stream_message_pair_fast_path_error(agent, room, monkeypatch):
+    def broken_router(engine, message, user_name):
+        raise RuntimeError("router failed")
+
+    monkeypatch.setattr(chat_rooms_service, "run_fast_path", broken_router)
+    frames = asyncio.run(_collect_frames(agent))
+
+    assert frames == ["user_message", "error"]
+    assert room["logs"] == ["failed"]
+    assert room["assistant"] is None
@@ -8,6 +8,12 @@ DEFAULT_ROOM_TYPE = "public"
 
 CHAT_STATUS_COMPLETED = "completed"
 CHAT_STATUS_FAILED = "failed"
+CHAT_STATUS_CANCELLED = "cancelled"
+
+# 에이전트 준비 상태 (API 시작 후 백그라운드에서 생성)
+AGENT_STATUS_WARMING = "warming"
+AGENT_STATUS_READY = "ready"
+AGENT_STATUS_FAILED = "failed"
 
 ROLE_USER = "user"
 ROLE_ASSISTANT = "assistant"
@@ -22,8 +28,20 @@ ASSISTANT_SENDER_NAME = "Assistant"
 SYSTEM_USER_NAME = "system"
 
 MAX_HISTORY_MESSAGES = 10  # 최대 10개 메시지 (5턴)
+# 에이전트 입력에서 대화 컨텍스트(방 단위로 안정적인 앞부분)와 이번 턴 정보(시간/예시/질문)의 경계
+CURRENT_TURN_HEADER = "[현재 요청]"
 MAX_PREVIEW_LENGTH = 200
 
+# Rolling summary / history budget
+HISTORY_TOKEN_BUDGET = 1200  # 프롬프트의 히스토리(요약 + 최근 메시지) 최대 토큰 (추정치)
+HISTORY_MESSAGE_MAX_CHARS = 600  # 히스토리에 넣을 메시지 1개당 최대 글자 수
+SUMMARY_KEEP_RECENT_MESSAGES = 4  # 요약하지 않고 원문으로 유지할 최근 메시지 수
+SUMMARY_MAX_CHARS = 1500
+SUMMARY_BATCH_MESSAGES = 40  # 요약 갱신 1회에 접어 넣을 최대 메시지 수
+# 최근 원문 외에 이만큼 쌓였을 때만 요약 갱신 (매 답변마다 LLM 호출하지 않도록).
+# KEEP_RECENT + FOLD_MIN <= MAX_HISTORY_MESSAGES여야 요약 전 메시지가 히스토리 창 안에 남음
+SUMMARY_FOLD_MIN_MESSAGES = 6
+
 # ---------------------------------------------------------------------------
 # Verification Status (FallEvents)
 # ---------------------------------------------------------------------------
@@ -70,3 +88,83 @@ VERIFY_KEYWORDS = (
     "확인 처리해 줘",
 )
 REJECT_KEYWORDS = ("오탐", "오류", "거짓", "무효", "거절", "false", "glitch")
+
+# ---------------------------------------------------------------------------
+# Intent Router (LLM 없이 도구를 직접 호출하는 질문 유형)
+# ---------------------------------------------------------------------------
+# 저울/창고 질문은 이 ID(또는 "Storage-X" 형태)가 명시된 경우에만 바로 조회
+KNOWN_STORAGE_IDS = ("Alpha", "Beta")
+
+PENDING_KEYWORDS = ("미확인", "확인 안 된", "확인 안된", "확인되지 않은", "검증 대기", "pending", "unverified")
+SUMMARY_KEYWORDS = ("요약", "summary", "summarize")
+STORAGE_KEYWORDS = (
+    "저울",
+    "창고",
+    "보관함",
+    "비어",
+    "비었",
+    "무게",
+    "scale",
+    "storage",
+    "empty",
+    "occupied",
+    "weight",
+)
+STOCK_KEYWORDS = ("재고", "남았", "남아", "남은", "잔량", "left", "in stock")
+# 단건 재고 조회가 아닌 질문 (목록/순위/시간) → LLM으로 위임
+NON_STOCK_KEYWORDS = (
+    "목록", "현황", "위치별", "list",
+    "어떤", "무슨", "가장", "제일", "which", "most",
+    "시간", "기간", "며칠", "time", "days",
+)
+ANALYTIC_KEYWORDS = ("추이", "분석", "통계", "횟수", "일간", "주간", "월간", "trend")
+# 시약 이름으로 보기 어려운 일반 명사 (이 단어만 추출되면 LLM으로 넘김)
+GENERIC_REAGENT_WORDS = (
+    "시약", "전체", "모든", "모두", "총", "우리", "랩", "랩에", "재고", "얼마나", "몇", "많이", "아직", "지금", "현재",
+)
+
+# ---------------------------------------------------------------------------
+# Agent caches
+# ---------------------------------------------------------------------------
+# 이전 대화를 참조하는 표현 (질문 텍스트만으로 캐시/병합하면 안 됨)
+CONTEXT_DEPENDENT_KEYWORDS = (
+    "그거",
+    "그것",
+    "이거",
+    "이것",
+    "저거",
+    "저것",
+    "방금",
+    "아까",
+    "위에",
+    "앞에서",
+    "다시",
+    " it ",
+    " that ",
+    " previous ",
+)
+# 현재 시각 기준 기간을 가리키는 표현 (같은 질문이라도 시간이 지나면 답이 바뀜 → 답변 캐시 제외)
+TIME_RELATIVE_KEYWORDS = (
+    "오늘",
+    "어제",
+    "그제",
+    "최근",
+    "요즘",
+    "이번 주",
+    "이번주",
+    "지난주",
+    "지난 주",
+    "이번 달",
+    "이번달",
+    "지난달",
+    "지난 달",
+    "올해",
+    "today",
+    "yesterday",
+    "recent",
+    "this week",
+    "last week",
+    "this month",
+    "last month",
+    "this year",
+)
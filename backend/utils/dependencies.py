@@ -4,11 +4,15 @@ from typing import Any, Dict
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from .constants import AGENT_STATUS_FAILED, AGENT_STATUS_WARMING
+from .metrics import metrics
 from .security import decode_access_token
 from ..repositories import users_repo
 
 security = HTTPBearer(auto_error=False)
 
+AGENT_WARMUP_RETRY_AFTER_SECONDS = 5
+
 
 def get_current_user(
     request: Request,
@@ -70,3 +74,23 @@ def csrf_protect(request: Request) -> None:
         raise HTTPException(status_code=403, detail={"code": "CSRF_MISSING"})
     if header != cookie:
         raise HTTPException(status_code=403, detail={"code": "CSRF_INVALID"})
+
+
+def get_agent(request: Request):
+    """
+    준비된 에이전트 실행기 풀을 반환합니다.
+    startup 후 백그라운드 생성이 끝나기 전이면 503 {"code": "AGENT_WARMING"} + Retry-After.
+    """
+    agent = getattr(request.app.state, "agent_pool", None)
+    if agent is not None:
+        return agent
+
+    status = getattr(request.app.state, "agent_status", AGENT_STATUS_WARMING)
+    if status == AGENT_STATUS_FAILED:
+        raise HTTPException(status_code=500, detail="Agent initialization failed")
+    metrics.incr("agent.warming_rejected")
+    raise HTTPException(
+        status_code=503,
+        detail={"code": "AGENT_WARMING", "status": status},
+        headers={"Retry-After": str(AGENT_WARMUP_RETRY_AFTER_SECONDS)},
+    )
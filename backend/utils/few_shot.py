@@ -0,0 +1,72 @@
+"""Local few-shot example selection with character n-gram TF-IDF.
+
+임베딩 서비스 없이 질문과 예제 입력의 문자 n-gram TF-IDF 코사인 유사도로 상위 k개를 고릅니다.
+한국어는 조사/어미 변화가 많아 단어 단위보다 문자 n-gram이 안정적입니다.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from .question import normalize_question
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int] = (2, 3)) -> Counter:
+    """단어 경계를 공백으로 패딩한 문자 n-gram 빈도 (sklearn의 char_wb와 유사)."""
+    grams: Counter = Counter()
+    low, high = ngram_range
+    for word in normalize_question(text).split():
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+class TfidfExampleSelector:
+    """Top-k example selection by cosine similarity of char n-gram TF-IDF vectors."""
+
+    def __init__(
+        self,
+        examples: Sequence[Mapping[str, str]],
+        input_key: str = "input",
+        ngram_range: Tuple[int, int] = (2, 3),
+    ) -> None:
+        self.examples = list(examples)
+        self.input_key = input_key
+        self.ngram_range = ngram_range
+
+        counts = [char_ngrams(example[input_key], ngram_range) for example in self.examples]
+        doc_freq: Counter = Counter()
+        for grams in counts:
+            doc_freq.update(grams.keys())
+        total = len(counts)
+        # smooth idf (sklearn 기본값과 동일)
+        self._idf: Dict[str, float] = {
+            gram: math.log((1 + total) / (1 + freq)) + 1.0 for gram, freq in doc_freq.items()
+        }
+        self._vectors = [self._vectorize(grams) for grams in counts]
+
+    def _vectorize(self, grams: Counter) -> Dict[str, float]:
+        weights = {gram: count * self._idf[gram] for gram, count in grams.items() if gram in self._idf}
+        norm = math.sqrt(sum(value * value for value in weights.values()))
+        if not norm:
+            return {}
+        return {gram: value / norm for gram, value in weights.items()}
+
+    def scores(self, question: str) -> List[float]:
+        query = self._vectorize(char_ngrams(question, self.ngram_range))
+        return [
+            sum(weight * vector.get(gram, 0.0) for gram, weight in query.items())
+            for vector in self._vectors
+        ]
+
+    def select(self, question: str, k: int, min_score: float = 0.0) -> List[Mapping[str, str]]:
+        ranked = sorted(enumerate(self.scores(question)), key=lambda item: item[1], reverse=True)
+        return [self.examples[index] for index, score in ranked[:k] if score > min_score]
+
+
+def format_examples(examples: Sequence[Mapping[str, str]], template: str) -> str:
+    return "\n\n".join(template.format(**example) for example in examples)
@@ -0,0 +1,56 @@
+"""In-process metrics registry (counters, observations, gauges).
+
+Exposed through `GET /api/health/metrics`. Values are per-worker.
+"""
+
+from threading import Lock
+from typing import Any, Callable, Dict
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counters: Dict[str, float] = {}
+        self._observations: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a sample (latency, size, ...); keeps count/sum/max."""
+        with self._lock:
+            stat = self._observations.get(name)
+            if stat is None:
+                stat = {"count": 0, "sum": 0.0, "max": 0.0}
+                self._observations[name] = stat
+            stat["count"] += 1
+            stat["sum"] += value
+            stat["max"] = max(stat["max"], value)
+
+    def register_gauge(self, name: str, func: Callable[[], Any]) -> None:
+        """Register a callable evaluated at snapshot time."""
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            observations = {
+                name: {**stat, "avg": stat["sum"] / stat["count"] if stat["count"] else 0.0}
+                for name, stat in self._observations.items()
+            }
+            gauges = dict(self._gauges)
+
+        gauge_values: Dict[str, Any] = {}
+        for name, func in gauges.items():
+            try:
+                gauge_values[name] = func()
+            except Exception as exc:
+                gauge_values[name] = f"error: {exc}"
+
+        return {"counters": counters, "observations": observations, "gauges": gauge_values}
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,31 @@
+"""Question normalization helpers shared by the agent caches."""
+
+import hashlib
+import re
+import unicodedata
+
+from .constants import CONTEXT_DEPENDENT_KEYWORDS, TIME_RELATIVE_KEYWORDS
+
+_PUNCTUATION_RE = re.compile(r"[\s\?\!\.\,\~…·'\"‘’“”]+")
+
+
+def normalize_question(text: str) -> str:
+    """대소문자/전각문자/공백/문장부호 차이를 제거한 비교용 질문 문자열."""
+    normalized = unicodedata.normalize("NFKC", text or "").lower()
+    return _PUNCTUATION_RE.sub(" ", normalized).strip()
+
+
+def question_hash(text: str) -> str:
+    return hashlib.sha256(normalize_question(text).encode("utf-8")).hexdigest()
+
+
+def is_context_dependent(text: str) -> bool:
+    """이전 대화를 가리키는 질문("그거 얼마나 남았어?")은 질문만으로 답이 정해지지 않음."""
+    normalized = f" {normalize_question(text)} "
+    return any(keyword in normalized for keyword in CONTEXT_DEPENDENT_KEYWORDS)
+
+
+def is_time_relative(text: str) -> bool:
+    """현재 시각 기준 기간을 묻는 질문("오늘 사고 몇 건?")은 데이터가 그대로여도 답이 바뀜."""
+    normalized = normalize_question(text)
+    return any(keyword in normalized for keyword in TIME_RELATIVE_KEYWORDS)
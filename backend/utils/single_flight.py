@@ -0,0 +1,185 @@
+"""Single-flight coalescing of identical concurrent async calls.
+
+같은 키의 작업이 이미 실행 중이면 새로 실행하지 않고 그 결과를 함께 받습니다.
+- 워커 내부: asyncio.Future로 대기 (항상 사용)
+- 워커 간: Redis `SET NX` 락을 잡은 워커만 실행하고, 결과를 짧은 TTL 키로 게시하면
+  다른 워커는 폴링으로 결과를 받습니다. Redis 미사용/장애 시 워커 내부 병합만 동작합니다.
+리더가 실패하면 결과를 게시하지 않고 락만 해제하므로, 대기자는 다시 리더 선출을 시도합니다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import metrics
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_FAILED = object()
+
+
+class Flight:
+    """acquire() 결과. leader면 실행 후 complete()/fail()을 반드시 호출해야 합니다."""
+
+    def __init__(
+        self,
+        group: "SingleFlight",
+        key: str,
+        leader: bool,
+        result: Any = None,
+        future: Optional[asyncio.Future] = None,
+        lock_token: Optional[str] = None,
+    ) -> None:
+        self._group = group
+        self.key = key
+        self.leader = leader
+        self.result = result
+        self._future = future
+        self._lock_token = lock_token
+        self._finished = not leader
+
+    def complete(self, value: Any) -> None:
+        self._finish(value)
+
+    def fail(self) -> None:
+        """complete() 이후 호출은 무시되므로 finally 블록에서 안전하게 호출할 수 있습니다."""
+        self._finish(_FAILED)
+
+    def _finish(self, value: Any) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        self._group._finish(self.key, self._future, self._lock_token, value)
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        namespace: str,
+        lock_ttl_seconds: int,
+        result_ttl_seconds: int = 10,
+        poll_interval: float = 0.2,
+        enabled: bool = True,
+    ) -> None:
+        self.namespace = namespace
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+        self._local: Dict[str, asyncio.Future] = {}
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.namespace}:lock:{key}"
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.namespace}:result:{key}"
+
+    async def acquire(self, key: str, max_attempts: int = 3) -> Flight:
+        """
+        리더면 Flight(leader=True), 다른 실행의 결과를 받았으면 Flight(leader=False, result=...).
+        리더가 계속 실패하면 max_attempts 후 조정 없이 직접 실행하도록 leader로 반환합니다.
+        """
+        if not self.enabled:
+            return Flight(self, key, leader=True)
+
+        for _ in range(max_attempts):
+            existing = self._local.get(key)
+            if existing is not None:
+                value = await asyncio.shield(existing)
+                if value is not _FAILED:
+                    metrics.incr(f"{self.namespace}.shared_local")
+                    return Flight(self, key, leader=False, result=value)
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._local[key] = future
+            token = uuid.uuid4().hex
+            try:
+                locked = self._try_lock(key, token)
+                if locked:
+                    metrics.incr(f"{self.namespace}.leader")
+                    return Flight(self, key, leader=True, future=future, lock_token=token if locked is True else None)
+                value = await self._wait_remote(key)
+            except BaseException:
+                self._resolve_local(key, future, _FAILED)
+                raise
+
+            # 다른 워커의 결과를 이 워커의 대기자에게도 전달
+            self._resolve_local(key, future, value)
+            if value is not _FAILED:
+                metrics.incr(f"{self.namespace}.shared_remote")
+                return Flight(self, key, leader=False, result=value)
+
+        metrics.incr(f"{self.namespace}.uncoordinated")
+        return Flight(self, key, leader=True)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """func 결과(JSON 직렬화 가능해야 함)를 같은 키의 동시 호출과 공유합니다."""
+        flight = await self.acquire(key)
+        if not flight.leader:
+            return flight.result
+        try:
+            value = await func()
+        except BaseException:
+            flight.fail()
+            raise
+        flight.complete(value)
+        return value
+
+    def _try_lock(self, key: str, token: str):
+        """True: Redis 락 획득, "local": Redis 없음(워커 내부 리더), False: 다른 워커가 실행 중."""
+        r = get_redis()
+        if r is None:
+            return "local"
+        try:
+            return bool(r.set(self._lock_key(key), token, nx=True, ex=self.lock_ttl_seconds))
+        except Exception as exc:
+            logger.warning("Single-flight lock error (%s): %s", self.namespace, exc)
+            return "local"
+
+    async def _wait_remote(self, key: str) -> Any:
+        deadline = monotonic() + self.lock_ttl_seconds
+        while monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            r = get_redis()
+            if r is None:
+                return _FAILED
+            try:
+                raw = r.get(self._result_key(key))
+                if raw is not None:
+                    return json.loads(raw)
+                if not r.exists(self._lock_key(key)):
+                    # 리더가 결과 없이 종료(실패)
+                    return _FAILED
+            except Exception as exc:
+                logger.warning("Single-flight wait error (%s): %s", self.namespace, exc)
+                return _FAILED
+        return _FAILED
+
+    def _finish(self, key: str, future: Optional[asyncio.Future], token: Optional[str], value: Any) -> None:
+        r = get_redis() if token else None
+        if r is not None:
+            try:
+                if value is not _FAILED:
+                    r.setex(self._result_key(key), self.result_ttl_seconds, json.dumps(value, ensure_ascii=False, default=str))
+                if r.get(self._lock_key(key)) == token:
+                    r.delete(self._lock_key(key))
+            except Exception as exc:
+                logger.warning("Single-flight publish error (%s): %s", self.namespace, exc)
+        if future is not None:
+            self._resolve_local(key, future, value)
+
+    def _resolve_local(self, key: str, future: asyncio.Future, value: Any) -> None:
+        if self._local.get(key) is future:
+            del self._local[key]
+        if not future.done():
+            future.set_result(value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "in_flight": len(self._local)}
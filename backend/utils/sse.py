@@ -0,0 +1,21 @@
+"""Server-Sent Events (SSE) helpers."""
+
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# 프록시(Nginx/Azure Front Door)가 응답을 버퍼링하지 않도록 하는 헤더
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode a single SSE frame (`event:` + `data:` lines)."""
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,127 @@
+"""Two-tier (in-process LRU + Redis) JSON cache with TTL.
+
+- L1: 워커 메모리 LRU (max_entries, ttl_seconds)
+- L2: Redis (REDIS_URL 설정 시, 워커 간 공유). Redis 미사용/장애 시 L1만 사용.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import metrics
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class LRUTTLCache:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(max_entries, 1)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache:
+    def __init__(self, namespace: str, max_entries: int, ttl_seconds: int) -> None:
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self._local = LRUTTLCache(max_entries, ttl_seconds)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._local.get(key)
+        if value is not None:
+            metrics.incr(f"{self.namespace}.l1_hit")
+            return value
+
+        r = get_redis()
+        if r is not None:
+            try:
+                raw = r.get(self._redis_key(key))
+            except Exception as exc:
+                logger.warning("Redis cache read error (%s): %s", self.namespace, exc)
+                raw = None
+            if raw is not None:
+                try:
+                    value = json.loads(raw)
+                except ValueError:
+                    value = None
+                if value is not None:
+                    metrics.incr(f"{self.namespace}.l2_hit")
+                    self._local.set(key, value)
+                    return value
+
+        metrics.incr(f"{self.namespace}.miss")
+        return None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._local.set(key, value, ttl)
+        r = get_redis()
+        if r is None:
+            return
+        try:
+            r.setex(self._redis_key(key), ttl, json.dumps(value, ensure_ascii=False, default=str))
+        except Exception as exc:
+            logger.warning("Redis cache write error (%s): %s", self.namespace, exc)
+
+    def delete(self, key: str) -> None:
+        self._local.delete(key)
+        r = get_redis()
+        if r is None:
+            return
+        try:
+            r.delete(self._redis_key(key))
+        except Exception as exc:
+            logger.warning("Redis cache delete error (%s): %s", self.namespace, exc)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "l1_entries": len(self._local),
+            "l1_max_entries": self._local.max_entries,
+            "l1_evictions": self._local.evictions,
+        }
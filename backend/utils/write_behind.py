@@ -0,0 +1,189 @@
+"""Bounded in-process write-behind buffer (batched inserts on a background thread).
+
+요청 경로에서는 행을 메모리 큐에 넣기만 하고, 백그라운드 스레드가
+batch_size개가 모이거나 가장 오래된 행이 flush_interval_seconds를 넘기면 write_batch로 한 번에 저장합니다.
+
+- 큐가 max_pending을 넘으면 새 행은 버리고 `{name}.dropped`를 올림 (요청은 막지 않음)
+- 연결 오류로 배치가 실패하면 큐 앞에 되돌려 retry_seconds 후 재시도,
+  데이터 오류(제약/길이 등)면 행 단위로 다시 넣어 문제 행만 버림 (`{name}.rejected`)
+- stop()은 남은 행을 모두 저장(drain)한 뒤 스레드를 종료
+- metrics: `{name}.lag_ms`(큐 대기 시간), `{name}.flush_ms`, `{name}.batch_size`, gauge `{name}`
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+WriteBatch = Callable[[Any, Sequence[Dict[str, Any]]], None]
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """재시도하면 성공할 수 있는 오류 (연결 끊김/타임아웃)인지."""
+    if isinstance(exc, OperationalError):
+        return True
+    return isinstance(exc, DBAPIError) and bool(exc.connection_invalidated)
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        name: str,
+        write_batch: WriteBatch,
+        batch_size: int = 100,
+        flush_interval_seconds: float = 1.0,
+        max_pending: int = 10000,
+        retry_seconds: float = 2.0,
+    ) -> None:
+        self.name = name
+        self.write_batch = write_batch
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max(max_pending, self.batch_size)
+        self.retry_seconds = retry_seconds
+        self.engine = None
+        self._queue: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flush_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine) -> None:
+        with self._cond:
+            self.engine = engine
+            self._stopping = False
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """큐에 행 추가. 가득 차 있으면 버리고 False."""
+        with self._cond:
+            if len(self._queue) >= self.max_pending:
+                self.dropped += 1
+                metrics.incr(f"{self.name}.dropped")
+                return False
+            self._queue.append((monotonic(), row))
+            # 첫 행이면 대기 시간 재계산, batch_size가 차면 즉시 flush
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def pending(self, predicate: Callable[[Dict[str, Any]], bool]) -> List[Dict[str, Any]]:
+        """아직 저장되지 않은 행 중 조건에 맞는 행 (DB 조회 결과에 합칠 때 사용)."""
+        with self._cond:
+            return [row for _, row in self._queue if predicate(row)]
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """남은 행을 저장하고 스레드 종료."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("%s writer did not drain within %.0fs (%d pending)", self.name, timeout, len(self._queue))
+        self._thread = None
+
+    def _next_batch(self) -> Optional[List[Tuple[float, Dict[str, Any]]]]:
+        with self._cond:
+            while True:
+                if self._queue:
+                    if self._stopping or len(self._queue) >= self.batch_size:
+                        break
+                    wait = self._queue[0][0] + self.flush_interval_seconds - monotonic()
+                    if wait <= 0:
+                        break
+                elif self._stopping:
+                    return None
+                else:
+                    wait = None
+                self._cond.wait(wait)
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not self._flush(batch) and not self._stopping:
+                self._requeue(batch)
+                with self._cond:
+                    self._cond.wait(self.retry_seconds)
+
+    def _requeue(self, batch: List[Tuple[float, Dict[str, Any]]]) -> None:
+        with self._cond:
+            room = self.max_pending - len(self._queue)
+            keep = batch[:max(room, 0)]
+            self._queue.extendleft(reversed(keep))
+            lost = len(batch) - len(keep)
+        if lost:
+            self.dropped += lost
+            metrics.incr(f"{self.name}.dropped", lost)
+
+    def _flush(self, batch: List[Tuple[float, Dict[str, Any]]]) -> bool:
+        """배치 저장. 연결 오류로 나중에 다시 시도해야 하면 False."""
+        rows = [row for _, row in batch]
+        started = monotonic()
+        try:
+            self.write_batch(self.engine, rows)
+        except Exception as exc:
+            self.flush_errors += 1
+            metrics.incr(f"{self.name}.flush_errors")
+            if is_connection_error(exc) and not self._stopping:
+                logger.warning("%s flush failed, retrying in %.0fs: %s", self.name, self.retry_seconds, exc)
+                return False
+            logger.warning("%s batch rejected, retrying row by row: %s", self.name, exc)
+            self._flush_rows(rows)
+        else:
+            self.flushed += len(rows)
+            self.batches += 1
+            metrics.observe(f"{self.name}.flush_ms", (monotonic() - started) * 1000)
+            metrics.observe(f"{self.name}.batch_size", len(rows))
+        metrics.observe(f"{self.name}.lag_ms", (started - batch[0][0]) * 1000)
+        return True
+
+    def _flush_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            try:
+                self.write_batch(self.engine, [row])
+                self.flushed += 1
+            except Exception as exc:
+                self.rejected += 1
+                metrics.incr(f"{self.name}.rejected")
+                logger.warning("%s row dropped: %s", self.name, exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._queue)
+            oldest = self._queue[0][0] if self._queue else None
+        return {
+            "running": self.running,
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "oldest_ms": round((monotonic() - oldest) * 1000, 1) if oldest is not None else 0.0,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flush_errors": self.flush_errors,
+        }
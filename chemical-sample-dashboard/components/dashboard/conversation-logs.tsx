@@ -113,6 +113,8 @@ export function ConversationLogs({ language }: ConversationLogsProps) {
         return uiText.accidentConversationStatusPending
       case "failed":
         return uiText.accidentConversationStatusFailed
+      case "cancelled":
+        return uiText.accidentConversationStatusCancelled
       default:
         return status
     }
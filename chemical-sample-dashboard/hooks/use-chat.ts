@@ -1,5 +1,6 @@
 import { useCallback, useEffect, useMemo, useState } from "react"
 
+import { ApiError } from "@/lib/api"
 import { USE_MOCKS } from "@/lib/config"
 import {
   createChatRoom,
@@ -7,6 +8,8 @@ import {
   fetchChatMessages,
   fetchChatRooms,
   postChatMessage,
+  subscribeChatRoom,
+  subscribeChatRooms,
   updateChatRoom,
 } from "@/lib/data/chat"
 import { pickI18n } from "@/lib/data-utils"
@@ -14,6 +17,54 @@ import type { ChatMessage, ChatRoom } from "@/lib/types"
 
 type MessagesByRoom = Record<string, ChatMessage[]>
 
+type RoomPreviewEvent = Pick<ChatRoom, "id" | "lastMessageAt" | "lastMessagePreview">
+
+const MAX_RECONNECT_DELAY_MS = 30000
+
+const sleep = (ms: number, signal: AbortSignal) =>
+  new Promise<void>((resolve) => {
+    const timer = setTimeout(resolve, ms)
+    signal.addEventListener("abort", () => {
+      clearTimeout(timer)
+      resolve()
+    })
+  })
+
+/** Keep an SSE subscription open, reconnecting with backoff until aborted. */
+const keepSubscribed = async (
+  subscribe: (signal: AbortSignal) => Promise<void>,
+  signal: AbortSignal
+) => {
+  let attempt = 0
+  while (!signal.aborted) {
+    const startedAt = Date.now()
+    try {
+      await subscribe(signal)
+    } catch {
+      // reconnect below
+    }
+    if (signal.aborted) return
+    attempt = Date.now() - startedAt > MAX_RECONNECT_DELAY_MS ? 0 : attempt + 1
+    await sleep(Math.min(MAX_RECONNECT_DELAY_MS, 1000 * 2 ** attempt), signal)
+  }
+}
+
+/** Merge a pushed message: skip known ids and replace the matching optimistic user message. */
+const mergeMessage = (current: ChatMessage[], message: ChatMessage) => {
+  if (current.some((item) => item.id === message.id)) return current
+  if (message.role === "user") {
+    const optimisticIndex = current.findIndex(
+      (item) => item.id.startsWith("temp-") && item.content === message.content
+    )
+    if (optimisticIndex !== -1) {
+      const next = [...current]
+      next[optimisticIndex] = message
+      return next
+    }
+  }
+  return [...current, message]
+}
+
 const buildPreview = (content: string, maxLen = 200) => {
   const cleaned = content.replace(/\s+/g, " ").trim()
   if (cleaned.length <= maxLen) return cleaned
@@ -140,6 +191,65 @@ export function useChatData(defaultRoomTitle = "New Chat", language = "KR") {
     })
   }, [])
 
+  useEffect(() => {
+    if (usingMocks) return
+    const controller = new AbortController()
+    const handleEvent = (event: string, data: unknown) => {
+      if (event === "room") {
+        const update = data as RoomPreviewEvent
+        setRooms((prev) => {
+          const current = prev.find((room) => room.id === update.id)
+          if (!current) return prev
+          const merged = {
+            ...current,
+            lastMessageAt: update.lastMessageAt,
+            lastMessagePreview: update.lastMessagePreview,
+          }
+          return [merged, ...prev.filter((room) => room.id !== update.id)]
+        })
+      } else if (event === "room_created") {
+        const room = applyRoomI18n(data as ChatRoom, includeI18n)
+        setRooms((prev) => (prev.some((item) => item.id === room.id) ? prev : [room, ...prev]))
+      } else if (event === "room_updated") {
+        const room = data as ChatRoom
+        setRooms((prev) =>
+          prev.map((item) => (item.id === room.id ? { ...item, title: room.title } : item))
+        )
+      } else if (event === "room_deleted") {
+        const { id } = data as { id: string }
+        setRooms((prev) => {
+          const updated = prev.filter((room) => room.id !== id)
+          setActiveRoomId((current) => (current === id ? updated[0]?.id ?? null : current))
+          return updated
+        })
+      } else if (event === "resync") {
+        loadRooms()
+      }
+    }
+    keepSubscribed((signal) => subscribeChatRooms(handleEvent, signal), controller.signal)
+    return () => controller.abort()
+  }, [includeI18n, loadRooms, usingMocks])
+
+  useEffect(() => {
+    if (usingMocks || !activeRoomId) return
+    const roomId = activeRoomId
+    const controller = new AbortController()
+    const handleEvent = (event: string, data: unknown) => {
+      if (event === "message") {
+        const message = applyMessageI18n(data as ChatMessage, includeI18n)
+        setMessagesByRoom((prev) => {
+          // not loaded yet: the initial fetch will include it
+          if (!prev[roomId]) return prev
+          return { ...prev, [roomId]: mergeMessage(prev[roomId], message) }
+        })
+      } else if (event === "resync") {
+        loadMessages(roomId)
+      }
+    }
+    keepSubscribed((signal) => subscribeChatRoom(roomId, handleEvent, signal), controller.signal)
+    return () => controller.abort()
+  }, [activeRoomId, includeI18n, loadMessages, usingMocks])
+
   const sendMessage = useCallback(
     async (content: string, user?: string) => {
       const message = content.trim()
@@ -216,7 +326,13 @@ export function useChatData(defaultRoomTitle = "New Chat", language = "KR") {
         const assistantMessage = applyMessageI18n(response.assistantMessage, includeI18n)
         setMessagesByRoom((prev) => {
           const current = prev[targetRoomId] || []
-          const cleaned = current.filter((item) => item.id !== optimisticUserMessage.id)
+          // the room subscription may already have delivered these messages
+          const cleaned = current.filter(
+            (item) =>
+              item.id !== optimisticUserMessage.id &&
+              item.id !== userMessage.id &&
+              item.id !== assistantMessage.id
+          )
           return {
             ...prev,
             [targetRoomId]: [
@@ -232,12 +348,18 @@ export function useChatData(defaultRoomTitle = "New Chat", language = "KR") {
           buildPreview(assistantMessage.content),
           assistantMessage.createdAt
         )
-      } catch {
+      } catch (err) {
+        const warming =
+          err instanceof ApiError &&
+          err.status === 503 &&
+          (err.detail as { code?: string } | undefined)?.code === "AGENT_WARMING"
         const errorMessage: ChatMessage = {
           id: `err-${Date.now()}`,
           roomId: targetRoomId,
           role: "assistant",
-          content: "Unable to reach the assistant right now.",
+          content: warming
+            ? "The assistant is still starting up. Please try again in a few seconds."
+            : "Unable to reach the assistant right now.",
           createdAt: new Date().toISOString(),
           senderType: "assistant",
           senderId: null,
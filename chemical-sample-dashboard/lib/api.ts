@@ -132,6 +132,64 @@ export async function fetchJson<T>(
   return res.json() as Promise<T>
 }
 
+/**
+ * Subscribe to an SSE (text/event-stream) endpoint and call onEvent per frame
+ * until the server closes the stream or the signal aborts.
+ * Uses a fetch stream because EventSource cannot send the Authorization header.
+ */
+export async function streamEvents(
+  path: string,
+  onEvent: (event: string, data: unknown) => void,
+  signal: AbortSignal,
+  retry = true
+): Promise<void> {
+  const headers: Record<string, string> = { Accept: "text/event-stream" }
+  const token = await getAccessToken()
+  if (token) {
+    headers["Authorization"] = `Bearer ${token}`
+  }
+
+  const res = await fetch(`${API_BASE_URL}${path}`, { headers, signal })
+  if (res.status === 401 && retry) {
+    const refreshed = await refreshTokens()
+    if (refreshed) {
+      return streamEvents(path, onEvent, signal, false)
+    }
+  }
+  if (!res.ok || !res.body) {
+    throw new ApiError(`Request failed: ${res.status}`, res.status)
+  }
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ""
+  while (true) {
+    const { value, done } = await reader.read()
+    if (done) return
+    buffer += decoder.decode(value, { stream: true })
+    let boundary = buffer.indexOf("\n\n")
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      boundary = buffer.indexOf("\n\n")
+
+      let event = "message"
+      const dataLines: string[] = []
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim()
+        else if (line.startsWith("data:")) dataLines.push(line.slice(5).trimStart())
+      }
+      // comment frames (": keepalive") carry no data
+      if (dataLines.length === 0) continue
+      try {
+        onEvent(event, JSON.parse(dataLines.join("\n")))
+      } catch {
+        // ignore malformed frames
+      }
+    }
+  }
+}
+
 export class ApiError extends Error {
   status: number
   detail: unknown
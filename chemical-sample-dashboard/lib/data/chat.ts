@@ -1,4 +1,4 @@
-import { fetchJson } from "@/lib/api"
+import { fetchJson, streamEvents } from "@/lib/api"
 import { buildApiQuery } from "@/lib/data-utils"
 import type {
   ChatRoomListResponse,
@@ -68,3 +68,18 @@ export async function postChatMessage(
     }
   )
 }
+
+export async function subscribeChatRooms(
+  onEvent: (event: string, data: unknown) => void,
+  signal: AbortSignal
+) {
+  return streamEvents(`/api/chat/rooms/events`, onEvent, signal)
+}
+
+export async function subscribeChatRoom(
+  roomId: string,
+  onEvent: (event: string, data: unknown) => void,
+  signal: AbortSignal
+) {
+  return streamEvents(`/api/chat/rooms/${encodeURIComponent(roomId)}/events`, onEvent, signal)
+}
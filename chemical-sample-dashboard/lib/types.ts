@@ -339,7 +339,7 @@ export type Accident = {
 // ---------------------------------------------------------------------------
 // Conversation Logs
 // ---------------------------------------------------------------------------
-export type LogEntryStatus = "completed" | "pending" | "failed";
+export type LogEntryStatus = "completed" | "pending" | "failed" | "cancelled";
 
 export type LogEntry = {
   id: string;
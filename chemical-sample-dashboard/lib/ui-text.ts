@@ -155,6 +155,7 @@ type UiText = {
   accidentConversationStatusCompleted: string
   accidentConversationStatusPending: string
   accidentConversationStatusFailed: string
+  accidentConversationStatusCancelled: string
   accidentEmailStatusDelivered: string
   accidentEmailStatusPending: string
   accidentEmailStatusFailed: string
@@ -493,6 +494,7 @@ const UI_STRINGS: Record<UiLang, UiText> = {
     accidentConversationStatusCompleted: "완료",
     accidentConversationStatusPending: "대기 중",
     accidentConversationStatusFailed: "실패",
+    accidentConversationStatusCancelled: "취소됨",
     accidentEmailStatusDelivered: "전송됨",
     accidentEmailStatusPending: "대기 중",
     accidentEmailStatusFailed: "실패",
@@ -829,6 +831,7 @@ const UI_STRINGS: Record<UiLang, UiText> = {
     accidentConversationStatusCompleted: "Completed",
     accidentConversationStatusPending: "Pending",
     accidentConversationStatusFailed: "Failed",
+    accidentConversationStatusCancelled: "Cancelled",
     accidentEmailStatusDelivered: "Delivered",
     accidentEmailStatusPending: "Pending",
     accidentEmailStatusFailed: "Failed",
@@ -1165,6 +1168,7 @@ const UI_STRINGS: Record<UiLang, UiText> = {
     accidentConversationStatusCompleted: "完了",
     accidentConversationStatusPending: "待機中",
     accidentConversationStatusFailed: "失敗",
+    accidentConversationStatusCancelled: "キャンセル",
     accidentEmailStatusDelivered: "送信済み",
     accidentEmailStatusPending: "待機中",
     accidentEmailStatusFailed: "失敗",
@@ -1501,6 +1505,7 @@ const UI_STRINGS: Record<UiLang, UiText> = {
     accidentConversationStatusCompleted: "完成",
     accidentConversationStatusPending: "处理中",
     accidentConversationStatusFailed: "失败",
+    accidentConversationStatusCancelled: "已取消",
     accidentEmailStatusDelivered: "已送达",
     accidentEmailStatusPending: "待处理",
     accidentEmailStatusFailed: "失败",